@@ -0,0 +1,4 @@
+-- Coalescing group of digest notifications (see rfx_notify.digest).
+
+ALTER TABLE "rfx_notify"."notification"
+ADD COLUMN IF NOT EXISTS "digest_key" VARCHAR(255);
@@ -0,0 +1,25 @@
+-- Idempotent send-notification (see rfx_notify.idempotency).
+--
+-- Keys are unique per scope (realm) in their own unpartitioned table, so the
+-- guarantee holds across the monthly partitions of "notification".
+
+ALTER TABLE "rfx_notify"."notification"
+ADD COLUMN IF NOT EXISTS "idempotency_key" VARCHAR(255);
+
+-- Superseded by the key table (a unique index on a partitioned table is per partition)
+DROP INDEX IF EXISTS "rfx_notify"."uq_notification_idempotency";
+
+CREATE TABLE IF NOT EXISTS "rfx_notify"."notification_idempotency" (
+    "_id" UUID PRIMARY KEY,
+    "_created" TIMESTAMPTZ DEFAULT now(),
+    "_updated" TIMESTAMPTZ,
+    "_creator" UUID,
+    "_updater" UUID,
+    "_deleted" TIMESTAMPTZ,
+    "_etag" VARCHAR(255),
+    "_realm" VARCHAR(255),
+    "scope" VARCHAR(255) NOT NULL DEFAULT '',
+    "idempotency_key" VARCHAR(255) NOT NULL,
+    "result" JSONB,
+    CONSTRAINT "uq_notification_idempotency_key" UNIQUE ("scope", "idempotency_key")
+);
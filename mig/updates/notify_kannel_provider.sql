@@ -0,0 +1,6 @@
+-- Kannel SMS provider type.
+--
+-- ADD VALUE cannot be used in the same transaction as the new value, so this
+-- script is run on its own, outside of a transaction block.
+
+ALTER TYPE "rfx_notify"."providertypeenum" ADD VALUE IF NOT EXISTS 'KANNEL';
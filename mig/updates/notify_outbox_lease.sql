@@ -0,0 +1,8 @@
+-- Worker lease of outbox deliveries (see rfx_notify.outbox).
+
+ALTER TABLE "rfx_notify"."notification"
+ADD COLUMN IF NOT EXISTS "lease_expires_at" TIMESTAMPTZ;
+
+-- Outbox claims and stalled-row recovery
+CREATE INDEX IF NOT EXISTS "ix_notification_status_lease"
+    ON "rfx_notify"."notification" ("status", "lease_expires_at");
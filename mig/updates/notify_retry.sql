@@ -0,0 +1,8 @@
+-- Retry backoff of failed notifications (see rfx_notify.retry).
+
+ALTER TABLE "rfx_notify"."notification"
+ADD COLUMN IF NOT EXISTS "next_retry_at" TIMESTAMPTZ;
+
+-- Retry engine scan for failed notifications
+CREATE INDEX IF NOT EXISTS "ix_notification_status_next_retry"
+    ON "rfx_notify"."notification" ("status", "next_retry_at");
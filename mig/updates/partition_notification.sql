@@ -0,0 +1,121 @@
+-- Monthly range partitioning of "rfx_notify"."notification" and
+-- "rfx_notify"."notification_delivery_log" on _created.
+--
+-- Run after the partition functions from rfx_schema.rfx_notify._pgentity are
+-- installed (alembic). The script is idempotent: already partitioned tables are
+-- skipped.
+--
+-- * Existing rows are not copied: each current table is attached as a "legacy"
+--   partition covering everything before next month. Retention detaches it
+--   once that bound falls out of the retention window.
+-- * The primary key becomes (_id, _created), as required for partitioning.
+-- * Unique indexes must contain the partition key; idempotency keys are
+--   therefore enforced in the unpartitioned "notification_idempotency" table
+--   (mig/updates/notify_idempotency.sql).
+-- * notification_delivery_log keeps notification_id without a foreign key
+--   (a foreign key to a partitioned table would have to include _created).
+-- * Status scans use partial indexes on the active statuses only.
+
+BEGIN;
+
+DO
+$$
+DECLARE
+    fk RECORD;
+BEGIN
+    FOR fk IN
+        SELECT conname
+          FROM pg_constraint
+         WHERE conrelid = '"rfx_notify"."notification_delivery_log"'::regclass
+           AND contype = 'f'
+    LOOP
+        EXECUTE format('ALTER TABLE "rfx_notify"."notification_delivery_log" DROP CONSTRAINT %I', fk.conname);
+    END LOOP;
+END
+$$;
+
+DROP INDEX IF EXISTS "rfx_notify"."ix_notification_status_lease";
+DROP INDEX IF EXISTS "rfx_notify"."ix_notification_status_scheduled";
+DROP INDEX IF EXISTS "rfx_notify"."ix_notification_status_next_retry";
+DROP INDEX IF EXISTS "rfx_notify"."ix_notification_provider_message_id";
+
+DO
+$$
+DECLARE
+    tbl TEXT;
+    legacy TEXT;
+    pkey TEXT;
+    boundary TIMESTAMPTZ := date_trunc('month', now() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+                            + interval '1 month';
+BEGIN
+    FOREACH tbl IN ARRAY ARRAY['notification', 'notification_delivery_log']
+    LOOP
+        IF EXISTS (
+            SELECT 1
+              FROM pg_class c
+              JOIN pg_namespace n ON n.oid = c.relnamespace
+             WHERE n.nspname = 'rfx_notify' AND c.relname = tbl AND c.relkind = 'p'
+        ) THEN
+            RAISE NOTICE '"rfx_notify"."%" is already partitioned', tbl;
+            CONTINUE;
+        END IF;
+
+        legacy := tbl || '_legacy';
+        RAISE NOTICE 'Partitioning "rfx_notify"."%" (existing rows -> "%")', tbl, legacy;
+
+        -- The partition key must be NOT NULL
+        EXECUTE format('UPDATE "rfx_notify".%I SET _created = COALESCE(_updated, now()) WHERE _created IS NULL', tbl);
+        EXECUTE format('ALTER TABLE "rfx_notify".%I ALTER COLUMN _created SET NOT NULL', tbl);
+
+        SELECT conname INTO pkey
+          FROM pg_constraint
+         WHERE conrelid = format('"rfx_notify".%I', tbl)::regclass AND contype = 'p';
+
+        EXECUTE format('ALTER TABLE "rfx_notify".%I RENAME TO %I', tbl, legacy);
+        EXECUTE format('ALTER TABLE "rfx_notify".%I RENAME CONSTRAINT %I TO %I', legacy, pkey, legacy || '_pkey');
+
+        EXECUTE format(
+            'CREATE TABLE "rfx_notify".%I (LIKE "rfx_notify".%I INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            'PARTITION BY RANGE (_created)',
+            tbl, legacy
+        );
+        EXECUTE format('ALTER TABLE "rfx_notify".%I ADD PRIMARY KEY (_id, _created)', tbl);
+
+        EXECUTE format(
+            'ALTER TABLE "rfx_notify".%I ATTACH PARTITION "rfx_notify".%I FOR VALUES FROM (MINVALUE) TO (%L)',
+            tbl, legacy, boundary
+        );
+        EXECUTE format('CREATE TABLE "rfx_notify".%I PARTITION OF "rfx_notify".%I DEFAULT', tbl || '_default', tbl);
+    END LOOP;
+END
+$$;
+
+-- Partial indexes on active statuses (created on every partition)
+CREATE INDEX IF NOT EXISTS "ix_notification_active"
+    ON "rfx_notify"."notification" (status, _created)
+    WHERE status IN ('PENDING', 'PROCESSING');
+
+CREATE INDEX IF NOT EXISTS "ix_notification_active_lease"
+    ON "rfx_notify"."notification" (lease_expires_at)
+    WHERE status = 'PROCESSING';
+
+CREATE INDEX IF NOT EXISTS "ix_notification_active_scheduled"
+    ON "rfx_notify"."notification" (scheduled_at)
+    WHERE status IN ('PENDING', 'PROCESSING') AND scheduled_at IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS "ix_notification_retry_due"
+    ON "rfx_notify"."notification" (next_retry_at)
+    WHERE status IN ('FAILED', 'REJECTED');
+
+CREATE INDEX IF NOT EXISTS "ix_notification_provider_message_id"
+    ON "rfx_notify"."notification" (provider_message_id)
+    WHERE provider_message_id IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS "ix_notification_delivery_log_notification_id"
+    ON "rfx_notify"."notification_delivery_log" (notification_id);
+
+-- Current month and the next three
+SELECT "rfx_notify".ensure_monthly_partitions('notification', 3);
+SELECT "rfx_notify".ensure_monthly_partitions('notification_delivery_log', 3);
+
+COMMIT;
@@ -0,0 +1,6 @@
+-- Render log timestamps are written timezone-aware (see rfx_template.renderlog).
+-- Existing values were written as naive UTC.
+
+ALTER TABLE "rfx_template"."template_render_log"
+ALTER COLUMN "rendered_at" TYPE TIMESTAMPTZ USING "rendered_at" AT TIME ZONE 'UTC',
+ALTER COLUMN "rendered_at" SET DEFAULT now();
@@ -5,6 +5,12 @@ MESSAGE_CLIENT = DEFAULT_SERVICE_CLIENT
 NOTIFY_CLIENT = DEFAULT_SERVICE_CLIENT
 TEMPLATE_CLIENT = DEFAULT_SERVICE_CLIENT
 
+# Rendered content cache of the message services (see rfx_base.rendered)
+RENDER_CACHE_ENABLED = True  # Reuse rendered content for CACHED/STATIC render strategies
+RENDER_CACHE_MAX_ENTRIES = 10000  # Rendered contents kept (LRU)
+RENDER_CACHE_MAX_BYTES = 32 * 1024 * 1024  # Approximate memory bound of the cached bodies and subjects
+RENDER_CACHE_TTL = 300  # Seconds a rendered content is reused (bounds staleness after template updates)
+
 # --- Default Schema Names ---
 RFX_CLIENT_SCHEMA = "rfx_client"
 RFX_DISCUSS_SCHEMA = "rfx_discuss"
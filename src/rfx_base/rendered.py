@@ -0,0 +1,139 @@
+"""
+Rendered content cache
+
+In-process LRU of rendered template output, used by the message services for
+the CACHED and STATIC render strategies. The services reach rfx-template only
+through their service client; this cache sits in front of those requests.
+
+Keys are (template key, version, locale, channel, tenant, app) plus a
+canonical hash of the render data; STATIC templates have no dynamic content,
+so their key leaves the data out. `render-template` responses carry the
+revision of the template they were rendered from: when a render returns a
+revision other than the one cached for its scope, every entry of that scope
+is dropped. Entries also expire after RENDER_CACHE_TTL seconds, which bounds
+staleness for entries that are never missed, and the cache is bounded both by
+entry count and by the approximate size of the cached text.
+"""
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from . import config, logger
+
+CACHED_STRATEGIES = ("CACHED", "STATIC")
+
+# Leading key fields identifying the template a rendering came from
+SCOPE_SIZE = 6
+
+
+class RenderedContentCache:
+    def __init__(self, *, max_entries: Optional[int] = None, max_bytes: Optional[int] = None, ttl: Optional[float] = None):
+        self.max_entries = config.RENDER_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.max_bytes = config.RENDER_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.ttl = config.RENDER_CACHE_TTL if ttl is None else ttl
+
+        # key -> (expires at, size, rendered)
+        self._entries: "OrderedDict[Tuple, Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+        # scope -> template revision of its cached entries, least recently rendered first
+        self._revisions: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def key(
+        self,
+        strategy,
+        *,
+        template_key: str,
+        version: Optional[int] = None,
+        locale: Optional[str] = None,
+        channel: Optional[str] = None,
+        tenant_id: Optional[str] = None,
+        app_id: Optional[str] = None,
+        data: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Tuple]:
+        """Cache key of a render, or None when the strategy's output is not cached."""
+        strategy = _value(strategy)
+        if not config.RENDER_CACHE_ENABLED or strategy not in CACHED_STRATEGIES:
+            return None
+
+        scope = (template_key, version, locale, _value(channel), _value(tenant_id), app_id)
+        if strategy == "STATIC":
+            return scope + (None,)
+
+        encoded = json.dumps(data or {}, sort_keys=True, default=str, separators=(",", ":"))
+        return scope + (hashlib.sha256(encoded.encode("utf-8")).hexdigest(),)
+
+    def get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        cached = self._entries.get(key)
+        if cached is None or cached[0] <= time.monotonic():
+            if cached is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(cached[2])
+
+    def put(self, key: Tuple, rendered: Dict[str, Any], revision: Any = None):
+        """
+        Cache a rendering. `revision` is the template revision reported by
+        rfx-template; a new revision drops the other entries of the scope.
+        """
+        if revision is not None:
+            self._observe(key[:SCOPE_SIZE], revision)
+
+        size = sum(len(value) for value in rendered.values() if isinstance(value, str))
+        if self.ttl <= 0 or size > self.max_bytes:
+            return
+
+        self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl, size, dict(rendered))
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        self._entries.clear()
+        self._revisions.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _observe(self, scope: Tuple, revision: Any):
+        known = self._revisions.get(scope)
+        self._revisions[scope] = revision
+        self._revisions.move_to_end(scope)
+        while len(self._revisions) > self.max_entries:
+            self._revisions.popitem(last=False)
+        if known is None or known == revision:
+            return
+
+        stale = [key for key in self._entries if key[:SCOPE_SIZE] == scope]
+        for key in stale:
+            self._remove(key)
+        logger.info(f"Template {scope[0]} changed, dropped {len(stale)} cached rendered contents")
+
+    def _remove(self, key: Tuple):
+        cached = self._entries.pop(key, None)
+        if cached is not None:
+            self._bytes -= cached[1]
+
+
+def _value(value):
+    if value is None:
+        return None
+    return str(getattr(value, "value", value))
+
+
+# Process-wide rendered content cache
+rendered_content_cache = RenderedContentCache()
@@ -2,6 +2,7 @@ from fluvius.domain.aggregate import action
 from fluvius.data import serialize_mapping, UUID_GENR
 from typing import Optional, Dict, Any
 
+from rfx_base.rendered import rendered_content_cache
 from ..types import (
     ProcessingModeEnum,
     RenderStatusEnum,
@@ -69,37 +70,61 @@ class MessageMixin:
         # If message has template_key, render via rfx-template domain
         if message.template_key:
             try:
-                from rfx_user import config as userconf
-                template_client = getattr(self.context.service_proxy, userconf.TEMPLATE_CLIENT, None)
-                if not template_client:
-                    raise RuntimeError("Template client not found")
-
-                # Call rfx-template:render-template
-                response = await template_client.request(
-                    "rfx-template:render-template",
-                    command="render-template",
-                    resource="template",
-                    payload={
-                        "key": message.template_key,
-                        "data": context or {},
-                        "tenant_id": str(self.context.tenant_id) if hasattr(self.context, 'tenant_id') else None,
-                        "app_id": getattr(self.context, 'app_id', None),
-                        "locale": message.locale or "en",
-                        "channel": message.channel,
-                    },
-                    _headers={},
-                    _context={
-                        "audit": {
-                            "user_id": str(self.context.user_id) if self.context.user_id else None,
-                            "profile_id": str(self.context.profile_id) if self.context.profile_id else None,
-                        },
-                        "source": "rfx-message",
-                    },
+                tenant_id = str(self.context.tenant_id) if hasattr(self.context, 'tenant_id') else None
+                app_id = getattr(self.context, 'app_id', None)
+
+                # CACHED/STATIC strategies reuse previously rendered output
+                cache_key = rendered_content_cache.key(
+                    getattr(message, 'render_strategy', None),
+                    template_key=message.template_key,
+                    version=getattr(message, 'template_version', None),
+                    locale=message.locale or "en",
+                    channel=message.channel,
+                    tenant_id=tenant_id,
+                    app_id=app_id,
+                    data=context,
                 )
-
-                # Extract rendered content from template-service-response
-                service_response = response.get("template-service-response", response)
-                rendered_content = service_response.get('body', '')
+                rendered = rendered_content_cache.get(cache_key) if cache_key else None
+
+                if rendered is None:
+                    from rfx_user import config as userconf
+                    template_client = getattr(self.context.service_proxy, userconf.TEMPLATE_CLIENT, None)
+                    if not template_client:
+                        raise RuntimeError("Template client not found")
+
+                    # Call rfx-template:render-template
+                    response = await template_client.request(
+                        "rfx-template:render-template",
+                        command="render-template",
+                        resource="template",
+                        payload={
+                            "key": message.template_key,
+                            "data": context or {},
+                            "tenant_id": tenant_id,
+                            "app_id": app_id,
+                            "locale": message.locale or "en",
+                            "channel": message.channel,
+                        },
+                        _headers={},
+                        _context={
+                            "audit": {
+                                "user_id": str(self.context.user_id) if self.context.user_id else None,
+                                "profile_id": str(self.context.profile_id) if self.context.profile_id else None,
+                            },
+                            "source": "rfx-message",
+                        },
+                    )
+
+                    # Extract rendered content from template-service-response
+                    service_response = response.get("template-service-response", response)
+                    rendered = {
+                        'body': service_response.get('body', ''),
+                        'subject': service_response.get('subject'),
+                    }
+                    if cache_key:
+                        rendered_content_cache.put(cache_key, rendered, service_response.get('template_revision'))
+
+                rendered_content = rendered['body']
 
                 # Update message with rendered content
                 await self.statemgr.update(
@@ -3,4 +3,5 @@ from ._meta import config, logger
 
 from .domain import NotifyServiceDomain
 from .query import NotifyServiceQueryManager
+from .endpoint import configure_notify_service
 from . import command
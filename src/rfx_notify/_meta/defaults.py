@@ -25,6 +25,15 @@ SMTP_USERNAME = None  # Set if SMTP server requires authentication
 SMTP_PASSWORD = None  # Set if SMTP server requires authentication
 SMTP_FROM_EMAIL = "noreply@yourdomain.com"  # Default sender email
 SMTP_TIMEOUT = 30  # Connection timeout in seconds
+SMTP_POOL_SIZE = 5  # Max concurrent authenticated connections kept per provider
+SMTP_POOL_IDLE_TIMEOUT = 60  # Close pooled connections idle longer than this (seconds)
+SMTP_POOL_HEALTH_CHECK_INTERVAL = 15  # NOOP-probe pooled connections idle longer than this (seconds)
+SMTP_SEND_CONCURRENCY = 1  # Recipients delivered concurrently per send (1 = sequential)
+SMTP_RATE_LIMIT_PER_SECOND = 0  # Messages per second handed to the relay, e.g. 50 (0 = unlimited)
+SMTP_RATE_LIMIT_BURST = 100  # Messages allowed in a burst above the steady rate
+SMTP_ENCODED_BODY_CACHE_SIZE = 16  # Encoded MIME bodies kept for reuse across recipients
+SMTP_MULTI_RCPT_BATCH_SIZE = 0  # Recipients per message for identical bulk bodies (0/1 = one message each)
+SMTP_MULTI_RCPT_TO_HEADER = "undisclosed-recipients:;"  # To header of multi-recipient messages
 
 # Self-hosted Kannel SMS Gateway Configuration
 # Kannel SMS gateway runs on the worker machine
@@ -35,7 +44,102 @@ KANNEL_PASSWORD = "admin"  # Kannel admin password
 KANNEL_FROM_NUMBER = None  # Default SMS sender number (if applicable)
 KANNEL_SEND_URL = "/cgi-bin/sendsms"  # Kannel send SMS endpoint
 KANNEL_DLR_MASK = 31  # Delivery report mask (31 = all reports)
+KANNEL_DLR_URL = None  # Public URL of the kannel-dlr endpoint including ?token=NOTIFY_DLR_TOKEN; enables delivery reports for every SMS
 KANNEL_TIMEOUT = 30  # Connection timeout in seconds
+KANNEL_SEND_CONCURRENCY = 1  # Recipients delivered concurrently per send (1 = sequential)
+KANNEL_MAX_CONNECTIONS = 20  # Max concurrent HTTP connections to Kannel per provider
+KANNEL_MAX_KEEPALIVE_CONNECTIONS = 10  # Idle keep-alive connections kept open
+KANNEL_KEEPALIVE_EXPIRY = 30  # Close idle keep-alive connections after this (seconds)
+KANNEL_RATE_LIMIT_PER_SECOND = 0  # Keep at or below the SMSC throughput configured in Kannel, e.g. 20 (0 = unlimited)
+KANNEL_RATE_LIMIT_BURST = 20  # Messages allowed in a burst above the steady rate
+
+# Bulk send persistence
+NOTIFY_BULK_INSERT_CHUNK_SIZE = 500  # Rows per multi-row INSERT
+NOTIFY_BULK_FLUSH_SIZE = 200  # Flush delivery results after this many recipients
+NOTIFY_BULK_FLUSH_INTERVAL_MS = 500  # ...or after this many milliseconds
+NOTIFY_BULK_FLUSH_RETRIES = 2  # Retries of the final flush before the rows are left to lease recovery
+
+# Delivery mode
+# "inline": send-notification delivers before responding
+# "outbox": send-notification persists PENDING records and workers deliver them
+NOTIFY_DELIVERY_MODE = "inline"
+NOTIFY_OUTBOX_REDIS_URL = "redis://localhost:6379/0"
+NOTIFY_OUTBOX_QUEUE_NAME = "rfx_notify:outbox"
+NOTIFY_OUTBOX_VISIBILITY_TIMEOUT = 300  # Worker lease per notification (seconds)
+NOTIFY_OUTBOX_WORKER_CONCURRENCY = 20  # Jobs processed concurrently per worker
+NOTIFY_OUTBOX_RECOVERY_INTERVAL = 30  # Stalled-row sweep interval (seconds, divides 60)
+NOTIFY_OUTBOX_RECOVERY_BATCH_SIZE = 500  # Max rows re-published per sweep
+NOTIFY_OUTBOX_LANE_CONCURRENCY = {  # Worker max_jobs per priority lane (one worker per lane queue)
+    "HIGH": 20,
+    "NORMAL": NOTIFY_OUTBOX_WORKER_CONCURRENCY,
+    "LOW": 5,
+}
+
+# Priority Lane Configuration
+NOTIFY_PRIORITY_SCHEDULING = "weighted"  # "weighted" (round-robin by weight) or "strict" (higher lane first)
+NOTIFY_PRIORITY_WEIGHTS = {"HIGH": 8, "NORMAL": 3, "LOW": 1}  # Share of free slots under contention
+NOTIFY_PRIORITY_PROVIDER_CAPACITY = 50  # Concurrent deliveries per provider across all lanes
+NOTIFY_PRIORITY_LANE_CONCURRENCY = {  # Max concurrent deliveries per lane and provider
+    "HIGH": 50,
+    "NORMAL": 40,
+    "LOW": 10,
+}
+
+# Scheduled delivery
+NOTIFY_SCHEDULER_ENABLED = True  # Run the scheduler inside the API process
+NOTIFY_SCHEDULER_POLL_INTERVAL = 5  # Seconds between polls for due notifications
+NOTIFY_SCHEDULER_BATCH_SIZE = 200  # Notifications claimed per batch
+NOTIFY_SCHEDULER_MAX_BATCHES = 50  # Max batches drained per poll
+NOTIFY_SCHEDULER_LEASE_SECONDS = 300  # Claim lease before another instance may retake a row
+NOTIFY_SCHEDULER_SWEEP_INTERVAL = 3600  # Seconds between claims of due rows created before NOTIFY_CLAIM_WINDOW_DAYS (0 = never)
+
+# Automatic retries
+NOTIFY_RETRY_ENABLED = False  # Run the retry engine inside the API process
+NOTIFY_RETRY_POLL_INTERVAL = 10  # Seconds between scans for retriable notifications
+NOTIFY_RETRY_BATCH_SIZE = 200  # Notifications claimed per batch
+NOTIFY_RETRY_MAX_BATCHES = 20  # Max batches retried per scan
+NOTIFY_RETRY_BASE_DELAY = 30  # Backoff before the first retry (seconds), doubled per retry
+NOTIFY_RETRY_MAX_DELAY = 3600  # Backoff cap (seconds)
+
+# Recipient preferences
+NOTIFY_PREFERENCE_CHECK_ENABLED = False  # Drop opted-out recipients before rendering/delivery (opt-in; one query per send unless cached)
+NOTIFY_PREFERENCE_CACHE_TTL = 0  # Seconds a resolved preference is cached, e.g. 60 (0 = no caching)
+NOTIFY_PREFERENCE_CACHE_MAX_ENTRIES = 100000  # Least recently used entries are evicted beyond this
+NOTIFY_PREFERENCE_LOOKUP_CHUNK_SIZE = 5000  # Addresses per preference query
+
+# Delivery reports
+NOTIFY_DLR_TOKEN = None  # Shared secret required as `token` on the kannel-dlr endpoint (None = endpoint disabled)
+NOTIFY_DLR_FLUSH_SIZE = 500  # Apply buffered delivery reports after this many...
+NOTIFY_DLR_FLUSH_INTERVAL_MS = 1000  # ...or after this many milliseconds
+
+# Partition maintenance and retention (partitioned tables only, see mig/updates/partition_notification.sql)
+NOTIFY_RETENTION_ENABLED = False  # Create partitions ahead and detach/drop expired ones (opt-in: deletes data)
+NOTIFY_RETENTION_INTERVAL = 21600  # Seconds between maintenance runs
+NOTIFY_PARTITION_MONTHS_AHEAD = 3  # Monthly partitions created ahead of time
+NOTIFY_RETENTION_MONTHS = 6  # Partitions entirely older than this many months are detached
+NOTIFY_RETENTION_ARCHIVE_SCHEMA = "rfx_notify_archive"  # Detached partitions move here; None drops them
+NOTIFY_CLAIM_WINDOW_DAYS = 62  # Scheduler/retry/outbox claims only scan rows created this recently; older due rows are swept every NOTIFY_SCHEDULER_SWEEP_INTERVAL
+
+# Idempotent sends
+NOTIFY_IDEMPOTENCY_CACHE_SIZE = 10000  # Recent idempotency keys kept in memory
+NOTIFY_IDEMPOTENCY_CACHE_TTL = 3600  # Seconds a remembered result is served from memory
+NOTIFY_IDEMPOTENCY_CLAIM_TIMEOUT = 600  # Seconds before the claim of a request that never finished may be retaken
+NOTIFY_IDEMPOTENCY_RETENTION = 2592000  # Seconds stored idempotency keys are kept (30 days)
+
+# Digest Configuration
+NOTIFY_DIGEST_ENABLED = False  # Coalesce digest-tagged notifications (opt-in)
+NOTIFY_DIGEST_TAG = "digest"  # Notifications carrying this tag are coalesced per recipient and channel
+NOTIFY_DIGEST_WINDOW = 300  # Default coalescing window in seconds (meta.digest_window overrides)
+NOTIFY_DIGEST_SUBJECT = "You have {count} new notifications"  # Subject when merged subjects differ
+
+# Provider circuit breaker
+NOTIFY_CIRCUIT_ENABLED = False
+NOTIFY_CIRCUIT_FAILURE_RATIO = 0.5  # Open the circuit at this failure ratio...
+NOTIFY_CIRCUIT_MIN_REQUESTS = 20  # ...once this many attempts were made in the window
+NOTIFY_CIRCUIT_WINDOW_SECONDS = 60  # Sliding window for the failure ratio
+NOTIFY_CIRCUIT_OPEN_SECONDS = 30  # Reject attempts this long before probing the provider again
+NOTIFY_CIRCUIT_HALF_OPEN_CALLS = 1  # Probe attempts allowed while half-open
+NOTIFY_CIRCUIT_OPEN_ACTION = "fail"  # "fail": mark FAILED; "defer": reschedule for when the circuit admits probes
 
 # Rate Limiting Configuration
 NOTIFY_RATE_LIMIT_PER_MINUTE = 60
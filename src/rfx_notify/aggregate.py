@@ -6,7 +6,9 @@ from fluvius.data import serialize_mapping, timestamp
 
 
 from .types import NotificationStatusEnum, ProviderTypeEnum
-from .service import NotificationService
+from .service import NotificationService, notification_service
+from .outbox import notification_outbox
+from .preference import preference_resolver
 from . import logger
 
 
@@ -16,16 +18,10 @@ class NotifyAggregate(Aggregate):
     Handles sending notifications through various channels (Email, SMS, Push, etc.)
     """
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._notification_service = None
-
     @property
     def notification_service(self) -> NotificationService:
-        """Lazy-loaded notification service."""
-        if self._notification_service is None:
-            self._notification_service = NotificationService()
-        return self._notification_service
+        """Shared notification service (keeps provider connection pools alive)."""
+        return notification_service
 
     # ========================================================================
     # NOTIFICATION OPERATIONS
@@ -70,6 +66,32 @@ class NotifyAggregate(Aggregate):
         # Delegate to service - it handles send, update, and logging
         return await self.notification_service.send_notification(notification)
 
+    @action("notification-queued", resources="notification")
+    async def enqueue_notification(self, *, data: dict):
+        """
+        Persist PENDING records for every recipient and hand them to the outbox workers.
+        """
+        logger.info("Queueing notification from payload")
+        return await notification_outbox.enqueue(data)
+
+    @action("notification-scheduled", resources="notification")
+    async def schedule_notification(self, *, data: dict):
+        """
+        Persist PENDING records for every recipient; the scheduler delivers them at `scheduled_at`.
+        """
+        logger.info(f"Scheduling notification for {data.get('scheduled_at')}")
+        entries = await self.notification_service.create_pending(data)
+        results = [
+            {
+                "notification_id": entry._id,
+                "status": NotificationStatusEnum.PENDING.value,
+                "provider_message_id": None,
+                "provider_type": entry.provider_type,
+            }
+            for entry in entries
+        ]
+        return {"count": len(results), "results": results}
+
     @action("notification-retried", resources="notification")
     async def retry_notification(self, *, notification_id: str):
         """
@@ -90,11 +112,12 @@ class NotifyAggregate(Aggregate):
             f"(attempt {notification.retry_count + 1}/{notification.max_retries})"
         )
 
-        # Increment retry count
-        await self.statemgr.update(notification, retry_count=notification.retry_count + 1)
-
-        # Refetch to get updated retry_count
-        notification = await self.statemgr.fetch("notification", notification_id)
+        # Increment retry count; clear the automatic retry so the engine does not resend it too
+        notification = await self.statemgr.update(
+            notification,
+            retry_count=notification.retry_count + 1,
+            next_retry_at=None,
+        )
 
         # Delegate to service - it handles send, update, and logging
         result = await self.notification_service.send_notification(notification)
@@ -128,6 +151,17 @@ class NotifyAggregate(Aggregate):
             "status": status
         }
 
+    @action("delivery-reports-ingested", resources="notification")
+    async def ingest_delivery_reports(self, *, provider_type: str, reports: list):
+        """
+        Apply a batch of provider delivery reports with one set-based update.
+        """
+        updated = await self.notification_service.apply_delivery_reports(provider_type, reports)
+        return {
+            "received": len(reports),
+            "updated": len(updated),
+        }
+
     # ========================================================================
     # PREFERENCE OPERATIONS
     # ========================================================================
@@ -144,6 +178,11 @@ class NotifyAggregate(Aggregate):
             where={'user_id': user_id, 'channel': channel}
         )
 
+        addresses = [data.get('email_address'), data.get('phone_number'), data.get('device_token')]
+        if existing:
+            addresses += [existing.email_address, existing.phone_number, existing.device_token]
+        preference_resolver.invalidate(user_id=user_id, channel=channel, addresses=addresses)
+
         if existing:
             await self.statemgr.update(existing, **data)
             return {
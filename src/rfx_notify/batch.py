@@ -0,0 +1,194 @@
+"""
+Batched persistence of delivery outcomes and delivery reports.
+"""
+import asyncio
+from typing import Any, Dict, List
+
+from .metrics import STAGE_DURATION
+from .state import NotifyStateManager
+from . import config, logger
+
+
+class DeliveryBatchWriter:
+    """
+    Buffer per-recipient delivery outcomes and persist them in batches.
+
+    Each flush runs one transaction containing a single set-based UPDATE of the
+    notification rows and a multi-row insert into ``notification_delivery_log``.
+    A flush happens when ``flush_size`` results are pending or ``flush_interval_ms``
+    has passed since the last one, and once more when the writer is closed
+    (see `_final_flush`).
+
+    Usage::
+
+        async with DeliveryBatchWriter(statemgr) as writer:
+            await writer.add(update_data, log_data)
+    """
+
+    def __init__(self, statemgr, *, flush_size: int = None, flush_interval_ms: int = None, provider: str = None):
+        self.statemgr = statemgr
+        self.provider = provider
+        self.flush_size = max(1, flush_size or config.NOTIFY_BULK_FLUSH_SIZE)
+        self.flush_interval = (flush_interval_ms or config.NOTIFY_BULK_FLUSH_INTERVAL_MS) / 1000.0
+
+        self._updates: List[Dict[str, Any]] = []
+        self._logs: List[Dict[str, Any]] = []
+        self._lock = asyncio.Lock()
+        self._timer = None
+        self.flush_count = 0
+
+    async def __aenter__(self):
+        self._timer = asyncio.create_task(self._flush_periodically())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._timer:
+            self._timer.cancel()
+            try:
+                await self._timer
+            except asyncio.CancelledError:
+                pass
+            self._timer = None
+
+        await self._final_flush()
+
+    async def _final_flush(self):
+        """
+        Flush what is left when the writer closes.
+
+        The deliveries already happened, so a failure here is not raised: the
+        flush is retried, and if it still fails the pending notifications get an
+        expired lease so that lease recovery picks them up.
+        """
+        retries = config.NOTIFY_BULK_FLUSH_RETRIES
+        for attempt in range(retries + 1):
+            try:
+                await self.flush()
+                return
+            except Exception as e:
+                error = e
+                if attempt < retries:
+                    await asyncio.sleep(self.flush_interval * (attempt + 1))
+
+        ids = [update['_id'] for update in self._updates]
+        self._updates, self._logs = [], []
+        logger.error(f"Delivery batch flush failed, {len(ids)} notification(s) left to lease recovery: {str(error)}")
+
+        try:
+            async with self.statemgr.transaction():
+                await self.statemgr.expire_leases(ids)
+        except Exception as e:
+            logger.error(f"Failed to expire leases of unrecorded notifications {ids}: {str(e)}")
+
+    async def add(self, update_data: Dict[str, Any], log_data: Dict[str, Any]):
+        self._updates.append(update_data)
+        self._logs.append(log_data)
+
+        if len(self._updates) >= self.flush_size:
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Delivery batch flush failed: {str(e)}")
+
+    async def flush(self):
+        async with self._lock:
+            if not self._updates:
+                return
+
+            updates, self._updates = self._updates, []
+            logs, self._logs = self._logs, []
+
+            try:
+                with STAGE_DURATION.time(stage="db_write", provider=self.provider):
+                    async with self.statemgr.transaction():
+                        await self.statemgr.apply_delivery_results(updates)
+                        await self.statemgr.add_notification_logs(*logs)
+            except Exception:
+                # Put the batch back so a later flush can retry it
+                self._updates[:0] = updates
+                self._logs[:0] = logs
+                raise
+
+            self.flush_count += 1
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Delivery batch flush failed: {str(e)}")
+
+
+class DeliveryReportBuffer:
+    """
+    Process-wide buffer of provider delivery reports (DLRs).
+
+    Reports are applied with set-based UPDATEs per flush, keyed on the
+    notification id or ``provider_message_id``. A flush happens when ``flush_size`` reports are
+    pending or ``flush_interval_ms`` has passed, and on ``close()``. When the
+    same message is reported more than once in a batch, the latest report wins.
+    """
+
+    def __init__(self, *, flush_size: int = None, flush_interval_ms: int = None):
+        self.statemgr = NotifyStateManager(None)
+        self.flush_size = max(1, flush_size or config.NOTIFY_DLR_FLUSH_SIZE)
+        self.flush_interval = (flush_interval_ms or config.NOTIFY_DLR_FLUSH_INTERVAL_MS) / 1000.0
+
+        self._reports: Dict[Any, Dict[str, Any]] = {}
+        self._lock = asyncio.Lock()
+        self._timer = None
+
+    async def add(self, *reports: Dict[str, Any]):
+        for report in reports:
+            key = report.get('notification_id') or (report.get('provider_type'), report['provider_message_id'])
+            self._reports.pop(key, None)
+            self._reports[key] = report
+
+        if self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_periodically())
+
+        if len(self._reports) >= self.flush_size:
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Delivery report flush failed: {str(e)}")
+
+    async def flush(self) -> int:
+        async with self._lock:
+            if not self._reports:
+                return 0
+
+            pending, self._reports = self._reports, {}
+            try:
+                async with self.statemgr.transaction():
+                    rows = await self.statemgr.apply_status_reports(list(pending.values()))
+            except Exception:
+                # Keep newer reports that arrived meanwhile
+                self._reports = {**pending, **self._reports}
+                raise
+
+            return len(rows)
+
+    async def close(self):
+        if self._timer:
+            self._timer.cancel()
+            try:
+                await self._timer
+            except asyncio.CancelledError:
+                pass
+            self._timer = None
+
+        await self.flush()
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Delivery report flush failed: {str(e)}")
+
+
+# Process-wide delivery report buffer (used by the DLR callback endpoint)
+delivery_report_buffer = DeliveryReportBuffer()
@@ -2,11 +2,17 @@
 Commands for the RFX notification domain.
 """
 
-from fluvius.data import serialize_mapping
+from datetime import datetime, timezone
+
+from fluvius.data import serialize_mapping, timestamp
 
 from .domain import NotifyServiceDomain
 from . import datadef, logger, config
 from .types import NotificationChannelEnum
+from .preference import preference_resolver
+from .idempotency import idempotency_guard
+from .metrics import STAGE_DURATION
+from .digest import is_coalescible, prepare_digest
 from rfx_user import config as userconf
 
 
@@ -35,40 +41,93 @@ class SendNotification(Command):
     async def _process(self, agg, stm, payload):
         try:
             notification_payload = serialize_mapping(payload)
-            recipients = notification_payload.get("recipients") or []
-            notification_payload["recipients"] = recipients
-            template_key = notification_payload.get("template_key")
+            idempotency_key = notification_payload.get("idempotency_key")
+
+            if idempotency_key:
+                # A repeated key returns the first request's result without sending again;
+                # keys are scoped to the realm of the request
+                response = await idempotency_guard.run(
+                    idempotency_key,
+                    lambda: self._send(agg, notification_payload),
+                    scope=getattr(agg.get_context(), "realm", None),
+                )
+            else:
+                response = await self._send(agg, notification_payload)
 
-            context = {
-                key: notification_payload.get(key)
-                for key in ("tenant_id", "app_id", "locale")
-                if notification_payload.get(key) is not None
-            }
+            yield agg.create_response(response, _type="notify-service-response")
 
-            if template_key:
-                channel = NotificationChannelEnum(notification_payload["channel"])
-                template_data = notification_payload.get("template_data", {}) or {}
-                template_version = notification_payload.get("template_version")
+        except Exception as e:
+            logger.error(f"SendNotification failed: {e}")
+            yield agg.create_response(
+                {"status": "error", "error": str(e)}, _type="notify-service-response"
+            )
+            raise
 
-                if not recipients:
-                    raise ValueError("Recipients list cannot be empty")
+    async def _send(self, agg, notification_payload):
+        recipients = notification_payload.get("recipients") or []
+        notification_payload["recipients"] = recipients
+        template_key = notification_payload.get("template_key")
 
-                # Render template via rfx-template domain
-                context = agg.get_context()
-                template_client = getattr(context.service_proxy, config.TEMPLATE_CLIENT, None)
-                if not template_client:
-                    raise RuntimeError(f"Template service not found {config.TEMPLATE_CLIENT}")
+        # Drop opted-out recipients before any rendering or provider I/O
+        suppressed = []
+        if config.NOTIFY_PREFERENCE_CHECK_ENABLED and recipients:
+            recipients, suppressed = await preference_resolver.filter_recipients(
+                NotificationChannelEnum(notification_payload["channel"]), recipients
+            )
+            notification_payload["recipients"] = recipients
 
+            if not recipients:
+                logger.info(f"All {len(suppressed)} recipients opted out, nothing to send")
+                return {"status": "suppressed", "count": 0, "results": [], "suppressed": suppressed}
+
+        # Digest notifications wait for the end of their coalescing window
+        if not notification_payload.get("scheduled_at") and is_coalescible(notification_payload):
+            notification_payload = prepare_digest(notification_payload)
+
+        # Future scheduled_at: persist as PENDING and let the scheduler deliver.
+        # In outbox mode records are persisted as PENDING and delivered by workers.
+        if _is_deferred(notification_payload.get("scheduled_at")):
+            deliver = agg.schedule_notification
+        elif config.NOTIFY_DELIVERY_MODE == "outbox":
+            deliver = agg.enqueue_notification
+        else:
+            deliver = agg.send_notification
+
+        if template_key:
+            channel = NotificationChannelEnum(notification_payload["channel"])
+            template_data = notification_payload.get("template_data", {}) or {}
+            template_version = notification_payload.get("template_version")
+            recipient_data = notification_payload.get("recipient_data") or {}
+
+            if not recipients:
+                raise ValueError("Recipients list cannot be empty")
+
+            render_payload = {
+                "key": template_key,
+                "data": template_data,
+                "channel": channel.value,
+                "version": template_version,
+            }
+            # Resolve the tenant/app/locale variant of the template
+            for field in ("tenant_id", "app_id", "locale"):
+                if notification_payload.get(field) is not None:
+                    render_payload[field] = str(notification_payload[field])
+            if recipient_data:
+                # Personalized: one batch render, one item per recipient
+                render_payload["items"] = [recipient_data.get(recipient) or {} for recipient in recipients]
+
+            # Render template via rfx-template domain
+            context = agg.get_context()
+            template_client = getattr(context.service_proxy, config.TEMPLATE_CLIENT, None)
+            if not template_client:
+                raise RuntimeError(f"Template service not found {config.TEMPLATE_CLIENT}")
+
+            with STAGE_DURATION.time(stage="render", provider="rfx-template"):
                 response = await template_client.request(
                     "rfx-template:render-template",
                     command="render-template",
                     resource="template",
-                    payload={
-                        "key": template_key,
-                        "data": template_data,
-                        "channel": channel.value,
-                        "version": template_version,
-                    },
+                    payload=render_payload,
                     _headers={},
                     _context={
                         "audit": {
@@ -79,55 +138,65 @@ class SendNotification(Command):
                     },
                 )
 
-                # Extract rendered content from template-service-response
-                service_response = response.get("template-service-response", response)
-                rendered_body = service_response.get('body', '')
-                rendered_subject = service_response.get('subject')  # May be None
-
-                # Create notification payload for each recipient
-                results = []
-                for recipient in recipients:
-                    rendered_payload = {
-                        **notification_payload,
-                        "body": rendered_body,
-                        "recipients": [recipient],
-                    }
-                    if rendered_subject:
-                        rendered_payload["subject"] = rendered_subject
-
-                    # Remove template fields as we now have rendered content
-                    rendered_payload.pop("template_key", None)
-                    rendered_payload.pop("template_data", None)
-                    rendered_payload.pop("template_version", None)
-
-                    send_result = await agg.send_notification(data=rendered_payload)
-                    results.append(send_result)
-
-                send_result = {"count": len(results), "results": results}
-            else:
-                # Send notification (provider will create the record)
-                if not recipients:
-                    raise ValueError("Recipients list cannot be empty")
-                send_result = await agg.send_notification(data=notification_payload)
-
-            yield agg.create_response(
-                {
-                    "status": "success",
-                    "notification_id": send_result.get("notification_id"),
-                    "delivery_status": send_result.get("status"),
-                    "provider_message_id": send_result.get("provider_message_id"),
-                    "results": send_result.get("results"),
-                    "count": send_result.get("count"),
-                },
-                _type="notify-service-response",
-            )
+            # Extract rendered content from template-service-response
+            service_response = response.get("template-service-response", response)
+            rendered_body = service_response.get('body', '')
+            rendered_subject = service_response.get('subject')  # May be None
 
-        except Exception as e:
-            logger.error(f"SendNotification failed: {e}")
-            yield agg.create_response(
-                {"status": "error", "error": str(e)}, _type="notify-service-response"
-            )
-            raise
+            # Shared rendered content; personalized content (if any) is attached per recipient below
+            rendered_payload = {
+                **notification_payload,
+                "body": rendered_body,
+                "recipients": recipients,
+            }
+            if rendered_subject:
+                rendered_payload["subject"] = rendered_subject
+
+            if recipient_data:
+                rendered_items = service_response.get("items") or []
+                if len(rendered_items) != len(recipients):
+                    raise RuntimeError(
+                        f"Template service rendered {len(rendered_items)} items for {len(recipients)} recipients"
+                    )
+                rendered_payload["recipient_content"] = dict(zip(recipients, rendered_items))
+
+            # Remove template fields as we now have rendered content
+            rendered_payload.pop("recipient_data", None)
+            rendered_payload.pop("template_key", None)
+            rendered_payload.pop("template_data", None)
+            rendered_payload.pop("template_version", None)
+
+            send_result = await deliver(data=rendered_payload)
+            if "results" not in send_result:
+                send_result = {"count": 1, "results": [send_result]}
+        else:
+            # Send notification (provider will create the record)
+            if not recipients:
+                raise ValueError("Recipients list cannot be empty")
+            send_result = await deliver(data=notification_payload)
+
+        return {
+            "status": "success",
+            "notification_id": send_result.get("notification_id"),
+            "delivery_status": send_result.get("status"),
+            "provider_message_id": send_result.get("provider_message_id"),
+            "results": send_result.get("results"),
+            "count": send_result.get("count"),
+            "suppressed": suppressed,
+        }
+
+
+def _is_deferred(scheduled_at) -> bool:
+    if not scheduled_at:
+        return False
+
+    if isinstance(scheduled_at, str):
+        scheduled_at = datetime.fromisoformat(scheduled_at)
+
+    if scheduled_at.tzinfo is None:
+        scheduled_at = scheduled_at.replace(tzinfo=timezone.utc)
+
+    return scheduled_at > timestamp()
 
 
 class RetryNotification(Command):
@@ -208,6 +277,43 @@ class UpdateNotificationStatus(Command):
             raise
 
 
+class IngestDeliveryReports(Command):
+    """
+    Apply many provider delivery reports (DLRs) in one batch.
+    Replaces one update-notification-status command per report.
+    """
+
+    class Meta:
+        key = "ingest-delivery-reports"
+        resource_init = True
+        resources = ("notification",)
+        tags = ["notification", "status"]
+        auth_required = False  # Webhooks may not have user auth
+        policy_required = False
+
+    Data = datadef.DeliveryReportBatchPayload
+
+    async def _process(self, agg, stm, payload):
+        try:
+            data = serialize_mapping(payload)
+            result = await agg.ingest_delivery_reports(
+                provider_type=getattr(data["provider_type"], "value", data["provider_type"]),
+                reports=data.get("reports") or [],
+            )
+
+            yield agg.create_response(
+                {"status": "success", **result},
+                _type="notify-service-response",
+            )
+
+        except Exception as e:
+            logger.error(f"IngestDeliveryReports failed: {e}")
+            yield agg.create_response(
+                {"status": "error", "error": str(e)}, _type="notify-service-response"
+            )
+            raise
+
+
 # User Preference Commands
 
 
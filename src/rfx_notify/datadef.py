@@ -58,6 +58,10 @@ class SendNotificationPayload(DataModel):
     template_data: Dict[str, Any] = Field(
         default_factory=dict, description="Variables passed to the template renderer."
     )
+    recipient_data: Dict[str, Dict[str, Any]] = Field(
+        default_factory=dict,
+        description="Per-recipient template variables (keyed by recipient address) overriding template_data.",
+    )
     meta: Dict[str, Any] = Field(
         default_factory=dict,
         description="Provider-specific metadata such as from_email, cc, bcc, media_url, etc.",
@@ -68,6 +72,10 @@ class SendNotificationPayload(DataModel):
     max_retries: int = Field(
         3, description="Maximum number of retry attempts allowed if delivery fails."
     )
+    idempotency_key: Optional[str] = Field(
+        None,
+        description="Client key making retries safe: a repeated request returns the original result.",
+    )
 
 class NotificationStatusUpdatePayload(DataModel):
     """Payload for updating notification delivery status."""
@@ -87,6 +95,21 @@ class NotificationStatusUpdatePayload(DataModel):
     )
 
 
+class DeliveryReportBatchPayload(DataModel):
+    """Payload for ingesting many provider delivery reports at once."""
+
+    provider_type: ProviderTypeEnum = Field(
+        ..., description="Provider that issued the reports."
+    )
+    reports: List[Dict[str, Any]] = Field(
+        default_factory=list,
+        description=(
+            "Reports in the provider's format, or normalized as "
+            "{provider_message_id, status, error_message}."
+        ),
+    )
+
+
 class NotificationPreferencePayload(DataModel):
     """Payload for updating user notification preferences."""
 
@@ -0,0 +1,127 @@
+"""
+Notification digests - coalescing bursts per (recipient, channel)
+
+A notification tagged with NOTIFY_DIGEST_TAG is not delivered right away. It is
+persisted as PENDING with a `digest_key` and `scheduled_at` at the end of its
+coalescing window. Windows are aligned to multiples of the window length, so
+every notification for the same recipient that arrives within one window is
+due at the same time.
+
+When the scheduler claims due rows, rows sharing (recipient, channel, provider,
+digest_key) are merged: the first one is delivered with the combined content,
+the others are recorded with the same outcome and a pointer to it.
+"""
+import math
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Dict, List, Tuple
+
+from fluvius.data import timestamp
+
+from .helper import next_retry_at
+from .types import ContentTypeEnum, NotificationStatusEnum
+from . import config
+
+
+def is_coalescible(notification: Dict[str, Any]) -> bool:
+    return bool(config.NOTIFY_DIGEST_ENABLED) and config.NOTIFY_DIGEST_TAG in (notification.get("tags") or [])
+
+
+def prepare_digest(notification: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Assign the digest key and the end of the current coalescing window.
+    """
+    meta = notification.get("meta") or {}
+    window = int(meta.get("digest_window") or config.NOTIFY_DIGEST_WINDOW)
+    window_end = math.ceil(timestamp().timestamp() / window) * window
+
+    return {
+        **notification,
+        "digest_key": meta.get("digest_key") or notification.get("template_key") or config.NOTIFY_DIGEST_TAG,
+        "scheduled_at": datetime.fromtimestamp(window_end, tz=timezone.utc),
+    }
+
+
+def coalesce_entries(entries: List[Any]) -> Tuple[List[Any], Dict[Any, List[Any]]]:
+    """
+    Merge digest rows of the same recipient into one deliverable entry.
+
+    Returns:
+        (entries to deliver, {delivered entry id: coalesced entries})
+    """
+    groups: Dict[tuple, List[Any]] = {}
+    deliverable = []
+    for entry in entries:
+        digest_key = getattr(entry, "digest_key", None)
+        if not digest_key:
+            deliverable.append(entry)
+            continue
+
+        key = (entry.recipient_address, _enum_value(entry.channel), _enum_value(entry.provider_type), digest_key)
+        groups.setdefault(key, []).append(entry)
+
+    coalesced = {}
+    for group in groups.values():
+        if len(group) == 1:
+            deliverable.append(group[0])
+            continue
+
+        primary, *others = group
+        deliverable.append(_merge(primary, group))
+        coalesced[primary._id] = others
+
+    return deliverable, coalesced
+
+
+def coalesced_updates(results: List[Dict[str, Any]], coalesced: Dict[Any, List[Any]]) -> List[Dict[str, Any]]:
+    """
+    Updates giving coalesced rows the outcome of the entry they were merged into.
+    """
+    by_id = {result["notification_id"]: result for result in results}
+    updates = []
+    for primary_id, others in coalesced.items():
+        result = by_id.get(primary_id)
+        if result is None:
+            continue
+
+        status = result["status"]
+        for entry in others:
+            update = {
+                "_id": entry._id,
+                "status": status,
+                "provider_type": result.get("provider_type"),
+                "provider_message_id": result.get("provider_message_id"),
+                "provider_response": {"coalesced_into": str(primary_id)},
+            }
+            # Failed or deferred rows become due together with the merged one,
+            # so they are coalesced again on the next attempt
+            if status == NotificationStatusEnum.SENT.value:
+                update["sent_at"] = timestamp()
+            elif status == NotificationStatusEnum.FAILED.value:
+                update["failed_at"] = timestamp()
+                update["next_retry_at"] = next_retry_at(entry.retry_count, entry.max_retries)
+            elif status == NotificationStatusEnum.PENDING.value:
+                update["scheduled_at"] = result.get("scheduled_at")
+            updates.append(update)
+
+    return updates
+
+
+def _merge(primary: Any, group: List[Any]) -> Any:
+    html = _enum_value(primary.content_type) == ContentTypeEnum.HTML.value
+    separator = "\n<hr/>\n" if html else "\n\n----\n\n"
+
+    subjects = {entry.subject for entry in group if entry.subject}
+    if len(subjects) == 1:
+        subject = subjects.pop()
+    else:
+        subject = config.NOTIFY_DIGEST_SUBJECT.format(count=len(group))
+
+    merged = SimpleNamespace(**vars(primary))
+    merged.subject = subject
+    merged.body = separator.join(entry.body or "" for entry in group)
+    return merged
+
+
+def _enum_value(value):
+    return value.value if hasattr(value, "value") else value
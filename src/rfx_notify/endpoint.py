@@ -0,0 +1,40 @@
+from pipe import Pipe
+
+from .service import notification_service
+from .outbox import notification_outbox
+from .scheduler import notification_scheduler
+from .retry import notification_retry_engine
+from .retention import notification_retention
+from .batch import delivery_report_buffer
+from . import config
+
+
+@Pipe
+def configure_notify_service(app):
+    """Tie the shared notification service to the application lifecycle."""
+    if getattr(app.state, "notify_service_configured", False):
+        return app
+
+    app.state.notify_service = notification_service
+    app.state.notify_service_configured = True
+
+    if config.NOTIFY_SCHEDULER_ENABLED:
+        app.add_event_handler("startup", notification_scheduler.start)
+        app.add_event_handler("shutdown", notification_scheduler.stop)
+
+    if config.NOTIFY_RETRY_ENABLED:
+        app.add_event_handler("startup", notification_retry_engine.start)
+        app.add_event_handler("shutdown", notification_retry_engine.stop)
+
+    if config.NOTIFY_RETENTION_ENABLED:
+        app.add_event_handler("startup", notification_retention.start)
+        app.add_event_handler("shutdown", notification_retention.stop)
+
+    # Apply delivery reports still buffered
+    app.add_event_handler("shutdown", delivery_report_buffer.close)
+
+    # Close pooled SMTP connections and the Kannel HTTP client on shutdown
+    app.add_event_handler("shutdown", notification_service.close)
+    app.add_event_handler("shutdown", notification_outbox.close)
+
+    return app
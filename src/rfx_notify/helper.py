@@ -0,0 +1,30 @@
+import random
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fluvius.data import timestamp
+
+from . import config
+
+
+def retry_backoff_seconds(retry_count: int) -> float:
+    """
+    Exponential backoff with jitter for the next delivery attempt.
+
+    The delay doubles with every retry (capped at NOTIFY_RETRY_MAX_DELAY) and
+    the actual wait is drawn from the upper half of it, so recipients that
+    failed together do not retry in lockstep.
+    """
+    delay = min(
+        config.NOTIFY_RETRY_MAX_DELAY,
+        config.NOTIFY_RETRY_BASE_DELAY * (2 ** max(0, retry_count)),
+    )
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def next_retry_at(retry_count: int, max_retries: Optional[int]) -> Optional[datetime]:
+    """Time of the next automatic retry, or None when retries are exhausted."""
+    if retry_count >= (max_retries or 0):
+        return None
+
+    return timestamp() + timedelta(seconds=retry_backoff_seconds(retry_count))
@@ -0,0 +1,164 @@
+"""
+Idempotent send-notification
+
+A request carrying `idempotency_key` is executed at most once per scope (the
+realm of the request): the key is claimed in the unpartitioned
+`notification_idempotency` table before sending, and the response is stored
+there afterwards. A repeated request returns the stored response without
+rendering or provider I/O.
+
+Lookups go through a small in-process LRU of recent results first, then the
+database. Concurrent requests with the same key in one process share a single
+execution; across processes the unique (scope, key) constraint lets only one
+of them claim the key, and the others return the stored result, or fail while
+the first request is still running. A request that raises releases its claim,
+so it may be repeated. A request that sent but could not store its response
+completes the claim with a marker instead, so it is never sent twice.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from .state import TaskStateManager
+from . import config, logger
+
+
+class IdempotencyGuard:
+    """
+    Run a send at most once per (scope, idempotency key).
+    """
+
+    # Shared by every concurrent send-notification request
+    statemgr = TaskStateManager()
+
+    def __init__(self, *, max_entries: Optional[int] = None, ttl: Optional[float] = None):
+        self.max_entries = max_entries or config.NOTIFY_IDEMPOTENCY_CACHE_SIZE
+        self.ttl = ttl or config.NOTIFY_IDEMPOTENCY_CACHE_TTL
+        self.claim_timeout = config.NOTIFY_IDEMPOTENCY_CLAIM_TIMEOUT
+        self._recent: "OrderedDict[Tuple[str, str], tuple]" = OrderedDict()  # (scope, key) -> (expires_at, result)
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+    async def run(
+        self,
+        key: str,
+        send: Callable[[], Awaitable[Dict[str, Any]]],
+        scope: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        cache_key = (scope or "", key)
+        cached = self._get_recent(cache_key)
+        if cached is not None:
+            return {**cached, "replayed": True}
+
+        inflight = self._inflight.get(cache_key)
+        if inflight is not None:
+            result = await asyncio.shield(inflight)
+            return {**result, "replayed": True}
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[cache_key] = future
+        try:
+            result, replayed = await self._run_once(cache_key, send)
+
+            self._remember(cache_key, result)
+            future.set_result(result)
+            return {**result, "replayed": True} if replayed else result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception retrieved when nobody else is waiting on it
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(cache_key, None)
+
+    async def _run_once(self, cache_key: Tuple[str, str], send) -> Tuple[Dict[str, Any], bool]:
+        """
+        Returns:
+            (result, replayed)
+        """
+        scope, key = cache_key
+        stored = await self._load(scope, key)
+        if stored is not None:
+            return stored, True
+
+        async with self.statemgr.transaction():
+            claimed = await self.statemgr.claim_idempotency_key(scope, key, self.claim_timeout)
+
+        if not claimed:
+            # Another process holds the key
+            stored = await self._load(scope, key)
+            if stored is None:
+                raise ValueError(f"A request with idempotency key {key} is still in progress")
+
+            logger.info(f"Idempotency key {key} was stored concurrently, returning stored result")
+            return stored, True
+
+        try:
+            result = await send()
+        except BaseException:
+            await self._release(scope, key)
+            raise
+
+        await self._complete(scope, key, result)
+        return result, False
+
+    async def _load(self, scope: str, key: str) -> Optional[Dict[str, Any]]:
+        async with self.statemgr.transaction():
+            return await self.statemgr.load_idempotency_result(scope, key)
+
+    async def _complete(self, scope: str, key: str, result: Dict[str, Any]):
+        """
+        Store the response of a sent request. The notification went out, so a
+        failure is logged rather than raised, and the claim is completed with a
+        marker so it cannot be retaken after the claim timeout and sent again.
+        """
+        try:
+            async with self.statemgr.transaction():
+                await self.statemgr.store_idempotency_result(scope, key, result)
+            return
+        except Exception as e:
+            logger.error(f"Failed to store the result of idempotency key {key}: {str(e)}")
+
+        marker = {"status": result.get("status"), "result_unavailable": True}
+        try:
+            async with self.statemgr.transaction():
+                await self.statemgr.store_idempotency_result(scope, key, marker)
+        except Exception as e:
+            logger.error(
+                f"Failed to complete idempotency key {key}, "
+                f"a repeated request may send again after the claim timeout: {str(e)}"
+            )
+
+    async def _release(self, scope: str, key: str):
+        try:
+            async with self.statemgr.transaction():
+                await self.statemgr.release_idempotency_key(scope, key)
+        except Exception as e:
+            # The claim expires after NOTIFY_IDEMPOTENCY_CLAIM_TIMEOUT
+            logger.error(f"Failed to release idempotency key {key}: {str(e)}")
+
+    def _get_recent(self, cache_key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        entry = self._recent.get(cache_key)
+        if entry is None:
+            return None
+
+        expires_at, result = entry
+        if expires_at <= time.monotonic():
+            del self._recent[cache_key]
+            return None
+
+        self._recent.move_to_end(cache_key)
+        return result
+
+    def _remember(self, cache_key: Tuple[str, str], result: Dict[str, Any]):
+        self._recent[cache_key] = (time.monotonic() + self.ttl, result)
+        self._recent.move_to_end(cache_key)
+        while len(self._recent) > self.max_entries:
+            self._recent.popitem(last=False)
+
+
+# Process-wide guard (shared LRU)
+idempotency_guard = IdempotencyGuard()
@@ -0,0 +1,223 @@
+"""
+Notification pipeline metrics
+
+In-process counters, gauges and histograms for the send path, exposed in the
+Prometheus text format by the `.metrics` query endpoint. Other backends
+(StatsD, OpenTelemetry, ...) can subscribe with `registry.add_hook`; every
+observation is passed to the hooks as ``(kind, name, value, labels)``.
+
+Stages timed by `STAGE_DURATION`:
+
+- render: template rendering in send-notification
+- db_write: persisting records, results and delivery logs
+- smtp_connect: opening (connect + login) a pooled SMTP connection
+- smtp_data: transmitting one message over SMTP
+- kannel_http: one Kannel sendsms request
+- deliver: one full provider delivery attempt
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from . import logger
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((key, str(getattr(value, "value", value))) for key, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+    return "{" + body + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+
+    def _emit(self, value: float, labels: Dict[str, Any]):
+        self.registry._emit(self.kind, self.name, value, labels)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        self._emit(amount, labels)
+
+    def samples(self):
+        for key, value in list(self._values.items()):
+            yield self.name, key, value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            value = self._values[key] = self._values.get(key, 0) + amount
+        self._emit(value, labels)
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+        self._emit(value, labels)
+
+    @contextmanager
+    def track(self, **labels):
+        """Count the enclosed block as in flight."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def samples(self):
+        for key, value in list(self._values.items()):
+            yield self.name, key, value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(*args)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> (bucket counts, sum, count)
+        self._values: Dict[LabelKey, List[Any]] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+        self._emit(value, labels)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the enclosed block in seconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        for key, (counts, total, count) in list(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", key + (("le", repr(bound)),), cumulative
+            yield f"{self.name}_bucket", key + (("le", "+Inf"),), count
+            yield f"{self.name}_sum", key, total
+            yield f"{self.name}_count", key, count
+
+
+class MetricsRegistry:
+    """
+    Named metrics of this process plus the hooks forwarding observations.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._hooks: List[Callable[[str, str, float, Dict[str, Any]], None]] = []
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self._register(Counter, name, documentation)
+
+    def gauge(self, name: str, documentation: str) -> Gauge:
+        return self._register(Gauge, name, documentation)
+
+    def histogram(self, name: str, documentation: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, buckets=buckets)
+
+    def add_hook(self, hook: Callable[[str, str, float, Dict[str, Any]], None]):
+        """Forward every observation to ``hook(kind, name, value, labels)``."""
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook):
+        if hook in self._hooks:
+            self._hooks.remove(hook)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, key, value in metric.samples():
+                lines.append(f"{name}{_format_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def _register(self, cls, name: str, documentation: str, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(self, name, documentation, **kwargs)
+        return metric
+
+    def _emit(self, kind: str, name: str, value: float, labels: Dict[str, Any]):
+        for hook in self._hooks:
+            try:
+                hook(kind, name, value, labels)
+            except Exception as e:
+                logger.warning(f"Metrics hook {hook!r} failed: {e}")
+
+
+# Process-wide registry and the pipeline's metrics
+registry = MetricsRegistry()
+
+STAGE_DURATION = registry.histogram(
+    "rfx_notify_stage_duration_seconds",
+    "Duration of notification pipeline stages by stage and provider.",
+)
+SEND_DURATION = registry.histogram(
+    "rfx_notify_send_duration_seconds",
+    "Duration of NotificationService.send_notification by provider.",
+)
+NOTIFICATIONS = registry.counter(
+    "rfx_notify_notifications_total",
+    "Delivery attempts by provider and resulting status.",
+)
+IN_FLIGHT = registry.gauge(
+    "rfx_notify_in_flight",
+    "Operations in progress by kind (send, delivery) and provider.",
+)
@@ -0,0 +1,232 @@
+"""
+Notification Outbox - durable hand-off between the API and delivery workers
+
+In outbox mode `send-notification` only persists PENDING notification rows
+and publishes their ids to an arq queue. Workers (see `rfx_notify.worker`)
+claim a row with a lease, deliver it through `NotificationService` and record
+the outcome. The database row is the source of truth:
+
+- A claim atomically moves a row from PENDING to PROCESSING and sets
+  `lease_expires_at` (the visibility timeout).
+- Rows whose lease expired, or PENDING rows older than the visibility timeout,
+  are re-published by `recover`. Delivery is therefore at-least-once; the
+  claim guard keeps duplicate jobs from delivering the same row concurrently.
+- Rows with `scheduled_at` are left to `rfx_notify.scheduler`.
+- Each priority lane has its own queue (see `rfx_notify.priority`), so a bulk
+  low-priority send never sits in front of a verification code.
+"""
+from typing import Any, Dict, List, Optional
+
+from arq import create_pool
+from arq.connections import ArqRedis, RedisSettings
+from rfx_schema.rfx_notify import SCHEMA
+
+from .priority import LANES, NORMAL, lane_of, outbox_queue_name
+from .service import notification_service
+from .state import TaskStateManager
+from .types import NotificationStatusEnum
+from . import config, logger
+
+DELIVER_JOB = "deliver_notification"
+
+
+class NotificationOutbox:
+    """
+    Persist-then-publish queue for notification delivery.
+    """
+
+    # Shared by the concurrent deliver_notification jobs of a worker
+    statemgr = TaskStateManager()
+
+    def __init__(
+        self,
+        *,
+        redis_url: Optional[str] = None,
+        queue_name: Optional[str] = None,
+        visibility_timeout: Optional[int] = None,
+    ):
+        self.redis_url = redis_url or config.NOTIFY_OUTBOX_REDIS_URL
+        self.queue_name = queue_name or config.NOTIFY_OUTBOX_QUEUE_NAME
+        self.visibility_timeout = visibility_timeout or config.NOTIFY_OUTBOX_VISIBILITY_TIMEOUT
+        self._redis: Optional[ArqRedis] = None
+
+    async def get_redis(self) -> ArqRedis:
+        if self._redis is None:
+            self._redis = await create_pool(
+                RedisSettings.from_dsn(self.redis_url),
+                default_queue_name=self.queue_name,
+            )
+        return self._redis
+
+    async def enqueue(self, notification: Any) -> Dict[str, Any]:
+        """
+        Persist PENDING records for every recipient and publish them to the workers.
+
+        Returns:
+            {"count": ..., "results": [...]} in recipient order
+        """
+        entries = await notification_service.create_pending(notification)
+        await self.publish_entries(entries)
+
+        results = [
+            {
+                "notification_id": entry._id,
+                "status": NotificationStatusEnum.PENDING.value,
+                "provider_message_id": None,
+                "provider_type": _enum_value(entry.provider_type),
+            }
+            for entry in entries
+        ]
+        return {"count": len(results), "results": results}
+
+    async def publish_entries(self, entries: List[Any], *, dedupe: bool = True):
+        """
+        Publish delivery jobs for notification records (or rows carrying
+        `_id` and `priority`) to the queue of their priority lane.
+        """
+        lanes: Dict[str, List[Any]] = {}
+        for entry in entries:
+            lanes.setdefault(lane_of(entry.priority), []).append(entry._id)
+
+        for lane, notification_ids in lanes.items():
+            await self.publish(notification_ids, lane=lane, dedupe=dedupe)
+
+    async def publish(self, notification_ids: List[Any], *, lane: str = NORMAL, dedupe: bool = True):
+        """
+        Publish delivery jobs to a lane queue. First publication uses the
+        notification id as the job id so a retried publish does not queue the
+        same row twice.
+        """
+        redis = await self.get_redis()
+        queue_name = outbox_queue_name(lane, self.queue_name)
+        for notification_id in notification_ids:
+            await redis.enqueue_job(
+                DELIVER_JOB,
+                str(notification_id),
+                _job_id=f"{DELIVER_JOB}:{notification_id}" if dedupe else None,
+                _queue_name=queue_name,
+            )
+
+    async def claim(self, notification_id: Any) -> Optional[Any]:
+        """
+        Lease a notification for delivery.
+
+        Returns:
+            The notification record, or None when it is no longer claimable
+            (already delivered, or leased by another worker).
+        """
+        async with self.statemgr.transaction():
+            rows = await self.statemgr.native_query(
+                f"""
+                UPDATE "{SCHEMA}"."notification"
+                   SET status = 'PROCESSING'::"{SCHEMA}".notificationstatusenum,
+                       lease_expires_at = now() + make_interval(secs => $2),
+                       _updated = now()
+                 WHERE _id = $1
+                   AND _created > now() - make_interval(days => $3)
+                   AND (
+                        status = 'PENDING'::"{SCHEMA}".notificationstatusenum
+                        OR (
+                            status = 'PROCESSING'::"{SCHEMA}".notificationstatusenum
+                            AND lease_expires_at < now()
+                        )
+                   )
+                RETURNING _id
+                """,
+                notification_id,
+                self.visibility_timeout,
+                config.NOTIFY_CLAIM_WINDOW_DAYS,
+            )
+
+            if not rows:
+                return None
+
+            return await self.statemgr.fetch("notification", notification_id)
+
+    async def recover(self, limit: Optional[int] = None) -> int:
+        """
+        Re-publish rows that were never picked up or whose worker lease expired.
+        """
+        async with self.statemgr.transaction():
+            rows = await self.statemgr.native_query(
+                f"""
+                SELECT _id, priority
+                  FROM "{SCHEMA}"."notification"
+                 WHERE _created > now() - make_interval(days => $3)
+                   AND scheduled_at IS NULL
+                   AND (
+                        (
+                            status = 'PENDING'::"{SCHEMA}".notificationstatusenum
+                            AND _created < now() - make_interval(secs => $1)
+                        )
+                        OR (
+                            status = 'PROCESSING'::"{SCHEMA}".notificationstatusenum
+                            AND lease_expires_at < now()
+                        )
+                   )
+                 ORDER BY _created
+                 LIMIT $2
+                """,
+                self.visibility_timeout,
+                limit or config.NOTIFY_OUTBOX_RECOVERY_BATCH_SIZE,
+                config.NOTIFY_CLAIM_WINDOW_DAYS,
+            )
+
+        if rows:
+            logger.warning(f"Re-publishing {len(rows)} stalled outbox notifications")
+            await self.publish_entries(rows, dedupe=False)
+
+        return len(rows)
+
+    async def stats(self) -> Dict[str, Any]:
+        """
+        Queue depth for monitoring: queued jobs plus PENDING/PROCESSING rows.
+        """
+        async with self.statemgr.transaction():
+            rows = await self.statemgr.native_query(
+                f"""
+                SELECT count(*) FILTER (
+                           WHERE status = 'PENDING'::"{SCHEMA}".notificationstatusenum
+                       ) AS pending,
+                       count(*) FILTER (
+                           WHERE status = 'PROCESSING'::"{SCHEMA}".notificationstatusenum
+                       ) AS processing,
+                       count(*) FILTER (
+                           WHERE status = 'PROCESSING'::"{SCHEMA}".notificationstatusenum
+                             AND lease_expires_at < now()
+                       ) AS expired_leases
+                  FROM "{SCHEMA}"."notification"
+                 WHERE status IN (
+                        'PENDING'::"{SCHEMA}".notificationstatusenum,
+                        'PROCESSING'::"{SCHEMA}".notificationstatusenum
+                 )
+                """
+            )
+        row = rows[0]
+
+        redis = await self.get_redis()
+        queued_by_lane = {
+            lane: await redis.zcard(outbox_queue_name(lane, self.queue_name))
+            for lane in LANES
+        }
+
+        return {
+            "queued_jobs": sum(queued_by_lane.values()),
+            "queued_by_lane": queued_by_lane,
+            "pending": row.pending,
+            "processing": row.processing,
+            "expired_leases": row.expired_leases,
+        }
+
+    async def close(self):
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+
+def _enum_value(value):
+    return value.value if hasattr(value, "value") else value
+
+
+# Process-wide outbox instance (one Redis pool per process)
+notification_outbox = NotificationOutbox()
@@ -0,0 +1,64 @@
+"""
+Periodic background tasks
+
+A `PeriodicTask` calls `run_once` every `poll_interval` seconds. Inside the API
+process it runs in the background between `start()` and `stop()` (see
+`configure_notify_service`); the arq worker calls `run_once` from its cron
+jobs instead.
+"""
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from .state import NotifyStateManager
+from . import logger
+
+
+class PeriodicTask(ABC):
+    """
+    Base of the scheduler, retry engine and retention tasks.
+    """
+
+    label = "periodic"
+
+    def __init__(self, *, poll_interval: float):
+        self.statemgr = NotifyStateManager(None)
+        self.poll_interval = poll_interval
+        self._task: Optional[asyncio.Task] = None
+
+    @abstractmethod
+    async def run_once(self) -> int:
+        """
+        One run of the task.
+
+        Returns:
+            Number of items processed
+        """
+        pass
+
+    async def run_forever(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Periodic {self.label} run failed: {e}")
+
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        """Start running in the background of the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self):
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
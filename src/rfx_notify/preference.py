@@ -0,0 +1,183 @@
+"""
+Preference resolution for the send pipeline
+
+With NOTIFY_PREFERENCE_CHECK_ENABLED (off by default), recipients that opted
+out of the channel (`enabled = false` or `opt_in = false` on a matching
+`notification_preference`) are dropped before anything is rendered or handed
+to a provider. Preferences are matched on the channel's address column and
+loaded for all recipients at once.
+
+With NOTIFY_PREFERENCE_CACHE_TTL set, results, including "no preference on
+record", are cached per (channel, address) for that many seconds, keeping the
+NOTIFY_PREFERENCE_CACHE_MAX_ENTRIES most recently used. `preference-updated`
+invalidates the affected entries in this process; other processes converge
+within the TTL.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .state import TaskStateManager
+from .types import NotificationChannelEnum
+from . import config
+
+# Preference column holding the recipient address for each channel
+ADDRESS_FIELDS = {
+    NotificationChannelEnum.EMAIL: "email_address",
+    NotificationChannelEnum.SMS: "phone_number",
+    NotificationChannelEnum.PUSH: "device_token",
+}
+
+
+class PreferenceResolver:
+    """
+    Bulk opt-out lookup with a TTL/LRU cache keyed by (channel, address).
+    A non-positive ttl disables the cache.
+    """
+
+    # Shared by every concurrent send
+    statemgr = TaskStateManager()
+
+    def __init__(self, *, ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        self.ttl = ttl if ttl is not None else config.NOTIFY_PREFERENCE_CACHE_TTL
+        self.max_entries = max_entries or config.NOTIFY_PREFERENCE_CACHE_MAX_ENTRIES
+        # (channel, address) -> (expires_at, opted_out, user_id), least recently used first
+        self._cache: "OrderedDict[Tuple[str, str], Tuple[float, bool, Any]]" = OrderedDict()
+        self._user_keys: Dict[Any, Set[Tuple[str, str]]] = {}
+
+    async def filter_recipients(
+        self,
+        channel: NotificationChannelEnum,
+        recipients: List[str],
+    ) -> Tuple[List[str], List[str]]:
+        """
+        Split recipients into (allowed, suppressed), preserving order.
+        Channels without an address column are not filtered.
+        """
+        field = ADDRESS_FIELDS.get(channel)
+        if field is None or not recipients:
+            return list(recipients), []
+
+        now = time.monotonic()
+        opted_out: Dict[str, bool] = {}
+        missing = []
+        for recipient in dict.fromkeys(recipients):
+            key = (channel.value, recipient)
+            cached = self._cache.get(key)
+            if cached is None or cached[0] <= now:
+                missing.append(recipient)
+            else:
+                self._cache.move_to_end(key)
+                opted_out[recipient] = cached[1]
+
+        if missing:
+            opted_out.update(await self._load(channel, field, missing, now))
+
+        allowed, suppressed = [], []
+        for recipient in recipients:
+            (suppressed if opted_out.get(recipient) else allowed).append(recipient)
+
+        return allowed, suppressed
+
+    def invalidate(
+        self,
+        *,
+        user_id: Any = None,
+        channel: Any = None,
+        addresses: Iterable[Optional[str]] = (),
+    ):
+        """
+        Drop cached entries of a user and of the given addresses.
+        """
+        keys = set(self._user_keys.pop(user_id, ())) if user_id is not None else set()
+
+        channel_value = getattr(channel, "value", channel)
+        channels = [channel_value] if channel_value else [c.value for c in ADDRESS_FIELDS]
+        keys.update(
+            (value, address)
+            for value in channels
+            for address in addresses
+            if address
+        )
+
+        for key in keys:
+            self._drop(key)
+
+    def clear(self):
+        self._cache.clear()
+        self._user_keys.clear()
+
+    async def _load(
+        self,
+        channel: NotificationChannelEnum,
+        field: str,
+        addresses: List[str],
+        now: float,
+    ) -> Dict[str, bool]:
+        """
+        Look up the preferences of `addresses` and cache them.
+
+        Returns:
+            address -> opted out
+        """
+        found: Dict[str, Tuple[bool, Any]] = {}
+        chunk_size = config.NOTIFY_PREFERENCE_LOOKUP_CHUNK_SIZE
+
+        async with self.statemgr.transaction():
+            for offset in range(0, len(addresses), chunk_size):
+                rows = await self.statemgr.find_all(
+                    "notification_preference",
+                    where={
+                        "channel": channel.value,
+                        f"{field}.in": addresses[offset:offset + chunk_size],
+                    },
+                )
+                for row in rows:
+                    opted_out = row.enabled is False or row.opt_in is False
+                    address = getattr(row, field)
+                    previous = found.get(address, (False, None))
+                    found[address] = (previous[0] or opted_out, row.user_id)
+
+        if self.ttl > 0:
+            self._evict(now, len(addresses))
+
+            expires_at = now + self.ttl
+            for address in addresses:
+                opted_out, user_id = found.get(address, (False, None))
+                key = (channel.value, address)
+                self._drop(key)
+                self._cache[key] = (expires_at, opted_out, user_id)
+                if user_id is not None:
+                    self._user_keys.setdefault(user_id, set()).add(key)
+
+        return {address: found.get(address, (False, None))[0] for address in addresses}
+
+    def _evict(self, now: float, incoming: int):
+        """
+        Make room for `incoming` entries: drop expired entries, then the least
+        recently used ones.
+        """
+        if len(self._cache) + incoming <= self.max_entries:
+            return
+
+        expired = [key for key, (expires_at, _, _) in self._cache.items() if expires_at <= now]
+        for key in expired:
+            self._drop(key)
+
+        while self._cache and len(self._cache) + incoming > self.max_entries:
+            self._drop(next(iter(self._cache)))
+
+    def _drop(self, key: Tuple[str, str]):
+        cached = self._cache.pop(key, None)
+        if cached is None or cached[2] is None:
+            return
+
+        user_keys = self._user_keys.get(cached[2])
+        if user_keys is not None:
+            user_keys.discard(key)
+            if not user_keys:
+                del self._user_keys[cached[2]]
+
+
+# Process-wide resolver (shared cache)
+preference_resolver = PreferenceResolver()
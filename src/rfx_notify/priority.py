@@ -0,0 +1,174 @@
+"""
+Priority lanes for notification delivery
+
+Every notification runs in one of three lanes derived from its `priority`
+(URGENT shares the HIGH lane). Lanes are kept apart at each point where
+traffic queues up:
+
+- In-process: `PriorityGate` hands out a provider's delivery slots. Each lane
+  has its own concurrency limit, and free slots go to waiting lanes either
+  strictly by priority or by weighted round-robin (NOTIFY_PRIORITY_SCHEDULING).
+  Slots are taken before the provider's rate-limit token, so a high-priority
+  send waits for the next slot given to its lane, never behind a whole bulk
+  send.
+- Outbox: each lane has its own arq queue (`outbox_queue_name`) served by its
+  own worker settings (see `rfx_notify.worker`).
+- Scheduler and retry claims are ordered by lane.
+"""
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Optional
+
+from .types import NotificationPriorityEnum
+from . import config
+
+HIGH = "HIGH"
+NORMAL = "NORMAL"
+LOW = "LOW"
+
+# Lanes in precedence order
+LANES = (HIGH, NORMAL, LOW)
+
+_LANE_OF_PRIORITY = {
+    NotificationPriorityEnum.URGENT.value: HIGH,
+    NotificationPriorityEnum.HIGH.value: HIGH,
+    NotificationPriorityEnum.NORMAL.value: NORMAL,
+    NotificationPriorityEnum.LOW.value: LOW,
+}
+
+
+def lane_of(priority: Any) -> str:
+    """Lane of a priority (enum, value or None)."""
+    return _LANE_OF_PRIORITY.get(getattr(priority, "value", priority), NORMAL)
+
+
+def outbox_queue_name(lane: str, base: Optional[str] = None) -> str:
+    """arq queue of a lane; the NORMAL lane keeps the base queue name."""
+    base = base or config.NOTIFY_OUTBOX_QUEUE_NAME
+    return base if lane == NORMAL else f"{base}:{lane.lower()}"
+
+
+def lane_sql_rank(column: str = "priority") -> str:
+    """SQL expression ordering rows by lane (0 = HIGH lane first)."""
+    return (
+        f"CASE {column}::text"
+        f" WHEN 'URGENT' THEN 0 WHEN 'HIGH' THEN 0"
+        f" WHEN 'LOW' THEN 2 ELSE 1 END"
+    )
+
+
+class PriorityGate:
+    """
+    Hands out ``capacity`` delivery slots across priority lanes.
+
+    A lane never holds more than its own limit. When a slot frees up it goes to
+    the highest waiting lane (strict) or to the lane picked by smooth weighted
+    round-robin over the waiting lanes (weighted), so low-priority traffic
+    keeps a share without delaying high-priority sends.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        *,
+        lane_limits: Optional[Dict[str, int]] = None,
+        weights: Optional[Dict[str, int]] = None,
+        strict: Optional[bool] = None,
+    ):
+        lane_limits = lane_limits or config.NOTIFY_PRIORITY_LANE_CONCURRENCY
+        weights = weights or config.NOTIFY_PRIORITY_WEIGHTS
+
+        self.capacity = max(1, capacity)
+        self.lane_limits = {lane: max(1, lane_limits.get(lane, self.capacity)) for lane in LANES}
+        self.weights = {lane: max(1, weights.get(lane, 1)) for lane in LANES}
+        self.strict = config.NOTIFY_PRIORITY_SCHEDULING == "strict" if strict is None else strict
+
+        self._active = 0
+        self._lane_active = {lane: 0 for lane in LANES}
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {lane: deque() for lane in LANES}
+        self._current = {lane: 0 for lane in LANES}
+
+    @asynccontextmanager
+    async def slot(self, priority: Any):
+        lane = lane_of(priority)
+        await self._acquire(lane)
+        try:
+            yield
+        finally:
+            self._release(lane)
+
+    async def _acquire(self, lane: str):
+        # Whenever a slot is free no eligible waiter is left (see _wake), so
+        # taking it directly cannot jump the queue
+        if not self._waiters[lane] and self._can_run(lane):
+            self._grant(lane)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[lane].append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just before the cancellation: give the slot back
+                self._release(lane)
+            else:
+                self._waiters[lane].remove(future)
+            raise
+
+    def _can_run(self, lane: str) -> bool:
+        return self._active < self.capacity and self._lane_active[lane] < self.lane_limits[lane]
+
+    def _grant(self, lane: str):
+        self._active += 1
+        self._lane_active[lane] += 1
+
+    def _release(self, lane: str):
+        self._active -= 1
+        self._lane_active[lane] -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._active < self.capacity:
+            lane = self._next_lane()
+            if lane is None:
+                return
+
+            self._grant(lane)
+            self._waiters[lane].popleft().set_result(None)
+
+    def _next_lane(self) -> Optional[str]:
+        eligible = [
+            lane for lane in LANES
+            if self._waiters[lane] and self._lane_active[lane] < self.lane_limits[lane]
+        ]
+        if not eligible:
+            return None
+
+        if self.strict or len(eligible) == 1:
+            return eligible[0]
+
+        # Smooth weighted round-robin over the lanes that have waiters
+        total = 0
+        for lane in eligible:
+            self._current[lane] += self.weights[lane]
+            total += self.weights[lane]
+
+        chosen = max(eligible, key=lambda lane: self._current[lane])
+        self._current[chosen] -= total
+        return chosen
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "active": self._active,
+            "lanes": {
+                lane: {
+                    "active": self._lane_active[lane],
+                    "waiting": len(self._waiters[lane]),
+                    "limit": self.lane_limits[lane],
+                }
+                for lane in LANES
+            },
+        }
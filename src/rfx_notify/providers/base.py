@@ -1,13 +1,31 @@
 """
 Base notification provider interface
 """
+import asyncio
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
-from ..state import NotifyStateManager
+from datetime import timedelta
+from typing import Dict, Any, Optional, List, Callable, Awaitable, Tuple
 
+from fluvius.data import UUID_GENR, serialize_mapping, timestamp
+
+from ..batch import DeliveryBatchWriter
+from ..helper import next_retry_at
+from ..metrics import IN_FLIGHT, NOTIFICATIONS, STAGE_DURATION
+from ..state import TaskStateManager
+from ..types import NotificationStatusEnum
 from .. import logger, config
 
 
+# Statuses a delivery report may move a SENT notification to
+REPORTABLE_STATUSES = {
+    NotificationStatusEnum.DELIVERED.value,
+    NotificationStatusEnum.FAILED.value,
+    NotificationStatusEnum.REJECTED.value,
+    NotificationStatusEnum.BOUNCED.value,
+}
+
+
 class NotificationProviderBase(ABC):
     """
     Abstract base class for all notification providers.
@@ -17,6 +35,10 @@ class NotificationProviderBase(ABC):
     __CONFIG_CLS__ = None
     name = None
 
+    # Providers are shared process-wide (see `notification_service`), so each
+    # task, including those spawned by `_fan_out`, gets its own state manager
+    statemgr = TaskStateManager()
+
     def __init__(self, provider_config: Optional[Any] = None):
         """
         Base providers accept configuration explicitly on init.
@@ -25,7 +47,7 @@ class NotificationProviderBase(ABC):
         if provider_config is None:
             provider_config = self.build_config()
         self.provider_config = self._init_config_model(provider_config)
-        self.statemgr = NotifyStateManager(None)
+        self.throttle = None  # ProviderThrottle, attached by NotificationService
 
     def __init_subclass__(cls):
         if not getattr(cls, "name", None):
@@ -75,17 +97,56 @@ class NotificationProviderBase(ABC):
         """
         pass
 
-    @abstractmethod
     async def send(self, notification: Any) -> Dict[str, Any]:
         """
         Send a notification through this provider.
 
+        Each recipient gets its own notification record and delivery attempt.
+        Recipients are processed one at a time unless `get_send_concurrency()`
+        allows more (SMTP_SEND_CONCURRENCY, KANNEL_SEND_CONCURRENCY).
+
         Args:
             notification: Notification model or payload data.
 
+        Returns:
+            The per-recipient result for a single recipient, otherwise
+            {"count": ..., "results": [...]} with results in recipient order.
+        """
+        recipients = self._get_recipients(notification)
+
+        if len(recipients) == 1:
+            return await self._send_to_recipient(notification, recipients[0], is_bulk=False)
+
+        entries = await self.create_entries(notification, recipients)
+        results = await self.deliver_entries(entries)
+        return {"count": len(results), "results": results}
+
+    async def deliver_entries(self, entries: List[Any]) -> List[Dict[str, Any]]:
+        """
+        Deliver already persisted notification records (status PROCESSING).
+
+        Final statuses and delivery logs are written through a DeliveryBatchWriter,
+        so the number of commits scales with batches rather than recipients.
+        """
+        async with DeliveryBatchWriter(self.statemgr, provider=self.provider_type.value) as writer:
+            return await self._fan_out(
+                entries,
+                lambda entry: self._deliver_entry(entry, writer),
+            )
+
+    @abstractmethod
+    async def _deliver(self, entry: Any, recipient: str) -> Dict[str, Any]:
+        """
+        Deliver a single notification record to one recipient.
+
+        Args:
+            entry: Persisted notification record (status PROCESSING)
+            recipient: Recipient address
+
         Returns:
             Dictionary containing:
                 - status: NotificationStatusEnum
+                - provider_type: ProviderTypeEnum
                 - provider_message_id: External provider's message ID
                 - response: Full provider response
                 - error: Error message if failed
@@ -115,6 +176,12 @@ class NotificationProviderBase(ABC):
         """
         pass
 
+    async def close(self):
+        """
+        Release long-lived resources (connection pools, HTTP clients) held by the provider.
+        """
+        pass
+
     @property
     @abstractmethod
     def provider_type(self):
@@ -124,6 +191,31 @@ class NotificationProviderBase(ABC):
         """
         pass
 
+    def parse_delivery_report(self, report: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Normalize a delivery report received from the provider.
+
+        Reports carrying ``notification_id`` are matched on the notification
+        itself, others on ``provider_message_id``.
+
+        Returns:
+            {"notification_id", "provider_message_id", "provider_type", "status",
+            "error_message"}, or None when the report carries no status change.
+        """
+        notification_id = report.get('notification_id')
+        provider_message_id = report.get('provider_message_id')
+        status = _enum_value(report.get('status'))
+        if not (notification_id or provider_message_id) or status not in REPORTABLE_STATUSES:
+            return None
+
+        return {
+            'notification_id': notification_id,
+            'provider_message_id': str(provider_message_id) if provider_message_id else None,
+            'provider_type': self.provider_type.value,
+            'status': status,
+            'error_message': report.get('error_message'),
+        }
+
     def supports_delivery_confirmation(self) -> bool:
         """
         Check if this provider supports delivery confirmation.
@@ -133,6 +225,20 @@ class NotificationProviderBase(ABC):
         """
         return False
 
+    def get_send_concurrency(self) -> int:
+        """
+        Maximum number of recipients processed concurrently by a single `send`.
+        A value of 1 processes recipients sequentially.
+        """
+        return 1
+
+    def get_throughput_limit(self) -> Tuple[float, Optional[int]]:
+        """
+        Sustained messages per second and burst size accepted by the provider.
+        A rate of 0 disables rate limiting.
+        """
+        return (0, None)
+
     def get_rate_limits(self) -> Dict[str, int]:
         """
         Get rate limits for this provider.
@@ -177,3 +283,299 @@ class NotificationProviderBase(ABC):
                 kwargs['dlr_url'] = meta['dlr_url']
 
         return kwargs
+
+    async def _fan_out(
+        self,
+        items: List[Any],
+        handler: Callable[[Any], Awaitable[Dict[str, Any]]],
+    ) -> List[Dict[str, Any]]:
+        """
+        Run `handler` for every item under the provider's concurrency limit.
+        Results are returned in the order of `items`.
+        """
+        concurrency = max(1, self.get_send_concurrency())
+        if concurrency == 1 or len(items) <= 1:
+            return [await handler(item) for item in items]
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(item):
+            async with semaphore:
+                return await handler(item)
+
+        return list(await asyncio.gather(*(run(item) for item in items)))
+
+    async def _send_to_recipient(self, notification: Any, recipient: str, is_bulk: bool) -> Dict[str, Any]:
+        entry = await self._prepare_entry(notification, recipient, is_bulk)
+        attempt_number = entry.retry_count + 1
+        result = await self._safe_deliver(entry, recipient)
+        return await self._record_result(entry, result, attempt_number)
+
+    async def _deliver_entry(self, entry: Any, writer: DeliveryBatchWriter) -> Dict[str, Any]:
+        attempt_number = entry.retry_count + 1
+        result = await self._safe_deliver(entry, entry.recipient_address)
+
+        update_data, log_data = self._result_records(entry, result, attempt_number)
+        await writer.add({'_id': entry._id, **update_data}, log_data)
+        return self._result_summary(entry, result)
+
+    async def _safe_deliver(self, entry: Any, recipient: str) -> Dict[str, Any]:
+        return await self._guarded(entry, lambda: self._attempt(entry, recipient))
+
+    async def _guarded(
+        self,
+        entry: Any,
+        attempt: Callable[[], Awaitable[Dict[str, Any]]],
+        tokens: int = 1,
+    ) -> Dict[str, Any]:
+        """
+        Run one provider call behind the circuit breaker, the priority lane of
+        `entry` and the rate limiter. A call sending to several recipients
+        takes one token per recipient.
+        """
+        throttle = self.throttle
+        if throttle is None:
+            return await attempt()
+
+        breaker = throttle.breaker
+        if not breaker.allow():
+            return self._circuit_open_result(breaker.retry_after)
+
+        result = None
+        try:
+            async with throttle.lanes.slot(getattr(entry, 'priority', None)):
+                await throttle.bucket.acquire(tokens)
+                result = await attempt()
+        finally:
+            if result is None:
+                # Cancelled or raised: free a half-open probe slot
+                breaker.release()
+            else:
+                breaker.record(not result.get('provider_error'))
+
+        return result
+
+    async def _attempt(self, entry: Any, recipient: str) -> Dict[str, Any]:
+        """
+        One provider call, timed: the duration is recorded in the metrics and
+        kept on the result as ``duration_ms`` for the delivery log.
+        """
+        started = time.perf_counter()
+        with IN_FLIGHT.track(kind="delivery", provider=self.provider_type):
+            try:
+                result = await self._deliver(entry, recipient)
+            except Exception as e:
+                logger.error(f"Unexpected error sending {self.name} notification to {recipient}: {str(e)}")
+                result = self._failed_result(str(e), provider_error=True)
+
+        elapsed = time.perf_counter() - started
+        STAGE_DURATION.observe(elapsed, stage="deliver", provider=self.provider_type)
+        NOTIFICATIONS.inc(
+            provider=self.provider_type,
+            status=_enum_value(result.get('status', NotificationStatusEnum.FAILED)),
+        )
+        return {**result, 'duration_ms': int(elapsed * 1000)}
+
+    def _circuit_open_result(self, retry_after: float) -> Dict[str, Any]:
+        """
+        Result for an attempt rejected by the open circuit: either deferred
+        (left PENDING and rescheduled for when the circuit admits probes) or failed.
+        """
+        error = f"Circuit open for provider {self.name}"
+        if config.NOTIFY_CIRCUIT_OPEN_ACTION != "defer":
+            return self._failed_result(error)
+
+        return {
+            'status': NotificationStatusEnum.PENDING,
+            'provider_type': self.provider_type,
+            'provider_message_id': None,
+            'response': {},
+            'error': error,
+            'scheduled_at': timestamp() + timedelta(seconds=retry_after),
+        }
+
+    async def create_entries(
+        self,
+        notification: Any,
+        recipients: Optional[List[str]] = None,
+        status: NotificationStatusEnum = NotificationStatusEnum.PROCESSING,
+    ) -> List[Any]:
+        """
+        Create one record per recipient with a single multi-row insert.
+        """
+        if recipients is None:
+            recipients = self._get_recipients(notification)
+
+        entries = []
+        for recipient in recipients:
+            data = self._build_entry_data(notification, recipient)
+            data["status"] = status.value
+            entries.append(self.statemgr.create("notification", data))
+
+        with STAGE_DURATION.time(stage="db_write", provider=self.provider_type):
+            async with self.statemgr.transaction():
+                await self.statemgr.insert_notifications(*[serialize_mapping(entry) for entry in entries])
+
+        return entries
+
+    async def _prepare_entry(self, notification: Any, recipient: str, is_bulk: bool) -> Any:
+        """
+        Load or create the notification record for a recipient and mark it PROCESSING.
+        """
+        get_field = self._field_getter(notification)
+
+        async with self.statemgr.transaction():
+            entry = None
+            if not is_bulk:
+                if isinstance(notification, dict) and notification.get("_id"):
+                    entry = await self.statemgr.fetch("notification", notification["_id"])
+                elif get_field("_id"):
+                    entry = notification
+
+            if entry is None:
+                entry = self.statemgr.create("notification", self._build_entry_data(notification, recipient))
+                await self.statemgr.insert(entry)
+
+            await self.statemgr.update(
+                entry,
+                status=NotificationStatusEnum.PROCESSING.value,
+            )
+
+        return entry
+
+    def _build_entry_data(self, notification: Any, recipient: str) -> Dict[str, Any]:
+        get_field = self._field_getter(notification)
+        # Personalized content rendered per recipient (body/subject), if any
+        content = (get_field("recipient_content") or {}).get(recipient) or {}
+
+        return {
+            "_id": UUID_GENR(),
+            "channel": _enum_value(get_field("channel")),
+            "recipient_address": recipient,
+            "subject": content.get("subject") or get_field("subject"),
+            "body": content.get("body", get_field("body")),
+            "content_type": _enum_value(get_field("content_type")),
+            "recipient_id": get_field("recipient_id"),
+            "sender_id": get_field("sender_id"),
+            "provider_type": self.provider_type.value,
+            "priority": _enum_value(get_field("priority")),
+            "scheduled_at": get_field("scheduled_at"),
+            "template_key": get_field("template_key"),
+            "template_version": get_field("template_version"),
+            "template_data": get_field("template_data", {}),
+            "meta": get_field("meta", {}),
+            "tags": get_field("tags", []),
+            "max_retries": get_field("max_retries", 0),
+            "idempotency_key": get_field("idempotency_key"),
+            "digest_key": get_field("digest_key"),
+            "retry_count": 0,
+            "status": NotificationStatusEnum.PENDING.value,
+        }
+
+    async def _record_result(self, entry: Any, result: Dict[str, Any], attempt_number: int) -> Dict[str, Any]:
+        """
+        Persist the delivery outcome on the record and append a delivery log.
+        """
+        update_data, log_data = self._result_records(entry, result, attempt_number)
+
+        with STAGE_DURATION.time(stage="db_write", provider=self.provider_type):
+            async with self.statemgr.transaction():
+                await self.statemgr.update(entry, **update_data)
+                await self.statemgr.add_notification_log(**log_data)
+
+        return self._result_summary(entry, result)
+
+    def _result_records(self, entry: Any, result: Dict[str, Any], attempt_number: int):
+        """
+        Build the notification update and the delivery log row for a delivery outcome.
+        """
+        status = result.get('status', NotificationStatusEnum.FAILED)
+        provider_type = result.get('provider_type', self.provider_type)
+
+        update_data = {
+            'status': _enum_value(status),
+            'provider_type': _enum_value(provider_type),
+            'provider_message_id': result.get('provider_message_id'),
+            'provider_response': result.get('response', {}),
+        }
+
+        if status == NotificationStatusEnum.SENT:
+            update_data['sent_at'] = timestamp()
+        elif status == NotificationStatusEnum.FAILED:
+            update_data['error_message'] = result.get('error', 'Unknown error')
+            update_data['failed_at'] = timestamp()
+            update_data['next_retry_at'] = next_retry_at(entry.retry_count, entry.max_retries)
+        elif status == NotificationStatusEnum.PENDING:
+            # Deferred by the circuit breaker; picked up again by the scheduler
+            update_data['scheduled_at'] = result.get('scheduled_at')
+
+        log_data = {
+            '_id': UUID_GENR(),
+            'notification_id': entry._id,
+            'provider_type': _enum_value(provider_type),
+            'attempt_number': attempt_number,
+            'attempted_at': timestamp(),
+            'status': _enum_value(status),
+            'response': result.get('response', {}),
+            'error_message': result.get('error'),
+            'duration_ms': result.get('duration_ms'),
+        }
+
+        return update_data, log_data
+
+    def _result_summary(self, entry: Any, result: Dict[str, Any]) -> Dict[str, Any]:
+        summary = {
+            "notification_id": entry._id,
+            "status": _enum_value(result.get('status', NotificationStatusEnum.FAILED)),
+            "provider_message_id": result.get('provider_message_id'),
+            "provider_type": _enum_value(result.get('provider_type', self.provider_type)),
+        }
+        if result.get('scheduled_at'):
+            summary["scheduled_at"] = result['scheduled_at']
+        return summary
+
+    def _failed_result(
+        self,
+        error: str,
+        response: Optional[Dict[str, Any]] = None,
+        provider_error: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        A failed delivery. ``provider_error`` marks failures of the provider
+        itself (transport or gateway errors) rather than of the recipient;
+        only those count against the circuit breaker.
+        """
+        return {
+            'status': NotificationStatusEnum.FAILED,
+            'provider_type': self.provider_type,
+            'provider_message_id': None,
+            'response': response or {},
+            'error': error,
+            'provider_error': provider_error,
+        }
+
+    @staticmethod
+    def _get_recipients(notification: Any) -> List[str]:
+        get_field = NotificationProviderBase._field_getter(notification)
+
+        recipients = get_field("recipients") or get_field("recipient_address")
+        if not recipients:
+            raise ValueError("Missing recipient address.")
+
+        if isinstance(recipients, (list, tuple, set)):
+            return [recipient for recipient in recipients if recipient]
+
+        return [recipients]
+
+    @staticmethod
+    def _field_getter(notification: Any) -> Callable[..., Any]:
+        def get_field(field, default=None):
+            if isinstance(notification, dict):
+                return notification.get(field, default)
+            return getattr(notification, field, default)
+
+        return get_field
+
+
+def _enum_value(value):
+    return value.value if hasattr(value, "value") else value
@@ -1,16 +1,22 @@
 """
 Email notification providers - Self-hosted SMTP infrastructure
 """
+import time
 import aiosmtplib
+from collections import OrderedDict
+from email import policy
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Dict, Any, Optional
+from email.utils import formatdate, getaddresses, make_msgid, parseaddr
+from typing import Dict, Any, Optional, List, Tuple
 
 from fluvius.data.data_model import DataModel
-from fluvius.data import UUID_GENR, timestamp
 
+from ..batch import DeliveryBatchWriter
 from .base import NotificationProviderBase
+from .pool import SMTPConnectionPool
 from ..types import NotificationStatusEnum, ContentTypeEnum, ProviderTypeEnum
+from ..metrics import IN_FLIGHT, NOTIFICATIONS, STAGE_DURATION
 from .. import logger, config
 
 
@@ -23,6 +29,15 @@ class SMTPEmailProviderConfig(DataModel):
     smtp_password: Optional[str] = None
     smtp_from_email: Optional[str] = None
     smtp_timeout: int = 30
+    smtp_pool_size: int = 5
+    smtp_pool_idle_timeout: int = 60
+    smtp_pool_health_check_interval: int = 15
+    smtp_send_concurrency: int = 10
+    smtp_rate_limit_per_second: float = 0
+    smtp_rate_limit_burst: Optional[int] = None
+    smtp_encoded_body_cache_size: int = 16
+    smtp_multi_rcpt_batch_size: int = 0
+    smtp_multi_rcpt_to_header: str = "undisclosed-recipients:;"
 
 
 class SMTPEmailProvider(NotificationProviderBase):
@@ -32,10 +47,29 @@ class SMTPEmailProvider(NotificationProviderBase):
     """
     SMTP email provider for sending emails through self-hosted SMTP server.
     The SMTP server (Postfix, Haraka, etc.) runs on the worker machine.
+
+    The MIME body of a message is encoded once and the bytes are reused for
+    every recipient of the same content; only the To, Message-ID and Date
+    headers are written per recipient. With ``smtp_multi_rcpt_batch_size`` > 1,
+    bulk deliveries of identical content go out as one message with many
+    RCPT TO entries (the To header then names no recipient).
     """
 
     def __init__(self, provider_config: Optional[Any] = None):
         super().__init__(provider_config=provider_config)
+        self.pool = SMTPConnectionPool(
+            hostname=self.provider_config.smtp_host,
+            port=self.provider_config.smtp_port,
+            use_tls=self.provider_config.smtp_use_ssl or self.provider_config.smtp_use_tls,
+            username=self.provider_config.smtp_username,
+            password=self.provider_config.smtp_password,
+            timeout=self.provider_config.smtp_timeout,
+            max_size=self.provider_config.smtp_pool_size,
+            idle_timeout=self.provider_config.smtp_pool_idle_timeout,
+            health_check_interval=self.provider_config.smtp_pool_health_check_interval,
+        )
+        # message key -> (headers, body) of the encoded MIME message, LRU ordered
+        self._encoded: "OrderedDict[Tuple, Tuple[bytes, bytes]]" = OrderedDict()
 
     def build_config(self) -> Any:
         return {
@@ -47,194 +81,236 @@ class SMTPEmailProvider(NotificationProviderBase):
             "smtp_password": config.SMTP_PASSWORD,
             "smtp_from_email": config.SMTP_FROM_EMAIL,
             "smtp_timeout": config.SMTP_TIMEOUT,
+            "smtp_pool_size": config.SMTP_POOL_SIZE,
+            "smtp_pool_idle_timeout": config.SMTP_POOL_IDLE_TIMEOUT,
+            "smtp_pool_health_check_interval": config.SMTP_POOL_HEALTH_CHECK_INTERVAL,
+            "smtp_send_concurrency": config.SMTP_SEND_CONCURRENCY,
+            "smtp_rate_limit_per_second": config.SMTP_RATE_LIMIT_PER_SECOND,
+            "smtp_rate_limit_burst": config.SMTP_RATE_LIMIT_BURST,
+            "smtp_encoded_body_cache_size": config.SMTP_ENCODED_BODY_CACHE_SIZE,
+            "smtp_multi_rcpt_batch_size": config.SMTP_MULTI_RCPT_BATCH_SIZE,
+            "smtp_multi_rcpt_to_header": config.SMTP_MULTI_RCPT_TO_HEADER,
         }
 
-    async def send(self, notification: Any) -> Dict[str, Any]:
+    def get_send_concurrency(self) -> int:
+        return self.provider_config.smtp_send_concurrency
+
+    def get_throughput_limit(self):
+        return (
+            self.provider_config.smtp_rate_limit_per_second,
+            self.provider_config.smtp_rate_limit_burst,
+        )
+
+    async def deliver_entries(self, entries: List[Any]) -> List[Dict[str, Any]]:
+        """
+        Deliver persisted records; with multi-RCPT enabled, records sharing the
+        same content, sender and priority are sent as one message per
+        `smtp_multi_rcpt_batch_size` recipients.
+        """
+        batch_size = self.provider_config.smtp_multi_rcpt_batch_size
+        if batch_size <= 1 or len(entries) <= 1:
+            return await super().deliver_entries(entries)
+
+        groups: Dict[Tuple, List[int]] = OrderedDict()
+        for index, entry in enumerate(entries):
+            key = self._message_key(entry) + (_enum_value(getattr(entry, 'priority', None)),)
+            groups.setdefault(key, []).append(index)
+
+        chunks = [
+            [entries[index] for index in indexes[offset:offset + batch_size]]
+            for indexes in groups.values()
+            for offset in range(0, len(indexes), batch_size)
+        ]
+
+        async with DeliveryBatchWriter(self.statemgr, provider=self.provider_type.value) as writer:
+            chunk_results = await self._fan_out(chunks, lambda chunk: self._deliver_chunk(chunk, writer))
+
+        results = {
+            entry._id: summary
+            for chunk, summaries in zip(chunks, chunk_results)
+            for entry, summary in zip(chunk, summaries)
+        }
+        return [results[entry._id] for entry in entries]
+
+    async def _deliver_chunk(self, chunk: List[Any], writer: DeliveryBatchWriter) -> List[Dict[str, Any]]:
+        if len(chunk) == 1:
+            return [await self._deliver_entry(chunk[0], writer)]
+
+        outcome = await self._guarded(chunk[0], lambda: self._attempt_many(chunk), tokens=len(chunk))
+        per_entry = outcome.get('results') or [outcome] * len(chunk)
+
+        summaries = []
+        for entry, result in zip(chunk, per_entry):
+            update_data, log_data = self._result_records(entry, result, entry.retry_count + 1)
+            await writer.add({'_id': entry._id, **update_data}, log_data)
+            summaries.append(self._result_summary(entry, result))
+        return summaries
+
+    async def _attempt_many(self, chunk: List[Any]) -> Dict[str, Any]:
+        """
+        One multi-recipient send, timed like `_attempt`. The outcome is SENT
+        unless the whole message failed; per-recipient results are under ``results``.
+        """
+        started = time.perf_counter()
+        with IN_FLIGHT.track(kind="delivery", provider=self.provider_type):
+            try:
+                results = await self._deliver_many(chunk)
+            except Exception as e:
+                logger.error(f"Unexpected error sending email to {len(chunk)} recipients: {str(e)}")
+                results = [self._failed_result(str(e), provider_error=True)] * len(chunk)
+
+        elapsed = time.perf_counter() - started
+        STAGE_DURATION.observe(elapsed, stage="deliver", provider=self.provider_type)
+        for result in results:
+            NOTIFICATIONS.inc(provider=self.provider_type, status=_enum_value(result['status']))
+
+        duration_ms = int(elapsed * 1000)
+        results = [{**result, 'duration_ms': duration_ms} for result in results]
+        failed = all(result['status'] == NotificationStatusEnum.FAILED for result in results)
+        return {
+            'status': NotificationStatusEnum.FAILED if failed else NotificationStatusEnum.SENT,
+            'provider_error': all(result.get('provider_error') for result in results),
+            'results': results,
+        }
+
+    async def _deliver_many(self, chunk: List[Any]) -> List[Dict[str, Any]]:
+        """
+        Send one message to every recipient of `chunk` (same content and sender).
+        Recipients refused by the relay fail individually.
+        """
+        entry = chunk[0]
+        recipients = [item.recipient_address for item in chunk]
+        try:
+            from_email = self._from_email(entry)
+            message_id, raw = self._render_message(entry, from_email, self.provider_config.smtp_multi_rcpt_to_header)
+            envelope = recipients + self._copy_addresses(entry)
+            refused, response = await self._send_raw(from_email, envelope, raw)
+        except aiosmtplib.SMTPRecipientsRefused as e:
+            logger.error(f"SMTP relay refused all {len(recipients)} recipients: {str(e)}")
+            return [self._failed_result(f"SMTP error: {str(e)}")] * len(chunk)
+        except aiosmtplib.SMTPException as e:
+            logger.error(f"SMTP error sending to {len(recipients)} recipients: {str(e)}")
+            return [self._failed_result(f"SMTP error: {str(e)}", provider_error=True)] * len(chunk)
+
+        results = []
+        for recipient in recipients:
+            if recipient in refused:
+                results.append(self._failed_result(f"SMTP error: recipient refused: {refused[recipient]}"))
+            else:
+                results.append(self._sent_result(message_id, response, recipient))
+        return results
+
+    async def _deliver(self, entry: Any, recipient: str) -> Dict[str, Any]:
         """
         Send an email via self-hosted SMTP server.
 
         Args:
-            notification: Notification payload or model
+            entry: Notification record
+            recipient: Recipient email address
         """
-        def get_field(field, default=None):
-            if isinstance(notification, dict):
-                return notification.get(field, default)
-            return getattr(notification, field, default)
-
-        def enum_value(value):
-            return value.value if hasattr(value, "value") else value
+        try:
+            from_email = self._from_email(entry)
+            message_id, raw = self._render_message(entry, from_email, recipient)
+            refused, response = await self._send_raw(from_email, [recipient] + self._copy_addresses(entry), raw)
+            if recipient in refused:
+                return self._failed_result(f"SMTP error: recipient refused: {refused[recipient]}")
+            return self._sent_result(message_id, response, recipient)
+
+        except aiosmtplib.SMTPRecipientsRefused as e:
+            logger.error(f"SMTP relay refused {recipient}: {str(e)}")
+            return self._failed_result(f"SMTP error: {str(e)}")
+        except aiosmtplib.SMTPException as e:
+            logger.error(f"SMTP error sending to {recipient}: {str(e)}")
+            return self._failed_result(f"SMTP error: {str(e)}", provider_error=True)
+        except Exception as e:
+            logger.error(f"Unexpected error sending email to {recipient}: {str(e)}")
+            return self._failed_result(str(e), provider_error=True)
 
-        recipients = get_field("recipients") or get_field("recipient_address")
-        if not recipients:
-            raise ValueError("Missing recipient address.")
+    def _sent_result(self, message_id: str, response: Any, recipient: str) -> Dict[str, Any]:
+        return {
+            'status': NotificationStatusEnum.SENT,
+            'provider_type': self.provider_type,
+            'provider_message_id': message_id,
+            'response': {
+                'smtp_response': str(response),
+                'recipient': recipient,
+                'smtp_host': self.provider_config.smtp_host,
+            },
+            'error': None
+        }
 
-        if isinstance(recipients, (list, tuple, set)):
-            recipients = [recipient for recipient in recipients if recipient]
+    def _from_email(self, entry: Any) -> str:
+        meta = getattr(entry, "meta", None) or {}
+        from_email = meta.get('from_email') or self.provider_config.smtp_from_email
+        if not from_email:
+            raise ValueError("SMTP_FROM_EMAIL is not configured")
+        return from_email
+
+    @staticmethod
+    def _copy_addresses(entry: Any) -> List[str]:
+        """Envelope addresses of the Cc/Bcc recipients in the record's meta."""
+        meta = getattr(entry, "meta", None) or {}
+        values = [meta[name] for name in ('cc', 'bcc') if meta.get(name)]
+        values = [item for value in values for item in ([value] if isinstance(value, str) else value)]
+        return [address for _, address in getaddresses(values) if address]
+
+    def _message_key(self, entry: Any) -> Tuple:
+        meta = getattr(entry, "meta", None) or {}
+        return (
+            meta.get('from_email') or self.provider_config.smtp_from_email,
+            entry.subject or '',
+            _resolve_content_type(getattr(entry, "content_type", None)),
+            _header_value(meta.get('cc')),
+            _header_value(meta.get('bcc')),
+            entry.body or '',
+        )
+
+    def _render_message(self, entry: Any, from_email: str, to: str) -> Tuple[str, bytes]:
+        """
+        The wire bytes of the message to `to` and its Message-ID. Everything
+        but the To, Message-ID and Date headers comes from the encoded-body cache.
+        """
+        head, body = self._encoded_message(entry, from_email)
+        domain = parseaddr(from_email)[1].rpartition('@')[2] or None
+        message_id = make_msgid(domain=domain)
+        return message_id, (
+            _fold_header('To', to)
+            + _fold_header('Message-ID', message_id)
+            + _fold_header('Date', formatdate(usegmt=True))
+            + head
+            + body
+        )
+
+    def _encoded_message(self, entry: Any, from_email: str) -> Tuple[bytes, bytes]:
+        key = self._message_key(entry)
+        cached = self._encoded.get(key)
+        if cached is not None:
+            self._encoded.move_to_end(key)
+            return cached
+
+        _, subject, content_type, cc, _, body = key
+        if content_type == ContentTypeEnum.HTML:
+            message = MIMEMultipart('alternative')
+            message.attach(MIMEText(body, 'html'))
         else:
-            recipients = [recipients]
+            message = MIMEText(body, 'plain')
 
-        results = []
-        is_bulk = len(recipients) > 1
+        message['Subject'] = subject
+        message['From'] = from_email
+        if cc:
+            message['Cc'] = cc
 
-        for recipient in recipients:
-            async with self.statemgr.transaction():
-                entry = None
-                if not is_bulk:
-                    if isinstance(notification, dict) and notification.get("_id"):
-                        entry = await self.statemgr.fetch("notification", notification["_id"])
-                    elif get_field("_id"):
-                        entry = notification
-
-                if entry is None:
-                    data = {
-                        "_id": UUID_GENR(),
-                        "channel": enum_value(get_field("channel")),
-                        "recipient_address": recipient,
-                        "subject": get_field("subject"),
-                        "body": get_field("body"),
-                        "content_type": enum_value(get_field("content_type")),
-                        "recipient_id": get_field("recipient_id"),
-                        "sender_id": get_field("sender_id"),
-                        "provider_type": self.provider_type.value,
-                        "priority": enum_value(get_field("priority")),
-                        "scheduled_at": get_field("scheduled_at"),
-                        "template_key": get_field("template_key"),
-                        "template_version": get_field("template_version"),
-                        "template_data": get_field("template_data", {}),
-                        "meta": get_field("meta", {}),
-                        "tags": get_field("tags", []),
-                        "max_retries": get_field("max_retries", 0),
-                        "retry_count": 0,
-                        "status": NotificationStatusEnum.PENDING.value,
-                    }
-                    entry = self.statemgr.create("notification", data)
-                    await self.statemgr.insert(entry)
-
-                await self.statemgr.update(
-                    entry,
-                    status=NotificationStatusEnum.PROCESSING.value,
-                )
-
-            attempt_number = entry.retry_count + 1
-            meta = getattr(entry, "meta", None) or {}
-            from_email = meta.get('from_email') or self.provider_config.smtp_from_email
-            content_type = getattr(entry, "content_type", None)
+        # Bcc is never written to the headers; its addresses are envelope-only
+        encoded = message.as_bytes(policy=policy.SMTP)
+        split = encoded.index(b"\r\n\r\n") + 2
+        cached = (encoded[:split], encoded[split:])
 
-            try:
-                if not from_email:
-                    raise ValueError("SMTP_FROM_EMAIL is not configured")
-
-                if isinstance(content_type, str):
-                    try:
-                        resolved_content_type = ContentTypeEnum(content_type)
-                    except ValueError:
-                        resolved_content_type = ContentTypeEnum.HTML
-                else:
-                    resolved_content_type = content_type or ContentTypeEnum.HTML
-
-                if resolved_content_type == ContentTypeEnum.HTML:
-                    message = MIMEMultipart('alternative')
-                    message.attach(MIMEText(entry.body or "", 'html'))
-                else:
-                    message = MIMEText(entry.body or "", 'plain')
-
-                message['Subject'] = entry.subject or ''
-                message['From'] = from_email
-                message['To'] = recipient
-
-                if 'cc' in meta:
-                    message['Cc'] = meta['cc']
-                if 'bcc' in meta:
-                    message['Bcc'] = meta['bcc']
-
-                logger.info(
-                    f"Connecting to self-hosted SMTP server at {self.provider_config.smtp_host}:{self.provider_config.smtp_port}"
-                )
-
-                use_tls = self.provider_config.smtp_use_ssl or self.provider_config.smtp_use_tls
-                async with aiosmtplib.SMTP(
-                    hostname=self.provider_config.smtp_host,
-                    port=self.provider_config.smtp_port,
-                    use_tls=use_tls,
-                    timeout=self.provider_config.smtp_timeout,
-                ) as smtp:
-                    if self.provider_config.smtp_username and self.provider_config.smtp_password:
-                        await smtp.login(self.provider_config.smtp_username, self.provider_config.smtp_password)
-
-                    send_result = await smtp.send_message(message)
-
-                result = {
-                    'status': NotificationStatusEnum.SENT,
-                    'provider_type': self.provider_type,
-                    'provider_message_id': message.get('Message-ID'),
-                    'response': {
-                        'smtp_response': str(send_result),
-                        'recipient': recipient,
-                        'smtp_host': self.provider_config.smtp_host,
-                    },
-                    'error': None
-                }
-
-            except aiosmtplib.SMTPException as e:
-                logger.error(f"SMTP error sending to {recipient}: {str(e)}")
-                result = {
-                    'status': NotificationStatusEnum.FAILED,
-                    'provider_type': self.provider_type,
-                    'provider_message_id': None,
-                    'response': {},
-                    'error': f"SMTP error: {str(e)}"
-                }
-            except Exception as e:
-                logger.error(f"Unexpected error sending email to {recipient}: {str(e)}")
-                result = {
-                    'status': NotificationStatusEnum.FAILED,
-                    'provider_type': self.provider_type,
-                    'provider_message_id': None,
-                    'response': {},
-                    'error': str(e)
-                }
-
-            status = result.get('status', NotificationStatusEnum.FAILED)
-            provider_type = result.get('provider_type', self.provider_type)
-
-            update_data = {
-                'status': enum_value(status),
-                'provider_type': enum_value(provider_type),
-                'provider_message_id': result.get('provider_message_id'),
-                'provider_response': result.get('response', {}),
-            }
-
-            if status == NotificationStatusEnum.SENT:
-                update_data['sent_at'] = timestamp()
-            elif status == NotificationStatusEnum.FAILED:
-                update_data['error_message'] = result.get('error', 'Unknown error')
-                update_data['failed_at'] = timestamp()
-
-            log_data = {
-                'notification_id': entry._id,
-                'provider_type': enum_value(provider_type),
-                'attempt_number': attempt_number,
-                'attempted_at': timestamp(),
-                'status': enum_value(status),
-                'response': result.get('response', {}),
-                'error_message': result.get('error'),
-            }
-
-            async with self.statemgr.transaction():
-                await self.statemgr.update(entry, **update_data)
-                await self.statemgr.add_notification_log(**log_data)
-
-            results.append({
-                "notification_id": entry._id,
-                "status": enum_value(status),
-                "provider_message_id": result.get('provider_message_id'),
-                "provider_type": enum_value(provider_type),
-            })
-
-        if len(results) == 1:
-            return results[0]
-
-        return {"count": len(results), "results": results}
+        cache_size = self.provider_config.smtp_encoded_body_cache_size
+        if cache_size > 0:
+            self._encoded[key] = cached
+            while len(self._encoded) > cache_size:
+                self._encoded.popitem(last=False)
+        return cached
 
     async def check_status(self, provider_message_id: str) -> Dict[str, Any]:
         """
@@ -248,27 +324,99 @@ class SMTPEmailProvider(NotificationProviderBase):
 
     async def validate_config(self) -> bool:
         """
-        Validate SMTP configuration by attempting connection to self-hosted server.
+        Validate SMTP configuration by borrowing a pooled connection to the self-hosted server.
         """
         try:
-            use_tls = self.provider_config.smtp_use_ssl or self.provider_config.smtp_use_tls
-            async with aiosmtplib.SMTP(
-                hostname=self.provider_config.smtp_host,
-                port=self.provider_config.smtp_port,
-                use_tls=use_tls,
-                timeout=self.provider_config.smtp_timeout,
-            ) as smtp:
-                if self.provider_config.smtp_username and self.provider_config.smtp_password:
-                    await smtp.login(self.provider_config.smtp_username, self.provider_config.smtp_password)
-                logger.info(f"SMTP configuration validated successfully")
-                return True
+            async with self.pool.connection() as smtp:
+                await smtp.noop()
+            logger.info(f"SMTP configuration validated successfully")
+            return True
         except Exception as e:
             logger.error(f"SMTP configuration validation failed: {str(e)}")
             return False
 
+    async def close(self):
+        await self.pool.close()
+
+    async def _send_raw(self, sender: str, recipients: List[str], message: bytes):
+        """
+        Send an encoded message over a pooled connection.
+
+        A pooled connection may have been dropped by the relay while idle. When
+        that shows before DATA was issued, nothing was delivered: the connection
+        is discarded and the message is sent once more over a fresh one. A
+        disconnect during DATA is not retried, as the relay may already have
+        accepted the message.
+        """
+        progress = {"data": False}
+        try:
+            async with self.pool.connection() as smtp:
+                return await self._transmit(smtp, sender, recipients, message, progress)
+        except aiosmtplib.SMTPServerDisconnected as e:
+            if progress["data"]:
+                raise
+            logger.info(f"SMTP connection lost before DATA ({e}), retrying with a new connection")
+
+        async with self.pool.connection() as smtp:
+            return await self._transmit(smtp, sender, recipients, message, {"data": False})
+
+    async def _transmit(self, smtp, sender: str, recipients: List[str], message: bytes, progress: Dict[str, bool]):
+        """
+        One SMTP transaction (MAIL, RCPT per recipient, DATA), as `SMTP.sendmail`
+        does, recording in `progress` whether DATA was issued.
+
+        Returns ``(refused recipients, DATA response message)``; raises
+        SMTPRecipientsRefused when every recipient is refused. The pool resets
+        the envelope of a rejected transaction before reusing the connection.
+        """
+        with STAGE_DURATION.time(stage="smtp_data", provider=self.provider_type):
+            await smtp.mail(sender)
+            refused = {}
+            for recipient in recipients:
+                try:
+                    await smtp.rcpt(recipient)
+                except aiosmtplib.SMTPRecipientRefused as e:
+                    refused[e.recipient] = aiosmtplib.SMTPResponse(e.code, e.message)
+
+            if len(refused) == len(recipients):
+                raise aiosmtplib.SMTPRecipientsRefused([
+                    aiosmtplib.SMTPRecipientRefused(response.code, response.message, recipient)
+                    for recipient, response in refused.items()
+                ])
+
+            progress["data"] = True
+            response = await smtp.data(message)
+
+        return refused, response.message
+
     @property
     def provider_type(self):
         return ProviderTypeEnum.SMTP
 
     def supports_delivery_confirmation(self) -> bool:
         return False  # Basic SMTP doesn't support this
+
+
+def _enum_value(value):
+    return value.value if hasattr(value, "value") else value
+
+
+def _resolve_content_type(content_type) -> ContentTypeEnum:
+    if isinstance(content_type, str):
+        try:
+            return ContentTypeEnum(content_type)
+        except ValueError:
+            return ContentTypeEnum.HTML
+    return content_type or ContentTypeEnum.HTML
+
+
+def _header_value(value) -> Optional[str]:
+    if not value:
+        return None
+    if isinstance(value, str):
+        return value
+    return ", ".join(value)
+
+
+def _fold_header(name: str, value: str) -> bytes:
+    return policy.SMTP.header_factory(name, value).fold(policy=policy.SMTP).encode('ascii')
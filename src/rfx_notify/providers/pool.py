@@ -0,0 +1,172 @@
+"""
+SMTP connection pool - reusable authenticated connections to the self-hosted relay
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+import aiosmtplib
+
+from ..metrics import STAGE_DURATION
+from .. import logger
+
+
+class PooledSMTPConnection:
+    """An SMTP client owned by the pool together with its last-used timestamp."""
+
+    __slots__ = ("smtp", "last_used")
+
+    def __init__(self, smtp: aiosmtplib.SMTP):
+        self.smtp = smtp
+        self.last_used = time.monotonic()
+
+    @property
+    def idle_seconds(self) -> float:
+        return time.monotonic() - self.last_used
+
+
+class SMTPConnectionPool:
+    """
+    Bounded pool of connected and authenticated SMTP clients.
+
+    At most ``max_size`` connections are checked out at any time. Idle
+    connections are reused (most recently used first), probed with NOOP once
+    they have been idle longer than ``health_check_interval`` and closed once
+    they exceed ``idle_timeout``. A connection whose transaction was rejected
+    by the relay (an SMTP error reply or refused recipients) is reset with RSET
+    and reused; any other error discards it so the next borrower reconnects.
+    """
+
+    def __init__(
+        self,
+        *,
+        hostname: str,
+        port: int,
+        use_tls: bool = False,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        timeout: int = 30,
+        max_size: int = 5,
+        idle_timeout: float = 60,
+        health_check_interval: float = 15,
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.use_tls = use_tls
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.max_size = max(1, max_size)
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+
+        self._idle: List[PooledSMTPConnection] = []
+        self._slots = asyncio.Semaphore(self.max_size)
+        self._in_use = 0
+        self._closed = False
+
+    @property
+    def size(self) -> int:
+        """Number of open connections (idle and borrowed)."""
+        return len(self._idle) + self._in_use
+
+    @asynccontextmanager
+    async def connection(self):
+        """
+        Borrow a ready-to-use SMTP client.
+
+        Usage::
+
+            async with pool.connection() as smtp:
+                await smtp.send_message(message)
+        """
+        async with self._slots:
+            conn = await self._checkout()
+            self._in_use += 1
+            try:
+                yield conn.smtp
+            except (aiosmtplib.SMTPResponseException, aiosmtplib.SMTPRecipientsRefused):
+                self._in_use -= 1
+                await self._release_rejected(conn)
+                raise
+            except BaseException:
+                self._in_use -= 1
+                await self._discard(conn)
+                raise
+
+            self._in_use -= 1
+            await self._release(conn)
+
+    async def close(self):
+        """Close every idle connection. Borrowed connections are closed on return."""
+        self._closed = True
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await self._discard(conn, graceful=True)
+
+    async def _release(self, conn: PooledSMTPConnection):
+        if self._closed:
+            await self._discard(conn, graceful=True)
+            return
+
+        conn.last_used = time.monotonic()
+        self._idle.append(conn)
+
+    async def _release_rejected(self, conn: PooledSMTPConnection):
+        """Reset the envelope of a rejected transaction and keep the connection when that works."""
+        try:
+            await conn.smtp.rset()
+        except (aiosmtplib.SMTPException, OSError):
+            await self._discard(conn)
+            return
+
+        await self._release(conn)
+
+    async def _checkout(self) -> PooledSMTPConnection:
+        while self._idle:
+            conn = self._idle.pop()
+            if not conn.smtp.is_connected or conn.idle_seconds > self.idle_timeout:
+                await self._discard(conn, graceful=True)
+                continue
+
+            if conn.idle_seconds > self.health_check_interval:
+                try:
+                    await conn.smtp.noop()
+                except (aiosmtplib.SMTPException, OSError) as e:
+                    logger.info(f"Dropping stale SMTP connection to {self.hostname}:{self.port}: {e}")
+                    await self._discard(conn)
+                    continue
+
+            return conn
+
+        return await self._connect()
+
+    async def _connect(self) -> PooledSMTPConnection:
+        logger.info(f"Opening pooled SMTP connection to {self.hostname}:{self.port}")
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            use_tls=self.use_tls,
+            timeout=self.timeout,
+        )
+        with STAGE_DURATION.time(stage="smtp_connect", provider="SMTP"):
+            await smtp.connect()
+            try:
+                if self.username and self.password:
+                    await smtp.login(self.username, self.password)
+            except BaseException:
+                smtp.close()
+                raise
+
+        return PooledSMTPConnection(smtp)
+
+    async def _discard(self, conn: PooledSMTPConnection, graceful: bool = False):
+        if graceful and conn.smtp.is_connected:
+            try:
+                await conn.smtp.quit()
+                return
+            except (aiosmtplib.SMTPException, OSError):
+                pass
+
+        conn.smtp.close()
@@ -2,13 +2,14 @@
 SMS notification providers - Self-hosted Kannel gateway
 """
 import httpx
+from uuid import UUID
 from typing import Dict, Any, Optional
 
 from fluvius.data.data_model import DataModel
-from fluvius.data import UUID_GENR, timestamp
 
 from .base import NotificationProviderBase
 from ..types import NotificationStatusEnum, ProviderTypeEnum
+from ..metrics import STAGE_DURATION
 from .. import logger, config
 
 
@@ -19,8 +20,15 @@ class KannelSMSProviderConfig(DataModel):
     kannel_password: Optional[str] = None
     kannel_send_url: str = "/cgi-bin/sendsms"
     kannel_dlr_mask: int = 31
+    kannel_dlr_url: Optional[str] = None
     kannel_timeout: int = 30
     kannel_from_number: Optional[str] = None
+    kannel_send_concurrency: int = 10
+    kannel_max_connections: int = 20
+    kannel_max_keepalive_connections: int = 10
+    kannel_keepalive_expiry: int = 30
+    kannel_rate_limit_per_second: float = 0
+    kannel_rate_limit_burst: Optional[int] = None
 
 
 class KannelSMSProvider(NotificationProviderBase):
@@ -32,8 +40,16 @@ class KannelSMSProvider(NotificationProviderBase):
     name = "kannel"
     __CONFIG_CLS__ = KannelSMSProviderConfig
 
+    # Kannel DLR event types (dlr-mask bits)
+    DLR_STATUSES = {
+        1: NotificationStatusEnum.DELIVERED,   # Delivered to phone
+        2: NotificationStatusEnum.FAILED,      # Non-delivered to phone
+        16: NotificationStatusEnum.REJECTED,   # Non-delivered to SMSC
+    }
+
     def __init__(self, provider_config: Optional[Any] = None):
         super().__init__(provider_config=provider_config)
+        self._client: Optional[httpx.AsyncClient] = None
 
     def build_config(self) -> Any:
         return {
@@ -43,210 +59,143 @@ class KannelSMSProvider(NotificationProviderBase):
             "kannel_password": config.KANNEL_PASSWORD,
             "kannel_send_url": config.KANNEL_SEND_URL,
             "kannel_dlr_mask": config.KANNEL_DLR_MASK,
+            "kannel_dlr_url": config.KANNEL_DLR_URL,
             "kannel_timeout": config.KANNEL_TIMEOUT,
             "kannel_from_number": config.KANNEL_FROM_NUMBER,
+            "kannel_send_concurrency": config.KANNEL_SEND_CONCURRENCY,
+            "kannel_max_connections": config.KANNEL_MAX_CONNECTIONS,
+            "kannel_max_keepalive_connections": config.KANNEL_MAX_KEEPALIVE_CONNECTIONS,
+            "kannel_keepalive_expiry": config.KANNEL_KEEPALIVE_EXPIRY,
+            "kannel_rate_limit_per_second": config.KANNEL_RATE_LIMIT_PER_SECOND,
+            "kannel_rate_limit_burst": config.KANNEL_RATE_LIMIT_BURST,
         }
 
-    async def send(self, notification: Any) -> Dict[str, Any]:
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        Long-lived HTTP client to the Kannel gateway.
+
+        Connections are kept alive and reused across messages. httpx does not
+        pipeline HTTP/1.1 requests, so throughput comes from the keep-alive pool
+        (`kannel_max_connections` concurrent requests) instead.
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=f"http://{self.provider_config.kannel_host}:{self.provider_config.kannel_port}",
+                timeout=self.provider_config.kannel_timeout,
+                limits=httpx.Limits(
+                    max_connections=self.provider_config.kannel_max_connections,
+                    max_keepalive_connections=self.provider_config.kannel_max_keepalive_connections,
+                    keepalive_expiry=self.provider_config.kannel_keepalive_expiry,
+                ),
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def get_send_concurrency(self) -> int:
+        return self.provider_config.kannel_send_concurrency
+
+    def get_throughput_limit(self):
+        return (
+            self.provider_config.kannel_rate_limit_per_second,
+            self.provider_config.kannel_rate_limit_burst,
+        )
+
+    async def _deliver(self, entry: Any, recipient: str) -> Dict[str, Any]:
         """
         Send SMS via self-hosted Kannel gateway.
 
         Args:
-            notification: Notification payload or model
+            entry: Notification record
+            recipient: Recipient phone number
         """
-        def get_field(field, default=None):
-            if isinstance(notification, dict):
-                return notification.get(field, default)
-            return getattr(notification, field, default)
-
-        def enum_value(value):
-            return value.value if hasattr(value, "value") else value
-
-        recipients = get_field("recipients")
-        if not recipients:
-            raise ValueError("Missing recipient address.")
-
-        if isinstance(recipients, (list, tuple, set)):
-            recipients = [recipient for recipient in recipients if recipient]
-        else:
-            recipients = [recipients]
-
-        results = []
-        is_bulk = len(recipients) > 1
-
-        for recipient in recipients:
-            async with self.statemgr.transaction():
-                entry = None
-                if not is_bulk:
-                    if isinstance(notification, dict) and notification.get("_id"):
-                        entry = await self.statemgr.fetch("notification", notification["_id"])
-                    elif get_field("_id"):
-                        entry = notification
-
-                if entry is None:
-                    data = {
-                        "_id": UUID_GENR(),
-                        "channel": enum_value(get_field("channel")),
-                        "recipients": [recipient],
-                        "subject": get_field("subject"),
-                        "body": get_field("body"),
-                        "content_type": enum_value(get_field("content_type")),
-                        "recipient_id": get_field("recipient_id"),
-                        "sender_id": get_field("sender_id"),
-                        "provider_type": self.provider_type.value,
-                        "priority": enum_value(get_field("priority")),
-                        "scheduled_at": get_field("scheduled_at"),
-                        "template_key": get_field("template_key"),
-                        "template_version": get_field("template_version"),
-                        "template_data": get_field("template_data", {}),
-                        "meta": get_field("meta", {}),
-                        "tags": get_field("tags", []),
-                        "max_retries": get_field("max_retries", 0),
-                        "retry_count": 0,
-                        "status": NotificationStatusEnum.PENDING.value,
-                    }
-                    entry = self.statemgr.create("notification", data)
-                    await self.statemgr.insert(entry)
-
-                await self.statemgr.update(
-                    entry,
-                    status=NotificationStatusEnum.PROCESSING.value,
-                )
-
-            attempt_number = entry.retry_count + 1
-            meta = getattr(entry, "meta", None) or {}
-
-            try:
-                url = f"http://{self.provider_config.kannel_host}:{self.provider_config.kannel_port}{self.provider_config.kannel_send_url}"
-
-                params = {
-                    'username': self.provider_config.kannel_username,
-                    'password': self.provider_config.kannel_password,
-                    'to': recipient,
-                    'text': entry.body,
-                }
+        meta = getattr(entry, "meta", None) or {}
 
-                from_number = meta.get('from_number') or self.provider_config.kannel_from_number
-                if from_number:
-                    params['from'] = from_number
+        try:
+            params = {
+                'username': self.provider_config.kannel_username,
+                'password': self.provider_config.kannel_password,
+                'to': recipient,
+                'text': entry.body,
+            }
 
-                dlr_url = meta.get('dlr_url')
-                if dlr_url:
-                    params['dlr-url'] = dlr_url
-                    params['dlr-mask'] = self.provider_config.kannel_dlr_mask
+            from_number = meta.get('from_number') or self.provider_config.kannel_from_number
+            if from_number:
+                params['from'] = from_number
+
+            # Kannel's sendsms reply carries no message id. With the DLR ingestion
+            # endpoint configured, the notification id is the provider_message_id
+            # and is echoed back by Kannel in the delivery report.
+            dlr_reference = None
+            dlr_url = meta.get('dlr_url')
+            if not dlr_url and self.provider_config.kannel_dlr_url:
+                dlr_reference = str(entry._id)
+                base_url = self.provider_config.kannel_dlr_url
+                separator = '&' if '?' in base_url else '?'
+                dlr_url = f"{base_url}{separator}id={dlr_reference}&type=%d&reply=%A"
+
+            if dlr_url:
+                params['dlr-url'] = dlr_url
+                params['dlr-mask'] = self.provider_config.kannel_dlr_mask
+
+            logger.info(
+                f"Sending SMS to {recipient} via Kannel at {self.provider_config.kannel_host}:{self.provider_config.kannel_port}"
+            )
+
+            with STAGE_DURATION.time(stage="kannel_http", provider=self.provider_type):
+                response = await self.client.get(self.provider_config.kannel_send_url, params=params)
+            response_text = response.text.strip()
+
+            if response.status_code != 200:
+                logger.error(
+                    f"Kannel HTTP error {response.status_code}: {response.text}"
+                )
+                return self._failed_result(
+                    f"HTTP {response.status_code}: {response.text}",
+                    provider_error=response.status_code >= 500,
+                )
 
-                logger.info(
-                    f"Sending SMS to {recipient} via Kannel at {self.provider_config.kannel_host}:{self.provider_config.kannel_port}"
+            if not any(indicator in response_text for indicator in ['Sent', 'Queued', 'Accepted']):
+                logger.error(f"Kannel error: {response_text}")
+                return self._failed_result(
+                    f"Kannel error: {response_text}",
+                    response={'kannel_response': response_text},
                 )
 
-                async with httpx.AsyncClient(timeout=self.provider_config.kannel_timeout) as client:
-                    response = await client.get(url, params=params)
-
-                    response_text = response.text.strip()
-
-                    if response.status_code == 200:
-                        if any(indicator in response_text for indicator in ['Sent', 'Queued', 'Accepted']):
-                            try:
-                                message_id = response_text.split(':')[0].strip()
-                            except Exception:
-                                message_id = None
-
-                            logger.info(
-                                f"SMS sent to {recipient} via Kannel, message_id: {message_id}"
-                            )
-
-                            result = {
-                                'status': NotificationStatusEnum.SENT,
-                                'provider_type': self.provider_type,
-                                'provider_message_id': message_id,
-                                'response': {
-                                    'kannel_response': response_text,
-                                    'recipient': recipient,
-                                    'kannel_host': self.provider_config.kannel_host,
-                                },
-                                'error': None
-                            }
-                        else:
-                            logger.error(f"Kannel error: {response_text}")
-                            result = {
-                                'status': NotificationStatusEnum.FAILED,
-                                'provider_type': self.provider_type,
-                                'provider_message_id': None,
-                                'response': {'kannel_response': response_text},
-                                'error': f"Kannel error: {response_text}"
-                            }
-                    else:
-                        logger.error(
-                            f"Kannel HTTP error {response.status_code}: {response.text}"
-                        )
-                        result = {
-                            'status': NotificationStatusEnum.FAILED,
-                            'provider_type': self.provider_type,
-                            'provider_message_id': None,
-                            'response': {},
-                            'error': f"HTTP {response.status_code}: {response.text}"
-                        }
-
-            except httpx.TimeoutException:
-                logger.error(f"Timeout connecting to Kannel for {recipient}")
-                result = {
-                    'status': NotificationStatusEnum.FAILED,
-                    'provider_type': self.provider_type,
-                    'provider_message_id': None,
-                    'response': {},
-                    'error': "Timeout connecting to Kannel gateway"
-                }
-            except Exception as e:
-                logger.error(f"Error sending SMS to {recipient} via Kannel: {str(e)}")
-                result = {
-                    'status': NotificationStatusEnum.FAILED,
-                    'provider_type': self.provider_type,
-                    'provider_message_id': None,
-                    'response': {},
-                    'error': str(e)
-                }
+            if dlr_reference:
+                message_id = dlr_reference
+            else:
+                try:
+                    message_id = response_text.split(':')[0].strip()
+                except Exception:
+                    message_id = None
 
-            status = result.get('status', NotificationStatusEnum.FAILED)
-            provider_type = result.get('provider_type', self.provider_type)
+            logger.info(
+                f"SMS sent to {recipient} via Kannel, message_id: {message_id}"
+            )
 
-            update_data = {
-                'status': enum_value(status),
-                'provider_type': enum_value(provider_type),
-                'provider_message_id': result.get('provider_message_id'),
-                'provider_response': result.get('response', {}),
-            }
-
-            if status == NotificationStatusEnum.SENT:
-                update_data['sent_at'] = timestamp()
-            elif status == NotificationStatusEnum.FAILED:
-                update_data['error_message'] = result.get('error', 'Unknown error')
-                update_data['failed_at'] = timestamp()
-
-            log_data = {
-                'notification_id': entry._id,
-                'provider_type': enum_value(provider_type),
-                'attempt_number': attempt_number,
-                'attempted_at': timestamp(),
-                'status': enum_value(status),
-                'response': result.get('response', {}),
-                'error_message': result.get('error'),
+            return {
+                'status': NotificationStatusEnum.SENT,
+                'provider_type': self.provider_type,
+                'provider_message_id': message_id,
+                'response': {
+                    'kannel_response': response_text,
+                    'recipient': recipient,
+                    'kannel_host': self.provider_config.kannel_host,
+                },
+                'error': None
             }
 
-            async with self.statemgr.transaction():
-                await self.statemgr.update(entry, **update_data)
-                await self.statemgr.add_notification_log(**log_data)
-
-            results.append({
-                "notification_id": entry._id,
-                "status": enum_value(status),
-                "provider_message_id": result.get('provider_message_id'),
-                "provider_type": enum_value(provider_type),
-            })
-
-        if len(results) == 1:
-            return results[0]
-
-        return {"count": len(results), "results": results}
+        except httpx.TimeoutException:
+            logger.error(f"Timeout connecting to Kannel for {recipient}")
+            return self._failed_result("Timeout connecting to Kannel gateway", provider_error=True)
+        except Exception as e:
+            logger.error(f"Error sending SMS to {recipient} via Kannel: {str(e)}")
+            return self._failed_result(str(e), provider_error=True)
 
     async def check_status(self, provider_message_id: str) -> Dict[str, Any]:
         """
@@ -256,59 +205,85 @@ class KannelSMSProvider(NotificationProviderBase):
         try:
             # Kannel status checking is typically done via DLR webhooks
             # This is a placeholder for status page checking
-            url = f"http://{self.provider_config.kannel_host}:{self.provider_config.kannel_port}/status"
             params = {
                 'username': self.provider_config.kannel_username,
                 'password': self.provider_config.kannel_password,
             }
 
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(url, params=params)
-
-                if response.status_code == 200:
-                    return {
-                        'status': 'unknown',
-                        'message': 'Check Kannel DLR logs for detailed delivery status'
-                    }
-                else:
-                    return {
-                        'status': 'error',
-                        'message': f'Kannel status page returned {response.status_code}'
-                    }
+            response = await self.client.get("/status", params=params, timeout=10.0)
+
+            if response.status_code == 200:
+                return {
+                    'status': 'unknown',
+                    'message': 'Check Kannel DLR logs for detailed delivery status'
+                }
+            else:
+                return {
+                    'status': 'error',
+                    'message': f'Kannel status page returned {response.status_code}'
+                }
         except Exception as e:
             return {
                 'status': 'error',
                 'message': str(e)
             }
 
+    def parse_delivery_report(self, report: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Map a Kannel DLR (``id``, ``type`` = %d, ``reply`` = %A) to a status report.
+        Intermediate events (buffered, SMSC submit) carry no status change.
+
+        ``id`` is the notification id (see `_deliver`), so the report is matched
+        on the notification even before its send result was written.
+        """
+        if 'type' not in report:
+            return super().parse_delivery_report(report)
+
+        try:
+            status = self.DLR_STATUSES.get(int(report['type']))
+        except (TypeError, ValueError):
+            status = None
+
+        if status is None:
+            return None
+
+        try:
+            notification_id = UUID(str(report.get('id')))
+        except ValueError:
+            return None
+
+        return super().parse_delivery_report({
+            'notification_id': notification_id,
+            'status': status,
+            'error_message': report.get('reply') if status != NotificationStatusEnum.DELIVERED else None,
+        })
+
     async def validate_config(self) -> bool:
         """
         Validate Kannel configuration by checking status page.
         """
         try:
-            url = f"http://{self.provider_config.kannel_host}:{self.provider_config.kannel_port}/status"
             params = {
                 'username': self.provider_config.kannel_username,
                 'password': self.provider_config.kannel_password,
             }
 
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(url, params=params)
-                is_valid = response.status_code == 200
+            response = await self.client.get("/status", params=params, timeout=5.0)
+            is_valid = response.status_code == 200
 
-                if is_valid:
-                    logger.info(f"Kannel configuration validated successfully")
-                else:
-                    logger.error(f"Kannel validation failed with status {response.status_code}")
+            if is_valid:
+                logger.info(f"Kannel configuration validated successfully")
+            else:
+                logger.error(f"Kannel validation failed with status {response.status_code}")
 
-                return is_valid
+            return is_valid
         except Exception as e:
             logger.error(f"Kannel configuration validation failed: {str(e)}")
             return False
 
     @property
     def provider_type(self):
-        return ProviderTypeEnum.SMS
+        return ProviderTypeEnum.KANNEL
 
     def supports_delivery_confirmation(self) -> bool:
         return True  # Kannel supports DLR (Delivery Reports)
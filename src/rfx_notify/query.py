@@ -1,7 +1,18 @@
+import hmac
+
 from fluvius.query import DomainQueryManager
+from fastapi import Request
+from fastapi.responses import PlainTextResponse
+from fluvius.error import ForbiddenError
 
 from .state import NotifyStateManager
 from .domain import NotifyServiceDomain
+from .outbox import notification_outbox
+from .service import notification_service
+from .batch import delivery_report_buffer
+from .metrics import registry
+from .types import ProviderTypeEnum
+from . import config
 
 
 class NotifyServiceQueryManager(DomainQueryManager):
@@ -16,6 +27,45 @@ resource = NotifyServiceQueryManager.register_resource
 endpoint = NotifyServiceQueryManager.register_endpoint
 
 
+@endpoint(".outbox-stats")
+async def get_outbox_stats(query_manager: NotifyServiceQueryManager, request: Request):
+    """Outbox queue depth: queued jobs, PENDING/PROCESSING rows and expired leases."""
+    return await notification_outbox.stats()
+
+
+@endpoint(".kannel-dlr")
+async def receive_kannel_dlr(query_manager: NotifyServiceQueryManager, request: Request):
+    """
+    Kannel delivery report callback (dlr-url). Reports are buffered and applied
+    in batches rather than one update per request. The endpoint is disabled
+    unless NOTIFY_DLR_TOKEN is configured.
+    """
+    params = request.query_params
+    if not config.NOTIFY_DLR_TOKEN:
+        raise ForbiddenError("NOTIFY.403.02", "Delivery reports are disabled")
+    if not hmac.compare_digest(params.get("token", ""), config.NOTIFY_DLR_TOKEN):
+        raise ForbiddenError("NOTIFY.403.01", "Invalid delivery report token")
+
+    provider = notification_service.get_providers(initialize=True).get(ProviderTypeEnum.KANNEL)
+    report = provider.parse_delivery_report(dict(params)) if provider else None
+    if report:
+        await delivery_report_buffer.add(report)
+
+    return {"accepted": bool(report)}
+
+
+@endpoint(".provider-status")
+async def get_provider_status(query_manager: NotifyServiceQueryManager, request: Request):
+    """Per-provider rate limiter and circuit breaker state."""
+    return notification_service.get_provider_states()
+
+
+@endpoint(".metrics")
+async def get_metrics(query_manager: NotifyServiceQueryManager, request: Request):
+    """Pipeline metrics of this process in the Prometheus text format."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 # @resource('notifications')
 # class NotificationQuery(DomainQueryResource):
 #     """Query resource for notifications."""
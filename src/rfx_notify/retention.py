@@ -0,0 +1,65 @@
+"""
+Partition maintenance and retention for notification history
+
+When `notification` and `notification_delivery_log` are partitioned by month
+(mig/updates/partition_notification.sql), partitions for the coming months are
+created ahead of time and partitions entirely older than
+NOTIFY_RETENTION_MONTHS are detached: moved to NOTIFY_RETENTION_ARCHIVE_SCHEMA,
+or dropped when no archive schema is configured. On unpartitioned tables this
+is a no-op. Idempotency keys older than NOTIFY_IDEMPOTENCY_RETENTION are
+deleted on every run.
+"""
+from typing import Optional
+
+from .periodic import PeriodicTask
+from . import config, logger
+
+PARTITIONED_TABLES = ("notification", "notification_delivery_log")
+
+
+class NotificationRetention(PeriodicTask):
+    """
+    Periodic partition maintenance.
+    """
+
+    label = "retention"
+
+    def __init__(self, *, poll_interval: Optional[float] = None):
+        super().__init__(poll_interval=poll_interval or config.NOTIFY_RETENTION_INTERVAL)
+        self.months_ahead = config.NOTIFY_PARTITION_MONTHS_AHEAD
+        self.retain_months = config.NOTIFY_RETENTION_MONTHS
+        self.archive_schema = config.NOTIFY_RETENTION_ARCHIVE_SCHEMA
+
+    async def run_once(self) -> int:
+        """
+        Returns:
+            Number of partitions detached
+        """
+        async with self.statemgr.transaction():
+            purged = await self.statemgr.purge_idempotency_keys(config.NOTIFY_IDEMPOTENCY_RETENTION)
+        if purged:
+            logger.info(f"Deleted {purged} expired idempotency keys")
+
+        async with self.statemgr.transaction():
+            result = await self.statemgr.maintain_partitions(
+                PARTITIONED_TABLES,
+                self.months_ahead,
+                self.retain_months,
+                self.archive_schema,
+            )
+
+        if result is None:
+            logger.info("Partition maintenance is running elsewhere, skipping")
+            return 0
+
+        if result["created"]:
+            logger.info(f"Created {result['created']} notification partitions")
+        if result["detached"]:
+            target = self.archive_schema or "dropped"
+            logger.warning(f"Detached expired notification partitions ({target}): {', '.join(result['detached'])}")
+
+        return len(result["detached"])
+
+
+# Process-wide retention instance
+notification_retention = NotificationRetention()
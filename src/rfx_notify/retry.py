@@ -0,0 +1,34 @@
+"""
+Notification Retry Engine - automatic redelivery of failed notifications
+
+A failed delivery records `next_retry_at` (exponential backoff with jitter, see
+`helper.next_retry_at`) while `retry_count < max_retries`. The retry engine
+claims FAILED/REJECTED rows whose retry is due in batches, increments their
+`retry_count` and redelivers them through the pooled providers. Outcomes and
+delivery logs are written in bulk by the providers' batched delivery path.
+"""
+from .scheduler import NotificationScheduler
+from . import config
+
+
+class NotificationRetryEngine(NotificationScheduler):
+    """
+    Polls for retriable notifications and redelivers them in batches.
+    """
+
+    label = "retried"
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("batch_size", config.NOTIFY_RETRY_BATCH_SIZE)
+        kwargs.setdefault("max_batches", config.NOTIFY_RETRY_MAX_BATCHES)
+        kwargs.setdefault("poll_interval", config.NOTIFY_RETRY_POLL_INTERVAL)
+        # Retries are due shortly after a failure, well within the claim window
+        kwargs.setdefault("sweep_interval", 0)
+        super().__init__(**kwargs)
+
+    async def _claim(self, older: bool = False):
+        return await self.statemgr.claim_retriable_notifications(self.batch_size, self.lease_seconds)
+
+
+# Process-wide retry engine instance
+notification_retry_engine = NotificationRetryEngine()
@@ -0,0 +1,107 @@
+"""
+Notification Scheduler - delivers notifications once their scheduled_at is due
+
+Scheduled notifications are persisted as PENDING. The scheduler claims due rows
+in batches (see `NotifyStateManager.claim_due_notifications`) and hands them to
+`NotificationService.deliver_entries`. Claims use `FOR UPDATE SKIP LOCKED` and
+a lease, so any number of scheduler instances can run side by side. A row
+whose lease expired (held by a crashed scheduler or retry engine, or left
+behind by a failed result write) is claimed again, whatever the delivery
+mode. Digest rows claimed together are merged before delivery (see `digest`).
+Claims scan rows created within NOTIFY_CLAIM_WINDOW_DAYS; rows scheduled
+further ahead are picked up by a sweep every NOTIFY_SCHEDULER_SWEEP_INTERVAL.
+"""
+import time
+from typing import Optional
+
+from .digest import coalesce_entries, coalesced_updates
+from .periodic import PeriodicTask
+from .service import notification_service
+from . import config, logger
+
+
+class NotificationScheduler(PeriodicTask):
+    """
+    Polls for due notifications and dispatches them in batches.
+    """
+
+    label = "scheduled"
+
+    def __init__(
+        self,
+        *,
+        batch_size: Optional[int] = None,
+        max_batches: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        lease_seconds: Optional[int] = None,
+        sweep_interval: Optional[float] = None,
+    ):
+        super().__init__(poll_interval=poll_interval or config.NOTIFY_SCHEDULER_POLL_INTERVAL)
+        self.batch_size = batch_size or config.NOTIFY_SCHEDULER_BATCH_SIZE
+        self.max_batches = max_batches or config.NOTIFY_SCHEDULER_MAX_BATCHES
+        self.lease_seconds = lease_seconds or config.NOTIFY_SCHEDULER_LEASE_SECONDS
+        self.sweep_interval = config.NOTIFY_SCHEDULER_SWEEP_INTERVAL if sweep_interval is None else sweep_interval
+        self._swept_at: Optional[float] = None
+
+    async def dispatch_due(self, older: bool = False) -> int:
+        """
+        Claim and deliver one batch of due notifications; with `older`, of
+        notifications created before the claim window.
+
+        Returns:
+            Number of notifications dispatched
+        """
+        async with self.statemgr.transaction():
+            entries = await self._claim(older)
+
+        if not entries:
+            return 0
+
+        logger.info(f"Dispatching {len(entries)} {self.label} notifications")
+        deliverable, coalesced = coalesce_entries(entries)
+        results = await notification_service.deliver_entries(deliverable)
+
+        if coalesced:
+            async with self.statemgr.transaction():
+                await self.statemgr.apply_delivery_results(coalesced_updates(results, coalesced))
+
+        return len(entries)
+
+    async def _claim(self, older: bool = False):
+        return await self.statemgr.claim_due_notifications(self.batch_size, self.lease_seconds, older)
+
+    async def run_once(self) -> int:
+        """
+        Drain due notifications, up to `max_batches` batches per tick. Every
+        `sweep_interval` seconds, rows created before the claim window (far-future
+        schedules) are drained as well.
+        """
+        total = await self._drain()
+        if self._sweep_due():
+            total += await self._drain(older=True)
+        return total
+
+    async def _drain(self, older: bool = False) -> int:
+        total = 0
+        for _ in range(self.max_batches):
+            dispatched = await self.dispatch_due(older)
+            total += dispatched
+            if dispatched < self.batch_size:
+                break
+
+        return total
+
+    def _sweep_due(self) -> bool:
+        if self.sweep_interval <= 0:
+            return False
+
+        now = time.monotonic()
+        if self._swept_at is not None and now - self._swept_at < self.sweep_interval:
+            return False
+
+        self._swept_at = now
+        return True
+
+
+# Process-wide scheduler instance
+notification_scheduler = NotificationScheduler()
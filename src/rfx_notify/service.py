@@ -1,9 +1,12 @@
 """
 Notification Service - Provider Management and Notification Delivery
 """
-from typing import Dict, Any, Optional
+import asyncio
+from typing import Dict, Any, List, Optional
 
 from .providers import NotificationProviderBase
+from .metrics import IN_FLIGHT, SEND_DURATION
+from .throttle import ProviderThrottle
 from .types import (
     NotificationChannelEnum,
     ProviderTypeEnum,
@@ -36,7 +39,83 @@ class NotificationService:
         Returns:
             Dictionary containing status, provider_message_id, response, and error
         """
-        channel_value = self._get_field(notification, "channel")
+        provider_instance = self._resolve_provider(notification)
+        provider_type = provider_instance.provider_type
+        with IN_FLIGHT.track(kind="send", provider=provider_type), SEND_DURATION.time(provider=provider_type):
+            result = await provider_instance.send(notification)
+        return result
+
+    async def create_pending(self, notification: Any):
+        """
+        Persist one PENDING record per recipient without delivering it.
+
+        Args:
+            notification: Notification payload with recipients
+
+        Returns:
+            List of created notification records
+        """
+        provider_instance = self._resolve_provider(notification)
+        return await provider_instance.create_entries(
+            notification, status=NotificationStatusEnum.PENDING
+        )
+
+    async def deliver_entries(self, entries: List[Any]) -> List[Dict[str, Any]]:
+        """
+        Deliver already claimed notification records (status PROCESSING).
+
+        Records are grouped by provider and each group goes through the
+        provider's batched delivery path; groups are delivered concurrently.
+
+        Args:
+            entries: Notification records, possibly for different channels
+
+        Returns:
+            Per-record results (grouped by provider)
+        """
+        groups: Dict[int, List[Any]] = {}
+        providers: Dict[int, NotificationProviderBase] = {}
+        for entry in entries:
+            provider_instance = self._resolve_provider(entry)
+            groups.setdefault(id(provider_instance), []).append(entry)
+            providers[id(provider_instance)] = provider_instance
+
+        batches = await asyncio.gather(*(
+            providers[key].deliver_entries(group)
+            for key, group in groups.items()
+        ))
+        return [result for batch in batches for result in batch]
+
+    async def apply_delivery_reports(
+        self,
+        provider_key: str,
+        reports: List[Dict[str, Any]],
+    ) -> List[Any]:
+        """
+        Normalize raw provider delivery reports and apply them in one set-based update.
+
+        Args:
+            provider_key: Provider type key (e.g., SMTP, KANNEL)
+            reports: Raw reports in the provider's format
+
+        Returns:
+            Updated rows (_id, provider_message_id, status)
+        """
+        provider_instance = self._get_provider_instance(ProviderTypeEnum(provider_key))
+        if not provider_instance:
+            raise ValueError(f'No provider implementation available for {provider_key}')
+
+        parsed = [provider_instance.parse_delivery_report(report) for report in reports]
+        parsed = [report for report in parsed if report]
+        if not parsed:
+            return []
+
+        statemgr = provider_instance.statemgr
+        async with statemgr.transaction():
+            return await statemgr.apply_status_reports(parsed)
+
+    def _resolve_provider(self, notification: Any) -> NotificationProviderBase:
+        channel_value = self._enum_value(self._get_field(notification, "channel"))
         channel = NotificationChannelEnum(channel_value)
 
         provider_type = self._determine_provider_type(notification, channel)
@@ -44,8 +123,7 @@ class NotificationService:
         if not provider_instance:
             raise ValueError(f'No provider implementation available for {provider_type.value}')
 
-        result = await provider_instance.send(notification)
-        return result
+        return provider_instance
 
     async def check_notification_status(
         self,
@@ -98,9 +176,9 @@ class NotificationService:
         2. provider_type declared inside notification.meta
         3. Default mapping per channel using configured credentials
         """
-        explicit_type = self._get_field(notification, 'provider_type')
+        explicit_type = self._enum_value(self._get_field(notification, 'provider_type'))
         if explicit_type:
-            return ProviderTypeEnum(explicit_type if isinstance(explicit_type, str) else explicit_type)
+            return ProviderTypeEnum(explicit_type)
 
         meta = self._get_field(notification, 'meta', {}) or {}
         meta_type = meta.get('provider_type')
@@ -143,9 +221,31 @@ class NotificationService:
             logger.error(f"Provider [{provider_name}] failed to initialize: {exc}")
             return None
 
+        provider_instance.throttle = ProviderThrottle(*provider_instance.get_throughput_limit())
         self._provider_cache[provider_type] = provider_instance
         return provider_instance
 
+    def get_providers(self, initialize: bool = False) -> Dict[ProviderTypeEnum, NotificationProviderBase]:
+        """
+        Providers keyed by provider type: the already initialized ones, or every
+        registered provider when `initialize` is set.
+        """
+        if initialize:
+            for provider_type in self.PROVIDER_NAMES:
+                self._get_provider_instance(provider_type)
+
+        return dict(self._provider_cache)
+
+    def get_provider_states(self) -> Dict[str, Any]:
+        """
+        Rate-limit and circuit-breaker state of every initialized provider, for monitoring.
+        """
+        return {
+            provider_type.value: provider_instance.throttle.state()
+            for provider_type, provider_instance in self._provider_cache.items()
+            if provider_instance.throttle is not None
+        }
+
 
     def _extract_provider_kwargs(self, notification: Any) -> Dict[str, Any]:
         """
@@ -182,6 +282,24 @@ class NotificationService:
 
         return getattr(notification, field, default)
 
+    @staticmethod
+    def _enum_value(value: Any) -> Any:
+        # Records loaded from the database carry the schema-side enums
+        return value.value if hasattr(value, "value") else value
+
+    async def close(self):
+        """
+        Close every cached provider, releasing pooled connections.
+        """
+        providers = list(self._provider_cache.values())
+        self._provider_cache.clear()
+
+        for provider_instance in providers:
+            try:
+                await provider_instance.close()
+            except Exception as e:
+                logger.error(f"Failed to close provider {provider_instance.name}: {str(e)}")
+
     async def validate_provider(self, provider_key: str) -> bool:
         """
         Validate a provider's configuration.
@@ -206,3 +324,7 @@ class NotificationService:
         except Exception as e:
             logger.error(f"Provider validation failed: {str(e)}")
             return False
+
+
+# Process-wide service instance so provider connection pools are shared across commands
+notification_service = NotificationService()
@@ -1,5 +1,13 @@
+import asyncio
+import contextvars
+import json
+
+from fluvius.data import UUID_GENR, serialize_json
 from fluvius.domain.state import DataAccessManager
-from rfx_schema.rfx_notify import RFXNotifyConnector
+from rfx_schema.rfx_notify import RFXNotifyConnector, SCHEMA
+
+from .priority import lane_sql_rank
+from . import config
 
 
 class NotifyStateManager(DataAccessManager):
@@ -13,3 +21,413 @@ class NotifyStateManager(DataAccessManager):
 
     async def add_notification_log(self, **data):
         return await self._add_entry('notification_delivery_log', **data)
+
+    async def insert_notifications(self, *records):
+        """Multi-row insert of notification records, chunked to stay under the bind parameter limit."""
+        chunk_size = config.NOTIFY_BULK_INSERT_CHUNK_SIZE
+        for offset in range(0, len(records), chunk_size):
+            await self.insert_data('notification', *records[offset:offset + chunk_size])
+
+    async def add_notification_logs(self, *logs):
+        chunk_size = config.NOTIFY_BULK_INSERT_CHUNK_SIZE
+        for offset in range(0, len(logs), chunk_size):
+            await self.insert_data('notification_delivery_log', *logs[offset:offset + chunk_size])
+
+    async def apply_delivery_results(self, updates):
+        """
+        Apply final delivery state to many notifications in a single UPDATE.
+
+        ``updates`` items carry ``_id``, ``status``, ``provider_type``,
+        ``provider_message_id``, ``provider_response`` and optionally
+        ``error_message``, ``sent_at``, ``failed_at``, ``scheduled_at`` and
+        ``next_retry_at``.
+        Optional columns left as None keep their current value, except
+        ``next_retry_at`` which is always replaced. A SENT result never replaces
+        a final status a delivery report already applied.
+        """
+        if not updates:
+            return
+
+        schema = SCHEMA
+        await self.native_query(
+            f"""
+            UPDATE "{schema}"."notification" AS n
+               SET status = CASE
+                        WHEN v.status = 'SENT' AND n.status IN ('DELIVERED', 'FAILED', 'REJECTED', 'BOUNCED') THEN n.status
+                        ELSE v.status::"{schema}".notificationstatusenum
+                   END,
+                   provider_type = v.provider_type::"{schema}".providertypeenum,
+                   provider_message_id = v.provider_message_id,
+                   provider_response = v.provider_response::jsonb,
+                   error_message = COALESCE(v.error_message, n.error_message),
+                   sent_at = COALESCE(v.sent_at, n.sent_at),
+                   failed_at = COALESCE(v.failed_at, n.failed_at),
+                   scheduled_at = COALESCE(v.scheduled_at, n.scheduled_at),
+                   next_retry_at = v.next_retry_at,
+                   _updated = now()
+              FROM unnest(
+                    $1::uuid[], $2::text[], $3::text[], $4::text[],
+                    $5::text[], $6::text[], $7::timestamptz[], $8::timestamptz[],
+                    $9::timestamptz[], $10::timestamptz[]
+                   ) AS v(_id, status, provider_type, provider_message_id,
+                          provider_response, error_message, sent_at, failed_at,
+                          scheduled_at, next_retry_at)
+             WHERE n._id = v._id
+            """,
+            [u['_id'] for u in updates],
+            [u['status'] for u in updates],
+            [u.get('provider_type') for u in updates],
+            [u.get('provider_message_id') for u in updates],
+            [serialize_json(u.get('provider_response') or {}) for u in updates],
+            [u.get('error_message') for u in updates],
+            [u.get('sent_at') for u in updates],
+            [u.get('failed_at') for u in updates],
+            [u.get('scheduled_at') for u in updates],
+            [u.get('next_retry_at') for u in updates],
+            unwrapper=None,
+        )
+
+    async def expire_leases(self, ids):
+        """
+        Give PROCESSING notifications an already expired lease, so lease
+        recovery picks them up.
+        """
+        if not ids:
+            return
+
+        schema = SCHEMA
+        await self.native_query(
+            f"""
+            UPDATE "{schema}"."notification"
+               SET lease_expires_at = now(),
+                   _updated = now()
+             WHERE _id = ANY($1::uuid[])
+               AND status = 'PROCESSING'::"{schema}".notificationstatusenum
+            """,
+            list(ids),
+            unwrapper=None,
+        )
+
+    async def claim_due_notifications(self, limit, lease_seconds, older=False):
+        """
+        Claim up to ``limit`` scheduled notifications that are due.
+
+        Due PENDING rows, and PROCESSING rows whose lease expired (a crashed
+        scheduler, retry engine or batch writer), are locked with
+        ``FOR UPDATE SKIP LOCKED`` and moved to PROCESSING with a new lease,
+        so concurrent schedulers never claim the same row. Higher priority
+        lanes are claimed first.
+
+        Only rows created within NOTIFY_CLAIM_WINDOW_DAYS are scanned, so older
+        partitions are pruned; with ``older`` only the rows created before
+        that window are (the occasional sweep for far-future schedules).
+        """
+        schema = SCHEMA
+        created = "_created <= now() - make_interval(days => $3)" if older else "_created > now() - make_interval(days => $3)"
+        return await self.native_query(
+            f"""
+            UPDATE "{schema}"."notification" AS n
+               SET status = 'PROCESSING'::"{schema}".notificationstatusenum,
+                   lease_expires_at = now() + make_interval(secs => $2),
+                   _updated = now()
+              FROM (
+                    SELECT _id
+                      FROM "{schema}"."notification"
+                     WHERE {created}
+                       AND (
+                            (
+                                status = 'PENDING'::"{schema}".notificationstatusenum
+                                AND scheduled_at <= now()
+                            )
+                            OR (
+                                status = 'PROCESSING'::"{schema}".notificationstatusenum
+                                AND lease_expires_at < now()
+                            )
+                       )
+                     ORDER BY {lane_sql_rank()}, scheduled_at, recipient_address
+                     LIMIT $1
+                       FOR UPDATE SKIP LOCKED
+                   ) AS due
+             WHERE n._id = due._id
+            RETURNING n.*
+            """,
+            limit,
+            lease_seconds,
+            config.NOTIFY_CLAIM_WINDOW_DAYS,
+        )
+
+    async def claim_retriable_notifications(self, limit, lease_seconds):
+        """
+        Claim up to ``limit`` FAILED/REJECTED notifications whose next retry is due.
+
+        Claimed rows move to PROCESSING with a lease and an incremented
+        ``retry_count``; ``FOR UPDATE SKIP LOCKED`` keeps concurrent retry
+        engines from claiming the same row. Higher priority lanes are claimed
+        first.
+        """
+        schema = SCHEMA
+        return await self.native_query(
+            f"""
+            UPDATE "{schema}"."notification" AS n
+               SET status = 'PROCESSING'::"{schema}".notificationstatusenum,
+                   retry_count = n.retry_count + 1,
+                   next_retry_at = NULL,
+                   lease_expires_at = now() + make_interval(secs => $2),
+                   _updated = now()
+              FROM (
+                    SELECT _id
+                      FROM "{schema}"."notification"
+                     WHERE _created > now() - make_interval(days => $3)
+                       AND status IN (
+                            'FAILED'::"{schema}".notificationstatusenum,
+                            'REJECTED'::"{schema}".notificationstatusenum
+                       )
+                       AND retry_count < max_retries
+                       AND (next_retry_at IS NULL OR next_retry_at <= now())
+                     ORDER BY {lane_sql_rank()}, next_retry_at NULLS FIRST
+                     LIMIT $1
+                       FOR UPDATE SKIP LOCKED
+                   ) AS due
+             WHERE n._id = due._id
+            RETURNING n.*
+            """,
+            limit,
+            lease_seconds,
+            config.NOTIFY_CLAIM_WINDOW_DAYS,
+        )
+
+    async def apply_status_reports(self, reports):
+        """
+        Apply provider delivery reports to many notifications in a single UPDATE
+        per match column.
+
+        ``reports`` items carry ``status`` and either ``notification_id`` or
+        ``provider_message_id``, and optionally ``provider_type``,
+        ``error_message`` and ``reported_at``. Reports with a notification id
+        are matched on ``_id``, the others through the ``provider_message_id``
+        index. DELIVERED is final and never overwritten by a late report;
+        ``delivered_at`` / ``failed_at`` are stamped according to the new status.
+
+        Returns:
+            The updated rows (``_id``, ``provider_message_id``, ``status``)
+        """
+        by_id = [r for r in reports if r.get('notification_id')]
+        by_message_id = [r for r in reports if not r.get('notification_id')]
+
+        rows = []
+        if by_id:
+            rows += await self._apply_status_reports(
+                by_id, "n._id = v.match_key::uuid", [str(r['notification_id']) for r in by_id]
+            )
+        if by_message_id:
+            rows += await self._apply_status_reports(
+                by_message_id, "n.provider_message_id = v.match_key", [r['provider_message_id'] for r in by_message_id]
+            )
+        return rows
+
+    async def _apply_status_reports(self, reports, match, match_keys):
+        schema = SCHEMA
+        return await self.native_query(
+            f"""
+            UPDATE "{schema}"."notification" AS n
+               SET status = v.status::"{schema}".notificationstatusenum,
+                   delivered_at = CASE
+                        WHEN v.status = 'DELIVERED' THEN COALESCE(v.reported_at, now())
+                        ELSE n.delivered_at
+                   END,
+                   failed_at = CASE
+                        WHEN v.status IN ('FAILED', 'REJECTED', 'BOUNCED') THEN COALESCE(v.reported_at, now())
+                        ELSE n.failed_at
+                   END,
+                   error_message = COALESCE(v.error_message, n.error_message),
+                   _updated = now()
+              FROM unnest(
+                    $1::text[], $2::text[], $3::text[], $4::text[], $5::timestamptz[]
+                   ) AS v(match_key, provider_type, status, error_message, reported_at)
+             WHERE {match}
+               AND (v.provider_type IS NULL OR n.provider_type = v.provider_type::"{schema}".providertypeenum)
+               AND n.status <> 'DELIVERED'::"{schema}".notificationstatusenum
+            RETURNING n._id, n.provider_message_id, n.status
+            """,
+            match_keys,
+            [r.get('provider_type') for r in reports],
+            [r['status'] for r in reports],
+            [r.get('error_message') for r in reports],
+            [r.get('reported_at') for r in reports],
+        )
+
+    async def maintain_partitions(self, tables, months_ahead, retain_months, archive_schema):
+        """
+        Create upcoming monthly partitions and detach expired ones.
+
+        Runs under a transaction-scoped advisory lock so concurrent maintainers
+        skip instead of racing on DDL. Tables that are not partitioned are left
+        untouched.
+
+        Returns:
+            {"created": number of partitions created, "detached": [partition names]}
+            or None when another maintainer holds the lock
+        """
+        schema = SCHEMA
+        locked = await self.native_query(
+            "SELECT pg_try_advisory_xact_lock(hashtext($1)) AS locked",
+            f"{schema}.maintain_partitions",
+        )
+        if not locked[0].locked:
+            return None
+
+        created, detached = 0, []
+        for table in tables:
+            rows = await self.native_query(
+                f'SELECT "{schema}".ensure_monthly_partitions($1, $2) AS created',
+                table,
+                months_ahead,
+            )
+            created += rows[0].created
+
+            rows = await self.native_query(
+                f'SELECT "{schema}".detach_expired_partitions($1, $2, $3) AS name',
+                table,
+                retain_months,
+                archive_schema,
+            )
+            detached.extend(row.name for row in rows)
+
+        return {"created": created, "detached": detached}
+
+    async def claim_idempotency_key(self, scope, key, claim_timeout):
+        """
+        Claim an idempotency key for execution.
+
+        A key is claimed when it is new, or when an earlier claim never stored
+        a result and is older than ``claim_timeout`` seconds (a crashed
+        request). The unique (scope, idempotency_key) constraint makes this
+        safe across processes.
+
+        Returns:
+            True when the caller owns the key and should execute the request
+        """
+        schema = SCHEMA
+        rows = await self.native_query(
+            f"""
+            INSERT INTO "{schema}"."notification_idempotency" AS k
+                   (_id, scope, idempotency_key, _created, _updated)
+            VALUES ($1, $2, $3, now(), now())
+            ON CONFLICT (scope, idempotency_key) DO UPDATE
+               SET _updated = now()
+             WHERE k.result IS NULL
+               AND k._updated < now() - make_interval(secs => $4)
+            RETURNING k._id
+            """,
+            UUID_GENR(),
+            scope,
+            key,
+            claim_timeout,
+        )
+        return bool(rows)
+
+    async def store_idempotency_result(self, scope, key, result):
+        schema = SCHEMA
+        await self.native_query(
+            f"""
+            UPDATE "{schema}"."notification_idempotency"
+               SET result = $3::jsonb,
+                   _updated = now()
+             WHERE scope = $1
+               AND idempotency_key = $2
+            """,
+            scope,
+            key,
+            serialize_json(result),
+            unwrapper=None,
+        )
+
+    async def release_idempotency_key(self, scope, key):
+        """Drop a claim whose request failed, so the request may be repeated."""
+        schema = SCHEMA
+        await self.native_query(
+            f"""
+            DELETE FROM "{schema}"."notification_idempotency"
+             WHERE scope = $1
+               AND idempotency_key = $2
+               AND result IS NULL
+            """,
+            scope,
+            key,
+            unwrapper=None,
+        )
+
+    async def load_idempotency_result(self, scope, key):
+        """
+        Returns:
+            The stored result of a key, or None when the key is unknown or its
+            request has not finished
+        """
+        schema = SCHEMA
+        rows = await self.native_query(
+            f"""
+            SELECT result
+              FROM "{schema}"."notification_idempotency"
+             WHERE scope = $1
+               AND idempotency_key = $2
+               AND result IS NOT NULL
+            """,
+            scope,
+            key,
+        )
+        if not rows:
+            return None
+
+        result = rows[0].result
+        return json.loads(result) if isinstance(result, str) else result
+
+    async def purge_idempotency_keys(self, max_age):
+        """Delete idempotency keys older than ``max_age`` seconds."""
+        schema = SCHEMA
+        rows = await self.native_query(
+            f"""
+            DELETE FROM "{schema}"."notification_idempotency"
+             WHERE _created < now() - make_interval(secs => $1)
+            RETURNING _id
+            """,
+            max_age,
+        )
+        return len(rows)
+
+
+class TaskStateManager:
+    """
+    Per-task `NotifyStateManager` attribute of a process-wide object.
+
+    The providers, the outbox and the send guards are shared by concurrent
+    commands and worker jobs, which must not share one state manager and its
+    transaction. Reading the attribute returns the state manager of the
+    current asyncio task, created on first use; assigning it pins one state
+    manager for every task (tests, tools).
+    """
+
+    def __set_name__(self, owner, name):
+        self.attr = f"_{name}"
+        self.current = contextvars.ContextVar(f"{owner.__module__}.{owner.__qualname__}.{name}", default=None)
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+
+        pinned = obj.__dict__.get(self.attr)
+        if pinned is not None:
+            return pinned
+
+        # Child tasks inherit the context of their parent, so the owning task is checked too
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        current = self.current.get()
+        if current is None or current[0] is not task:
+            current = (task, NotifyStateManager(None))
+            self.current.set(current)
+        return current[1]
+
+    def __set__(self, obj, statemgr: NotifyStateManager):
+        obj.__dict__[self.attr] = statemgr
@@ -0,0 +1,224 @@
+"""
+Provider throughput control - token-bucket rate limiting and circuit breaking
+
+`NotificationService` attaches one `ProviderThrottle` to every provider it
+creates. Each delivery attempt first asks the circuit breaker whether the
+provider is usable, then waits for a slot in its priority lane (see
+`rfx_notify.priority`) and for a token from the provider's bucket.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from .priority import PriorityGate
+from . import config
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at ``rate`` tokens per second, holding at most ``burst``.
+    A non-positive rate disables limiting.
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.burst = max(1, burst or int(rate) or 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: int = 1):
+        """Wait until ``tokens`` tokens are available and take them."""
+        if not self.enabled:
+            return
+
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with self._lock:
+            self._refill()
+            if self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+                # A request larger than the burst waited for its whole deficit
+                self._tokens = max(self._tokens, float(tokens))
+            self._tokens -= tokens
+
+    def state(self) -> Dict[str, Any]:
+        if not self.enabled:
+            return {"enabled": False}
+
+        self._refill()
+        return {
+            "enabled": True,
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "available_tokens": round(self._tokens, 2),
+        }
+
+
+class CircuitBreaker:
+    """
+    Error-rate circuit breaker.
+
+    CLOSED: calls pass; once at least ``min_requests`` outcomes were recorded in
+    the last ``window_seconds`` and the failure ratio reaches
+    ``failure_ratio``, the circuit OPENs.
+    OPEN: calls are rejected for ``open_seconds``, then the circuit turns HALF_OPEN.
+    HALF_OPEN: up to ``half_open_max_calls`` probes pass; a successful probe
+    closes the circuit, a failed one opens it again.
+
+    Only provider failures (transport errors, gateway errors) are recorded as
+    failed outcomes; a recipient rejected by a working provider is not. A
+    disabled breaker allows every call.
+    """
+
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
+
+    def __init__(
+        self,
+        *,
+        failure_ratio: float,
+        min_requests: int,
+        window_seconds: float,
+        open_seconds: float,
+        half_open_max_calls: int = 1,
+        enabled: bool = True,
+    ):
+        self.enabled = enabled
+        self.failure_ratio = failure_ratio
+        self.min_requests = min_requests
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self._state = self.CLOSED
+        self._outcomes = deque()  # (monotonic time, succeeded)
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+
+    @property
+    def state_name(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until a rejected call is worth attempting again."""
+        state = self.state_name
+        if state == self.OPEN:
+            return max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+        if state == self.HALF_OPEN:
+            # Probes are in flight; their outcome decides the next state
+            return self.open_seconds
+        return 0.0
+
+    def allow(self) -> bool:
+        if not self.enabled:
+            return True
+
+        state = self.state_name
+        if state == self.CLOSED:
+            return True
+
+        if state == self.HALF_OPEN and self._probes < self.half_open_max_calls:
+            self._probes += 1
+            return True
+
+        return False
+
+    def record(self, succeeded: bool):
+        if not self.enabled:
+            return
+
+        if self._state == self.HALF_OPEN:
+            if succeeded:
+                self._close()
+            else:
+                self._open()
+            return
+
+        now = time.monotonic()
+        self._outcomes.append((now, succeeded))
+        if not succeeded:
+            self._failures += 1
+        self._prune(now)
+
+        total = len(self._outcomes)
+        if (
+            self._state == self.CLOSED
+            and total >= self.min_requests
+            and self._failures / total >= self.failure_ratio
+        ):
+            self._open()
+
+    def release(self):
+        """Give back the probe slot of an allowed call that produced no outcome."""
+        if self._state == self.HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    def _prune(self, now: float):
+        cutoff = now - self.window_seconds
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            _, succeeded = self._outcomes.popleft()
+            if not succeeded:
+                self._failures -= 1
+
+    def _open(self):
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+
+    def _close(self):
+        self._state = self.CLOSED
+        self._outcomes.clear()
+        self._failures = 0
+
+    def state(self) -> Dict[str, Any]:
+        if not self.enabled:
+            return {"enabled": False}
+
+        self._prune(time.monotonic())
+        total = len(self._outcomes)
+        return {
+            "state": self.state_name,
+            "requests": total,
+            "failures": self._failures,
+            "failure_ratio": round(self._failures / total, 3) if total else 0.0,
+            "retry_after": round(self.retry_after, 1),
+        }
+
+
+class ProviderThrottle:
+    """Rate limiter, circuit breaker and priority lanes guarding one provider."""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.bucket = TokenBucket(rate, burst)
+        self.lanes = PriorityGate(config.NOTIFY_PRIORITY_PROVIDER_CAPACITY)
+        self.breaker = CircuitBreaker(
+            failure_ratio=config.NOTIFY_CIRCUIT_FAILURE_RATIO,
+            min_requests=config.NOTIFY_CIRCUIT_MIN_REQUESTS,
+            window_seconds=config.NOTIFY_CIRCUIT_WINDOW_SECONDS,
+            open_seconds=config.NOTIFY_CIRCUIT_OPEN_SECONDS,
+            half_open_max_calls=config.NOTIFY_CIRCUIT_HALF_OPEN_CALLS,
+            enabled=config.NOTIFY_CIRCUIT_ENABLED,
+        )
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "rate_limit": self.bucket.state(),
+            "circuit": self.breaker.state(),
+            "lanes": self.lanes.state(),
+        }
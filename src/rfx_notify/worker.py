@@ -0,0 +1,108 @@
+"""
+Notification delivery worker (arq)
+
+Run one worker per priority lane:
+
+    arq rfx_notify.worker.NotifyOutboxWorkerSettings      # NORMAL lane + periodic jobs
+    arq rfx_notify.worker.NotifyOutboxHighWorkerSettings  # HIGH/URGENT lane
+    arq rfx_notify.worker.NotifyOutboxLowWorkerSettings   # LOW lane
+"""
+from arq import cron
+from arq.connections import RedisSettings
+
+from .outbox import notification_outbox
+from .priority import HIGH, LOW, NORMAL, outbox_queue_name
+from .scheduler import notification_scheduler
+from .retry import notification_retry_engine
+from .retention import notification_retention
+from .service import notification_service
+from . import config, logger
+
+
+async def deliver_notification(ctx, notification_id: str):
+    """Claim a queued notification and deliver it through its provider."""
+    entry = await notification_outbox.claim(notification_id)
+    if entry is None:
+        logger.info(f"Notification {notification_id} already claimed or delivered, skipping")
+        return None
+
+    result = await notification_service.send_notification(entry)
+    return {
+        "notification_id": str(notification_id),
+        "status": getattr(result.get("status"), "value", result.get("status")),
+    }
+
+
+async def recover_outbox(ctx):
+    """Re-publish notifications that were never picked up or whose lease expired."""
+    return await notification_outbox.recover()
+
+
+async def dispatch_scheduled(ctx):
+    """Deliver scheduled notifications that are due."""
+    return await notification_scheduler.run_once()
+
+
+async def retry_failed(ctx):
+    """Redeliver failed notifications whose backoff has elapsed."""
+    return await notification_retry_engine.run_once()
+
+
+async def maintain_partitions(ctx):
+    """Create upcoming notification partitions and detach expired ones."""
+    if not config.NOTIFY_RETENTION_ENABLED:
+        return 0
+    return await notification_retention.run_once()
+
+
+def _every(seconds: int):
+    """cron() arguments running a job every ``seconds`` (whole minutes above 60)."""
+    if seconds < 60:
+        return {"second": set(range(0, 60, max(1, seconds)))}
+    return {"minute": set(range(0, 60, max(1, seconds // 60))), "second": 0}
+
+
+async def startup(ctx):
+    logger.info("Notification outbox worker started")
+
+
+async def shutdown(ctx):
+    await notification_service.close()
+    await notification_outbox.close()
+
+
+class NotifyOutboxWorkerSettings:
+    functions = [deliver_notification]
+    cron_jobs = [
+        cron(recover_outbox, **_every(config.NOTIFY_OUTBOX_RECOVERY_INTERVAL), run_at_startup=True),
+        cron(dispatch_scheduled, **_every(config.NOTIFY_SCHEDULER_POLL_INTERVAL)),
+        cron(retry_failed, **_every(config.NOTIFY_RETRY_POLL_INTERVAL)),
+        cron(maintain_partitions, hour={3}, minute={15}, second=0, run_at_startup=True),
+    ]
+    queue_name = outbox_queue_name(NORMAL)
+    redis_settings = RedisSettings.from_dsn(config.NOTIFY_OUTBOX_REDIS_URL)
+    max_jobs = config.NOTIFY_OUTBOX_LANE_CONCURRENCY[NORMAL]
+    job_timeout = config.NOTIFY_OUTBOX_VISIBILITY_TIMEOUT
+    on_startup = startup
+    on_shutdown = shutdown
+
+
+# arq reads settings from the class __dict__, so lane settings repeat every field
+class NotifyOutboxHighWorkerSettings:
+    functions = [deliver_notification]
+    queue_name = outbox_queue_name(HIGH)
+    redis_settings = RedisSettings.from_dsn(config.NOTIFY_OUTBOX_REDIS_URL)
+    max_jobs = config.NOTIFY_OUTBOX_LANE_CONCURRENCY[HIGH]
+    job_timeout = config.NOTIFY_OUTBOX_VISIBILITY_TIMEOUT
+    on_startup = startup
+    on_shutdown = shutdown
+
+
+class NotifyOutboxLowWorkerSettings:
+    functions = [deliver_notification]
+    queue_name = outbox_queue_name(LOW)
+    redis_settings = RedisSettings.from_dsn(config.NOTIFY_OUTBOX_REDIS_URL)
+    max_jobs = config.NOTIFY_OUTBOX_LANE_CONCURRENCY[LOW]
+    job_timeout = config.NOTIFY_OUTBOX_VISIBILITY_TIMEOUT
+    on_startup = startup
+    on_shutdown = shutdown
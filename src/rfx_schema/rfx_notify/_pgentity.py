@@ -0,0 +1,148 @@
+"""
+RFX Notify PostgreSQL Entities
+==============================
+Partition maintenance functions for the time-partitioned ``notification`` and
+``notification_delivery_log`` tables (see mig/updates/partition_notification.sql).
+Both functions are no-ops on tables that are not partitioned.
+"""
+
+import os
+from rfx_schema import logger
+from alembic_utils.pg_function import PGFunction
+from alembic_utils.replaceable_entity import register_entities
+
+from . import SCHEMA
+
+
+fn_ensure_monthly_partitions = PGFunction(
+    schema=SCHEMA,
+    signature="ensure_monthly_partitions(parent text, months_ahead integer)",
+    definition=f"""
+    RETURNS integer
+    LANGUAGE plpgsql
+    AS $function$
+DECLARE
+    month_start timestamptz;
+    partition_name text;
+    created integer := 0;
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1
+          FROM pg_class c
+          JOIN pg_namespace n ON n.oid = c.relnamespace
+         WHERE n.nspname = '{SCHEMA}' AND c.relname = parent AND c.relkind = 'p'
+    ) THEN
+        RETURN 0;
+    END IF;
+
+    FOR i IN 0..months_ahead LOOP
+        month_start := date_trunc('month', now() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+                       + make_interval(months => i);
+        partition_name := parent || '_p' || to_char(month_start AT TIME ZONE 'UTC', 'YYYYMM');
+
+        CONTINUE WHEN to_regclass(format('%I.%I', '{SCHEMA}', partition_name)) IS NOT NULL;
+
+        BEGIN
+            EXECUTE format(
+                'CREATE TABLE %I.%I PARTITION OF %I.%I FOR VALUES FROM (%L) TO (%L)',
+                '{SCHEMA}', partition_name, '{SCHEMA}', parent,
+                month_start, month_start + interval '1 month'
+            );
+        EXCEPTION
+            WHEN invalid_object_definition THEN
+                -- Month still covered by the legacy partition
+                CONTINUE;
+            WHEN duplicate_table THEN
+                -- Created concurrently
+                CONTINUE;
+            WHEN check_violation THEN
+                -- The default partition already holds rows of this month:
+                -- detach it, create the partition, move the rows over and
+                -- attach the default partition again
+                EXECUTE format(
+                    'ALTER TABLE %I.%I DETACH PARTITION %I.%I',
+                    '{SCHEMA}', parent, '{SCHEMA}', parent || '_default'
+                );
+                EXECUTE format(
+                    'CREATE TABLE %I.%I PARTITION OF %I.%I FOR VALUES FROM (%L) TO (%L)',
+                    '{SCHEMA}', partition_name, '{SCHEMA}', parent,
+                    month_start, month_start + interval '1 month'
+                );
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM %I.%I WHERE _created >= %L AND _created < %L RETURNING *) '
+                    'INSERT INTO %I.%I SELECT * FROM moved',
+                    '{SCHEMA}', parent || '_default', month_start, month_start + interval '1 month',
+                    '{SCHEMA}', parent
+                );
+                EXECUTE format(
+                    'ALTER TABLE %I.%I ATTACH PARTITION %I.%I DEFAULT',
+                    '{SCHEMA}', parent, '{SCHEMA}', parent || '_default'
+                );
+        END;
+
+        created := created + 1;
+    END LOOP;
+
+    RETURN created;
+END;
+$function$
+    """,
+)
+
+
+fn_detach_expired_partitions = PGFunction(
+    schema=SCHEMA,
+    signature="detach_expired_partitions(parent text, retain_months integer, archive_schema text)",
+    definition=f"""
+    RETURNS SETOF text
+    LANGUAGE plpgsql
+    AS $function$
+DECLARE
+    cutoff timestamptz := date_trunc('month', now() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+                          - make_interval(months => retain_months);
+    part record;
+BEGIN
+    FOR part IN
+        SELECT c.relname,
+               substring(pg_get_expr(c.relpartbound, c.oid) FROM 'TO \\(''([^'']+)''\\)')::timestamptz AS upper_bound
+          FROM pg_inherits i
+          JOIN pg_class c ON c.oid = i.inhrelid
+          JOIN pg_class p ON p.oid = i.inhparent
+          JOIN pg_namespace n ON n.oid = p.relnamespace
+         WHERE n.nspname = '{SCHEMA}' AND p.relname = parent
+    LOOP
+        -- The DEFAULT partition has no upper bound and is never detached
+        CONTINUE WHEN part.upper_bound IS NULL OR part.upper_bound > cutoff;
+
+        EXECUTE format('ALTER TABLE %I.%I DETACH PARTITION %I.%I', '{SCHEMA}', parent, '{SCHEMA}', part.relname);
+
+        IF archive_schema IS NULL THEN
+            EXECUTE format('DROP TABLE %I.%I', '{SCHEMA}', part.relname);
+        ELSE
+            EXECUTE format('CREATE SCHEMA IF NOT EXISTS %I', archive_schema);
+            EXECUTE format('ALTER TABLE %I.%I SET SCHEMA %I', '{SCHEMA}', part.relname, archive_schema);
+        END IF;
+
+        RETURN NEXT part.relname;
+    END LOOP;
+END;
+$function$
+    """,
+)
+
+
+ALL_FUNCTIONS = [
+    fn_ensure_monthly_partitions,
+    fn_detach_expired_partitions,
+]
+
+
+def register_pg_entities(allow):
+    allow_flag = str(allow).lower() in ("1", "true", "yes", "on")
+    if not allow_flag:
+        logger.info("REGISTER_PG_ENTITIES is disabled or not set.")
+        return
+    register_entities(ALL_FUNCTIONS)
+
+
+register_pg_entities(os.environ.get("REGISTER_PG_ENTITIES"))
@@ -15,7 +15,7 @@ from datetime import datetime, time
 from typing import List, Optional
 
 
-from sqlalchemy import ARRAY, Boolean, DateTime, Enum as SQLEnum, ForeignKey, Integer, String, Text, Time, UniqueConstraint
+from sqlalchemy import ARRAY, Boolean, DateTime, Enum as SQLEnum, Index, Integer, String, Text, Time, UniqueConstraint, text
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -32,6 +32,36 @@ class Notification(TableBase):
     """Core notification entity for multi-channel delivery tracking."""
 
     __tablename__ = "notification"
+    # Partitioned monthly on _created by mig/updates/partition_notification.sql.
+    # Status indexes are partial: only active rows are ever scanned by status.
+    __table_args__ = (
+        # Outbox recovery and queue stats
+        Index(
+            "ix_notification_active", "status", "_created",
+            postgresql_where=text("status IN ('PENDING', 'PROCESSING')"),
+        ),
+        # Expired outbox leases
+        Index(
+            "ix_notification_active_lease", "lease_expires_at",
+            postgresql_where=text("status = 'PROCESSING'"),
+        ),
+        # Scheduler scan for due notifications
+        Index(
+            "ix_notification_active_scheduled", "scheduled_at",
+            postgresql_where=text("status IN ('PENDING', 'PROCESSING') AND scheduled_at IS NOT NULL"),
+        ),
+        # Retry engine scan for failed notifications
+        Index(
+            "ix_notification_retry_due", "next_retry_at",
+            postgresql_where=text("status IN ('FAILED', 'REJECTED')"),
+        ),
+        # Delivery report lookups
+        Index(
+            "ix_notification_provider_message_id", "provider_message_id",
+            postgresql_where=text("provider_message_id IS NOT NULL"),
+        ),
+        {"schema": SCHEMA}
+    )
 
     recipient_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True))
     sender_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True))
@@ -64,11 +94,13 @@ class Notification(TableBase):
     sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
     delivered_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
     failed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
 
     error_message: Mapped[Optional[str]] = mapped_column(Text)
     error_code: Mapped[Optional[str]] = mapped_column(String(64))
     retry_count: Mapped[int] = mapped_column(Integer, default=0)
     max_retries: Mapped[int] = mapped_column(Integer, default=3)
+    next_retry_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
 
     template_key: Mapped[Optional[str]] = mapped_column(String(255))
     template_version: Mapped[Optional[int]] = mapped_column(Integer)
@@ -80,8 +112,15 @@ class Notification(TableBase):
     provider_message_id: Mapped[Optional[str]] = mapped_column(String(512))
     provider_response: Mapped[dict] = mapped_column(JSONB, default=dict)
 
+    # Key of the idempotent request that created the record (see NotificationIdempotencyKey)
+    idempotency_key: Mapped[Optional[str]] = mapped_column(String(255))
+    # Coalescing group of a digest notification (see rfx_notify.digest)
+    digest_key: Mapped[Optional[str]] = mapped_column(String(255))
+
     delivery_logs: Mapped[List["NotificationDeliveryLog"]] = relationship(
-        back_populates="notification", cascade="all, delete-orphan"
+        back_populates="notification",
+        cascade="all, delete-orphan",
+        primaryjoin="Notification._id == foreign(NotificationDeliveryLog.notification_id)",
     )
 
 
@@ -89,10 +128,14 @@ class NotificationDeliveryLog(TableBase):
     """Detailed delivery attempt logs for notifications."""
 
     __tablename__ = "notification_delivery_log"
-
-    notification_id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), ForeignKey(f"{SCHEMA}.notification._id"), nullable=False
+    __table_args__ = (
+        Index("ix_notification_delivery_log_notification_id", "notification_id"),
+        {"schema": SCHEMA}
     )
+
+    # No foreign key: both tables are partitioned on _created, and a foreign key
+    # to a partitioned table would have to include the partition key
+    notification_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
     provider_type: Mapped[Optional[ProviderTypeEnum]] = mapped_column(
         SQLEnum(ProviderTypeEnum, name="providertypeenum", schema=SCHEMA)
     )
@@ -113,7 +156,30 @@ class NotificationDeliveryLog(TableBase):
 
     duration_ms: Mapped[Optional[int]] = mapped_column(Integer)
 
-    notification: Mapped["Notification"] = relationship(back_populates="delivery_logs")
+    notification: Mapped["Notification"] = relationship(
+        back_populates="delivery_logs",
+        primaryjoin="Notification._id == foreign(NotificationDeliveryLog.notification_id)",
+    )
+
+
+class NotificationIdempotencyKey(TableBase):
+    """
+    Idempotency keys of send requests and their stored results.
+
+    Kept outside the partitioned notification table so that a key is unique
+    per scope (realm) across all partitions.
+    """
+
+    __tablename__ = "notification_idempotency"
+    __table_args__ = (
+        UniqueConstraint("scope", "idempotency_key", name="uq_notification_idempotency_key"),
+        {"schema": SCHEMA}
+    )
+
+    scope: Mapped[str] = mapped_column(String(255), nullable=False, default="")
+    idempotency_key: Mapped[str] = mapped_column(String(255), nullable=False)
+    # Response of the first request; NULL while it is being executed
+    result: Mapped[Optional[dict]] = mapped_column(JSONB)
 
 
 class NotificationPreference(TableBase):
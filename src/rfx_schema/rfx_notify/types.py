@@ -19,6 +19,7 @@ class NotificationChannelEnum(Enum):
 
 class ProviderTypeEnum(Enum):
     SMTP = "SMTP"
+    KANNEL = "KANNEL"
     SENDGRID = "SENDGRID"
     SES = "SES"
     TWILIO = "TWILIO"
@@ -4,7 +4,7 @@ Generic Template Schema
 import uuid
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import String, Integer, Text, Boolean, UniqueConstraint, DateTime
+from sqlalchemy import String, Integer, Text, Boolean, UniqueConstraint, DateTime, text
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 
@@ -64,4 +64,4 @@ class TemplateRenderLog(TableBase):
     # Parameters
     parameters: Mapped[dict] = mapped_column(JSONB, default=dict)
 
-    rendered_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    rendered_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=text("now()"))
@@ -1,5 +1,6 @@
 from ._meta import config, logger
 from .domain import TemplateServiceDomain
 from .query import TemplateServiceQueryManager
+from .endpoint import configure_template_service
 from . import command
 from . import query
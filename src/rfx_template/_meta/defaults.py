@@ -6,3 +6,18 @@ DB_DSN = schema_config.RFX_TEMPLATE_DB_DSN
 
 RFX_TEMPLATE_SCHEMA = "rfx_template"
 NAMESPACE = "rfx-template"
+
+TEMPLATE_COMPILE_CACHE_SIZE = 512  # Compiled templates kept per engine (LRU); 0 disables the cache
+
+TEMPLATE_RESOLVE_CACHE_ENABLED = True  # Cache resolve_template results per process
+TEMPLATE_RESOLVE_CACHE_SIZE = 4096  # Resolutions kept (LRU)
+TEMPLATE_RESOLVE_CACHE_TTL = 3600  # Seconds a resolved template is reused
+TEMPLATE_RESOLVE_CACHE_NEGATIVE_TTL = 60  # Seconds a "not found" resolution is reused
+TEMPLATE_RESOLVE_CACHE_CHECK_INTERVAL = 5  # Seconds between checks for template changes made by other processes
+
+TEMPLATE_RENDER_LOG_ENABLED = True  # Record template_render_log rows
+TEMPLATE_RENDER_LOG_SAMPLE_RATE = 1.0  # Fraction of renders logged (0.0 - 1.0)
+TEMPLATE_RENDER_LOG_PARAMETERS = "full"  # Stored parameters: "full", "hash" (SHA-256 of the parameters) or "none"
+TEMPLATE_RENDER_LOG_FLUSH_SIZE = 200  # Buffered log rows that trigger a flush
+TEMPLATE_RENDER_LOG_FLUSH_INTERVAL_MS = 1000  # Max time a log row stays buffered
+TEMPLATE_RENDER_LOG_MAX_PENDING = 10000  # Buffered rows kept while the database is unavailable; older rows are dropped
@@ -3,7 +3,8 @@ Template Aggregate
 """
 from typing import Dict, Any, Optional
 from fluvius.domain.aggregate import Aggregate, action
-from fluvius.data import DataAccessManager, serialize_mapping
+from fluvius.data import DataAccessManager, serialize_mapping, timestamp
+from .renderlog import render_log_buffer, render_log_parameters
 from .service import BaseTemplateService
 
 
@@ -30,17 +31,21 @@ class TemplateAggregate(Aggregate):
         # We might need to determine WHICH table to write to if we support multiple types,
         # or we enforce a single `template` table.
         # For a separate domain, it should handle its own data.
-        return await self.template_service.create_template_base(
+        created = await self.template_service.create_template_base(
             key=data['key'],
             data=data
         )
+        self.template_service.template_changed(serialize_mapping(created))
+        return created
 
     @action("template_updated", resources=("template", ))
     async def update_template(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Update an existing template."""
         template = self.get_rootobj()
         updated_template = await self.statemgr.update(template, **data)
-        return serialize_mapping(updated_template)
+        result = serialize_mapping(updated_template)
+        self.template_service.template_changed(result)
+        return result
 
     @action("template_rendered", resources=("template", ))
     async def render_template(self, data):
@@ -60,40 +65,114 @@ class TemplateAggregate(Aggregate):
         if not template_dict:
             raise ValueError(f"Template not found: {key}")
 
-        # Render main body content
-        render_data = data.get('data', {})
-        rendered_body = await self.template_service.render_template(template_dict, render_data, template_content_key='body')
-
-        result = {'body': rendered_body}
-
-        # Render meta_fields templates (e.g., subject for notifications)
-        meta_fields = template_dict.get('meta_fields', {})
-        if meta_fields:
-            for meta_key, meta_template in meta_fields.items():
-                if isinstance(meta_template, str):
-                    # Render meta_fields template using the same engine
-                    engine_name = template_dict.get('engine', 'jinja2')
-                    from .engine import template_registry
-                    engine = template_registry.get(engine_name)
-                    if engine:
-                        result[meta_key] = engine.render(meta_template, render_data)
-
-        # Log rendering event
-        try:
-            log_record = {
-                'template_key': key,
-                'template_version': template_dict.get('version'),
-                'tenant_id': context['tenant_id'],
-                'app_id': context['app_id'],
-                'locale': context['locale'],
-                'channel': context['channel'],
-                'parameters': render_data
+        # Compile body and meta_fields (e.g. subject) once, then render every data set
+        renderers = self.template_service.compile_template(template_dict)
+        render_data = data.get('data') or {}
+        items = data.get('items')
+
+        if items is None:
+            result = self._render_fields(renderers, render_data)
+        else:
+            # Batch mode: each item overrides the shared data for one output
+            result = {
+                'items': [
+                    self._render_fields(renderers, {**render_data, **(item or {})})
+                    for item in items
+                ]
             }
 
-            record = self.init_resource("template_render_log", log_record)
-            await self.statemgr.insert(record)
-        except Exception as e:
-            # Log error but don't fail rendering
-            raise e
+        # Lets clients caching rendered output notice template updates
+        result['template_version'] = template_dict.get('version')
+        result['template_revision'] = str(template_dict.get('_updated') or template_dict.get('_created') or '') or None
+
+        # Log rendering event (buffered, written in batches off the render path)
+        self._log_render(
+            template_dict,
+            context,
+            render_data if items is None else {**render_data, '_items': len(items)},
+        )
 
         return result
+
+    @action("templates_rendered", resources=("template", ))
+    async def render_templates(self, data):
+        """
+        Resolve and render a list of render requests.
+
+        Requests resolving to the same scope share one resolution and one set
+        of compiled renderers. Each result is either
+        ``{"key", "status": "success", "rendered": {...}}`` or
+        ``{"key", "status": "error", "error": "..."}``, in request order.
+        """
+        defaults = {field: data.get(field) for field in ('tenant_id', 'app_id', 'locale', 'channel')}
+        # resolution context -> (template dict, renderers) or the resolution/compile error
+        prepared: Dict[Any, Any] = {}
+        # template id -> [template dict, context, rendered count]
+        rendered_counts: Dict[Any, list] = {}
+        results = []
+
+        for request in data.get('requests') or []:
+            key = request.get('key')
+            context = {
+                'tenant_id': request.get('tenant_id') or defaults['tenant_id'],
+                'app_id': request.get('app_id') or defaults['app_id'],
+                'locale': request.get('locale') or defaults['locale'],
+                'channel': request.get('channel') or defaults['channel'],
+                'version': request.get('version'),
+            }
+            cache_key = (key, *context.values())
+
+            if cache_key not in prepared:
+                prepared[cache_key] = await self._prepare_renderers(key, context)
+
+            entry = prepared[cache_key]
+            if isinstance(entry, Exception):
+                results.append({'key': key, 'status': 'error', 'error': str(entry)})
+                continue
+
+            template_dict, renderers = entry
+            try:
+                rendered = self._render_fields(renderers, request.get('data') or {})
+            except Exception as e:
+                results.append({'key': key, 'status': 'error', 'error': str(e)})
+                continue
+
+            results.append({'key': key, 'status': 'success', 'rendered': rendered})
+            counted = rendered_counts.setdefault(template_dict.get('_id'), [template_dict, context, 0])
+            counted[2] += 1
+
+        # One render log per template used
+        for template_dict, context, count in rendered_counts.values():
+            self._log_render(template_dict, context, {'_items': count})
+
+        failed = sum(1 for result in results if result['status'] == 'error')
+        return {'count': len(results), 'failed': failed, 'results': results}
+
+    async def _prepare_renderers(self, key, context):
+        try:
+            template_dict = await self.template_service.resolve_template(key, **context)
+            if not template_dict:
+                raise ValueError(f"Template not found: {key}")
+            return template_dict, self.template_service.compile_template(template_dict)
+        except Exception as e:
+            return e
+
+    def _log_render(self, template_dict: Dict[str, Any], context: Dict[str, Any], parameters: Dict[str, Any]):
+        if not render_log_buffer.sampled():
+            return
+
+        record = self.init_resource("template_render_log", {
+            'template_key': template_dict.get('key'),
+            'template_version': template_dict.get('version'),
+            'tenant_id': context['tenant_id'],
+            'app_id': context['app_id'],
+            'locale': context['locale'],
+            'channel': context['channel'],
+            'parameters': render_log_parameters(parameters),
+            'rendered_at': timestamp(),
+        })
+        render_log_buffer.add(serialize_mapping(record))
+
+    @staticmethod
+    def _render_fields(renderers, render_data) -> Dict[str, Any]:
+        return {field: render(render_data) for field, render in renderers.items()}
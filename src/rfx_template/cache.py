@@ -0,0 +1,143 @@
+"""
+Resolved-template cache
+
+The outcome of `BaseTemplateService.resolve_template`, including "not found",
+is cached per process keyed on (key, tenant_id, app_id, locale, channel, version).
+
+Entries expire after their TTL and are dropped for a template key when a
+template with that key is created or updated in this process. Changes made by
+other processes are detected by `check_changes`, which compares the template
+table's change marker (max `_created`/`_updated` and row count) at most every
+TEMPLATE_RESOLVE_CACHE_CHECK_INTERVAL seconds and clears the cache when it moved.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from . import config, logger
+
+ResolutionKey = Tuple[Any, ...]
+
+MISSING = object()
+
+
+class TemplateResolutionCache:
+    def __init__(
+        self,
+        *,
+        max_size: Optional[int] = None,
+        ttl: Optional[float] = None,
+        negative_ttl: Optional[float] = None,
+        check_interval: Optional[float] = None,
+    ):
+        self.max_size = config.TEMPLATE_RESOLVE_CACHE_SIZE if max_size is None else max_size
+        self.ttl = config.TEMPLATE_RESOLVE_CACHE_TTL if ttl is None else ttl
+        self.negative_ttl = config.TEMPLATE_RESOLVE_CACHE_NEGATIVE_TTL if negative_ttl is None else negative_ttl
+        self.check_interval = (
+            config.TEMPLATE_RESOLVE_CACHE_CHECK_INTERVAL if check_interval is None else check_interval
+        )
+
+        # key -> (expires at, template or None)
+        self._entries: "OrderedDict[ResolutionKey, Tuple[float, Optional[Dict[str, Any]]]]" = OrderedDict()
+        self._marker = None
+        self._checked_at = 0.0
+        self._check_lock = asyncio.Lock()
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return config.TEMPLATE_RESOLVE_CACHE_ENABLED and self.max_size > 0
+
+    @staticmethod
+    def key(key, tenant_id=None, app_id=None, locale=None, channel=None, version=None) -> ResolutionKey:
+        return (key, str(tenant_id) if tenant_id is not None else None, app_id, locale, channel, version)
+
+    def get(self, key: ResolutionKey):
+        """The cached resolution (a template dict or None), or `MISSING`."""
+        cached = self._entries.get(key)
+        if cached is None:
+            self.misses += 1
+            return MISSING
+
+        expires_at, template = cached
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return MISSING
+
+        self._entries.move_to_end(key)
+        if template is None:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return template
+
+    def put(self, key: ResolutionKey, template: Optional[Dict[str, Any]], ttl: Optional[float] = None):
+        """Cache a resolution; `ttl` overrides the TTL of found templates."""
+        if template is None:
+            ttl = self.negative_ttl
+        elif ttl is None:
+            ttl = self.ttl
+        if ttl <= 0:
+            return
+
+        self._entries[key] = (time.monotonic() + ttl, template)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, template_key: Optional[str] = None) -> int:
+        """Drop the resolutions of `template_key`, or everything. Returns the number dropped."""
+        if template_key is None:
+            count = len(self._entries)
+            self._entries.clear()
+            return count
+
+        stale = [key for key in self._entries if key[0] == template_key]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+    async def check_changes(self, stm, table_name: str = "template"):
+        """
+        Clear the cache when the template table changed since the last check,
+        e.g. through another worker. Runs the marker query at most once per
+        `check_interval`.
+        """
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return
+
+        async with self._check_lock:
+            if time.monotonic() - self._checked_at < self.check_interval:
+                return
+
+            try:
+                marker = await stm.template_change_marker(table_name)
+            except Exception as e:
+                # Keep serving from the cache; entries still expire by TTL
+                logger.warning(f"Template change check failed: {e}")
+                return
+            finally:
+                self._checked_at = time.monotonic()
+
+            if self._marker is not None and marker != self._marker:
+                logger.info(f"Templates changed, dropping {self.invalidate()} cached resolutions")
+            self._marker = marker
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+        }
+
+
+
+# Process-wide resolution cache
+resolution_cache = TemplateResolutionCache()
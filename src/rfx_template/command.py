@@ -48,6 +48,29 @@ class UpdateTemplate(Command):
         yield agg.create_response({"status": "success"}, _type="template-service-response")
 
 
+class RenderTemplates(Command):
+    """
+    Render many (template, data) requests in one command. Each distinct
+    template is resolved and compiled once; results come back in request
+    order and a failed request does not fail the others.
+    """
+
+    class Meta:
+        key = "render-templates"
+        tags = ["template"]
+        resource_init = True
+        resources = ("template", )
+        auth_required = True
+        policy_required = False
+
+    Data = datadef.RenderTemplatesPayload
+
+    async def _process(self, agg, stm, payload):
+        data = serialize_mapping(payload)
+        result = await agg.render_templates(data)
+        yield agg.create_response(result, _type="template-service-response")
+
+
 class RenderTemplate(Command):
     """Render a template with provided data."""
 
@@ -1,5 +1,6 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from fluvius.data import DataModel, Field
+from pydantic import model_validator
 
 class CreateTemplatePayload(DataModel):
     key: str
@@ -26,6 +27,8 @@ class UpdateTemplatePayload(DataModel):
 class RenderTemplatePayload(DataModel):
     key: str
     data: Dict[str, Any] = Field(default_factory=dict)
+    # Batch mode: per-output overrides of `data`; the response holds one rendering per item
+    items: Optional[List[Dict[str, Any]]] = None
 
     # Context for resolution
     tenant_id: Optional[str] = None
@@ -34,3 +37,32 @@ class RenderTemplatePayload(DataModel):
     channel: Optional[str] = None
     version: Optional[int] = None
     format: Optional[str] = Field("json", description="Output format: json, html")
+
+    @model_validator(mode='after')
+    def validate_html_single_output(self):
+        # An HTML response carries one document; batch renderings come back as json
+        if self.format == "html" and self.items is not None:
+            raise ValueError("items cannot be combined with format 'html'")
+        return self
+
+
+class RenderTemplateItem(DataModel):
+    key: str
+    data: Dict[str, Any] = Field(default_factory=dict)
+
+    # Context for resolution; unset fields fall back to the batch-level values
+    tenant_id: Optional[str] = None
+    app_id: Optional[str] = None
+    locale: Optional[str] = None
+    channel: Optional[str] = None
+    version: Optional[int] = None
+
+
+class RenderTemplatesPayload(DataModel):
+    requests: List[RenderTemplateItem]
+
+    # Defaults for every request
+    tenant_id: Optional[str] = None
+    app_id: Optional[str] = None
+    locale: Optional[str] = None
+    channel: Optional[str] = None
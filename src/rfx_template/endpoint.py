@@ -0,0 +1,17 @@
+from pipe import Pipe
+
+from .renderlog import render_log_buffer
+
+
+@Pipe
+def configure_template_service(app):
+    """Tie the template service's process-wide buffers to the application lifecycle."""
+    if getattr(app.state, "template_service_configured", False):
+        return app
+
+    app.state.template_service_configured = True
+
+    # Write render logs still buffered
+    app.add_event_handler("shutdown", render_log_buffer.close)
+
+    return app
@@ -1,16 +1,96 @@
 """
 Template Engine Registry for Generic Templates
 """
+import hashlib
+import re
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Hashable, Optional, Set
 from jinja2 import Environment, StrictUndefined, select_autoescape
 
-from . import logger
+from . import logger, config
+
+
+class CompiledTemplateCache:
+    """
+    Bounded LRU of compiled templates keyed by a hash of the template body.
+
+    Entries may carry a tag (the template id) so that all compiled variants of
+    a template can be evicted when the template is updated.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._tags: Dict[Hashable, Set[str]] = {}
+        self._key_tags: Dict[str, Set[Hashable]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(template_body: str) -> str:
+        return hashlib.sha1(template_body.encode('utf-8')).hexdigest()
+
+    def get_or_compile(self, template_body: str, compile: Callable[[str], Any], tag: Optional[Hashable] = None):
+        if self.max_size <= 0:
+            self.misses += 1
+            return compile(template_body)
+
+        key = self.key(template_body)
+        compiled = self._entries.get(key)
+        if compiled is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        else:
+            self.misses += 1
+            compiled = self._entries[key] = compile(template_body)
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+        if tag is not None:
+            self._tags.setdefault(tag, set()).add(key)
+            self._key_tags.setdefault(key, set()).add(tag)
+        return compiled
+
+    def invalidate(self, tag: Hashable) -> int:
+        """Evict every entry compiled for `tag`. Returns the number evicted."""
+        keys = self._tags.pop(tag, set())
+        for key in keys:
+            self._drop(key)
+        return len(keys)
+
+    def clear(self):
+        self._entries.clear()
+        self._tags.clear()
+        self._key_tags.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _drop(self, key: str):
+        self._entries.pop(key, None)
+        for tag in self._key_tags.pop(key, ()):
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
 
 
 class TemplateEngine(ABC):
     """Base class for template engines."""
 
+    # Compiled templates of engines with a compile step
+    cache: Optional[CompiledTemplateCache] = None
+
     @property
     @abstractmethod
     def name(self) -> str:
@@ -22,7 +102,25 @@ class TemplateEngine(ABC):
         """Render the template with the provided data."""
         pass
 
-    def validate_syntax(self, template_body: str) -> bool:
+    def compile(self, template_body: str, cache_tag: Optional[Hashable] = None) -> Callable[[Dict[str, Any]], str]:
+        """
+        Prepare a template once for rendering against many data sets.
+        Engines without a compile step render the body on every call.
+
+        `cache_tag` (usually the template id) marks cached compiled forms for
+        `invalidate`.
+        """
+        return lambda data: self.render(template_body, data)
+
+    def invalidate(self, cache_tag: Hashable) -> int:
+        """Drop cached compiled forms for `cache_tag`. Returns the number dropped."""
+        return self.cache.invalidate(cache_tag) if self.cache is not None else 0
+
+    def cache_stats(self) -> Optional[Dict[str, int]]:
+        """Compile cache counters, or None for engines without a cache."""
+        return self.cache.stats() if self.cache is not None else None
+
+    def validate_syntax(self, template_body: str, cache_tag: Optional[Hashable] = None) -> bool:
         """Validate template syntax. Returns True if valid."""
         try:
             self.render(template_body, {})
@@ -33,47 +131,93 @@ class TemplateEngine(ABC):
 
 
 class JinjaEngine(TemplateEngine):
-    """Jinja2 template engine for HTML/text templates."""
+    """
+    Jinja2 template engine for HTML/text templates.
 
-    def __init__(self):
+    Compiled templates are kept in a `CompiledTemplateCache`, so a body is
+    lexed, parsed and compiled once rather than on every render.
+    """
+
+    def __init__(self, cache_size: Optional[int] = None):
         self.env = Environment(
             undefined=StrictUndefined,
             autoescape=select_autoescape(['html', 'xml']),
             trim_blocks=True,
             lstrip_blocks=True
         )
+        self.cache = CompiledTemplateCache(
+            config.TEMPLATE_COMPILE_CACHE_SIZE if cache_size is None else cache_size
+        )
 
     @property
     def name(self) -> str:
         return "jinja2"
 
     def render(self, template_body: str, data: Dict[str, Any]) -> str:
-        template = self.env.from_string(template_body)
+        template = self._template(template_body)
         return template.render(**data)
 
-    def validate_syntax(self, template_body: str) -> bool:
+    def compile(self, template_body: str, cache_tag: Optional[Hashable] = None) -> Callable[[Dict[str, Any]], str]:
+        template = self._template(template_body, cache_tag)
+        return lambda data: template.render(**data)
+
+    def validate_syntax(self, template_body: str, cache_tag: Optional[Hashable] = None) -> bool:
+        """Compile the body into the cache; a valid template is then ready to render."""
         try:
-            self.env.parse(template_body)
+            self._template(template_body, cache_tag)
             return True
         except Exception as e:
             logger.warning(f"Jinja2 syntax error: {e}")
             return False
 
+    def _template(self, template_body: str, cache_tag: Optional[Hashable] = None):
+        return self.cache.get_or_compile(template_body, self.env.from_string, cache_tag)
+
+
+class TextTemplate:
+    """
+    A text template split once into literal and ``${variable}`` segments.
+
+    Rendering is a single join over the segments, linear in the template size
+    and independent of the size of the data context. Placeholders without a
+    value in the data are kept as written.
+    """
+
+    PLACEHOLDER = re.compile(r"\$\{([^}]*)\}")
+
+    def __init__(self, template_body: str):
+        # Alternating [literal, name, literal, ..., literal]
+        self.segments = self.PLACEHOLDER.split(template_body)
+
+    def __call__(self, data: Dict[str, Any]) -> str:
+        parts = list(self.segments)
+        for index in range(1, len(parts), 2):
+            name = parts[index]
+            parts[index] = str(data[name]) if name in data else f"${{{name}}}"
+        return "".join(parts)
+
 
 class TextEngine(TemplateEngine):
     """Simple text template engine with basic variable substitution."""
 
+    def __init__(self, cache_size: Optional[int] = None):
+        self.cache = CompiledTemplateCache(
+            config.TEMPLATE_COMPILE_CACHE_SIZE if cache_size is None else cache_size
+        )
+
     @property
     def name(self) -> str:
         return "text"
 
     def render(self, template_body: str, data: Dict[str, Any]) -> str:
         """Simple variable substitution using ${variable} syntax."""
-        result = template_body
-        for key, value in data.items():
-            placeholder = f"${{{key}}}"
-            result = result.replace(placeholder, str(value))
-        return result
+        return self._template(template_body)(data)
+
+    def compile(self, template_body: str, cache_tag: Optional[Hashable] = None) -> Callable[[Dict[str, Any]], str]:
+        return self._template(template_body, cache_tag)
+
+    def _template(self, template_body: str, cache_tag: Optional[Hashable] = None) -> TextTemplate:
+        return self.cache.get_or_compile(template_body, TextTemplate, cache_tag)
 
 
 class StaticEngine(TemplateEngine):
@@ -118,6 +262,18 @@ class TemplateEngineRegistry:
         """List all registered template engines."""
         return self._engines.copy()
 
+    def invalidate(self, cache_tag: Hashable) -> int:
+        """Drop the cached compiled forms of a template from every engine."""
+        return sum(engine.invalidate(cache_tag) for engine in self._engines.values())
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Compile cache counters per engine that has a cache."""
+        return {
+            name: stats
+            for name, engine in self._engines.items()
+            if (stats := engine.cache_stats()) is not None
+        }
+
     def render(self, engine_name: str, template_body: str, data: Dict[str, Any]) -> str:
         """Render template using specified engine."""
         engine = self.get(engine_name)
@@ -2,6 +2,7 @@
 Template Queries
 """
 from typing import Optional
+from fastapi import Request
 from pydantic import BaseModel
 from fluvius.query import DomainQueryResource, DomainQueryManager
 from fluvius.query.field import (
@@ -16,6 +17,8 @@ from fluvius.data import UUID_TYPE
 from ._meta import config
 from .state import TemplateStateManager
 from .domain import TemplateServiceDomain
+from .cache import resolution_cache
+from .engine import template_registry
 
 class TemplateServiceQueryManager(DomainQueryManager):
     __data_manager__ = TemplateStateManager
@@ -27,6 +30,15 @@ class TemplateServiceQueryManager(DomainQueryManager):
 resource = TemplateServiceQueryManager.register_resource
 endpoint = TemplateServiceQueryManager.register_endpoint
 
+@endpoint(".cache-stats")
+async def get_cache_stats(query_manager: TemplateServiceQueryManager, request: Request):
+    """Compiled-template cache counters per engine and resolved-template cache counters."""
+    return {
+        "compiled": template_registry.cache_stats(),
+        "resolved": resolution_cache.stats(),
+    }
+
+
 class TemplateScope(BaseModel):
     tenant_id: Optional[str] = None
     app_id: Optional[str] = None
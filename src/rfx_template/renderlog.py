@@ -0,0 +1,134 @@
+"""
+Buffered template render logging.
+
+Render paths hand their ``template_render_log`` rows to the process-wide
+`render_log_buffer` instead of inserting them inline. Rows are written with
+multi-row inserts when TEMPLATE_RENDER_LOG_FLUSH_SIZE rows are pending or
+TEMPLATE_RENDER_LOG_FLUSH_INTERVAL_MS has passed, and on shutdown.
+"""
+import asyncio
+import hashlib
+import json
+import random
+from typing import Any, Dict, List, Optional
+
+from .state import TemplateStateManager
+from . import config, logger
+
+
+def render_log_parameters(parameters: Optional[Dict[str, Any]], mode: Optional[str] = None) -> Dict[str, Any]:
+    """
+    The ``parameters`` value stored for a render: the parameters themselves,
+    only their SHA-256 (``{"_hash": ...}``) or nothing, per TEMPLATE_RENDER_LOG_PARAMETERS.
+    """
+    mode = mode or config.TEMPLATE_RENDER_LOG_PARAMETERS
+    parameters = parameters or {}
+    if mode == "none":
+        return {}
+    if mode == "hash":
+        encoded = json.dumps(parameters, sort_keys=True, default=str, separators=(",", ":"))
+        return {"_hash": hashlib.sha256(encoded.encode("utf-8")).hexdigest()}
+    return parameters
+
+
+class RenderLogBuffer:
+    """
+    Process-wide buffer of ``template_render_log`` rows.
+
+    `add` never waits for the database: a full buffer schedules a flush in the
+    background. Failed flushes keep their rows for the next attempt, up to
+    ``max_pending`` rows.
+    """
+
+    def __init__(
+        self,
+        *,
+        flush_size: int = None,
+        flush_interval_ms: int = None,
+        max_pending: int = None,
+        sample_rate: float = None,
+    ):
+        self.statemgr = TemplateStateManager(None)
+        self.flush_size = max(1, flush_size or config.TEMPLATE_RENDER_LOG_FLUSH_SIZE)
+        self.flush_interval = (flush_interval_ms or config.TEMPLATE_RENDER_LOG_FLUSH_INTERVAL_MS) / 1000.0
+        self.max_pending = max(self.flush_size, max_pending or config.TEMPLATE_RENDER_LOG_MAX_PENDING)
+        self.sample_rate = config.TEMPLATE_RENDER_LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+
+        self._rows: List[Dict[str, Any]] = []
+        self._lock = asyncio.Lock()
+        self._timer = None
+        self._flush_task = None
+        self.dropped = 0
+
+    def sampled(self) -> bool:
+        """Whether the current render should be logged."""
+        if not config.TEMPLATE_RENDER_LOG_ENABLED:
+            return False
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def add(self, record: Dict[str, Any]):
+        """
+        Buffer one render log row: a serialized ``init_resource`` record, with
+        ``parameters`` already reduced by `render_log_parameters`.
+        """
+        self._rows.append(record)
+
+        overflow = len(self._rows) - self.max_pending
+        if overflow > 0:
+            del self._rows[:overflow]
+            self.dropped += overflow
+
+        if self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_periodically())
+
+        if len(self._rows) >= self.flush_size and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self._safe_flush())
+
+    async def flush(self) -> int:
+        async with self._lock:
+            if not self._rows:
+                return 0
+
+            rows, self._rows = self._rows, []
+            try:
+                for offset in range(0, len(rows), self.flush_size):
+                    async with self.statemgr.transaction():
+                        await self.statemgr.insert_data('template_render_log', *rows[offset:offset + self.flush_size])
+            except Exception:
+                # Put the rows back so a later flush can retry them
+                self._rows[:0] = rows[offset:]
+                raise
+
+            return len(rows)
+
+    async def close(self):
+        if self._timer:
+            # Wait for an in-flight flush so the timer is not cancelled mid-write
+            async with self._lock:
+                self._timer.cancel()
+            try:
+                await self._timer
+            except asyncio.CancelledError:
+                pass
+            self._timer = None
+
+        if self._flush_task:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+
+        await self._safe_flush()
+
+    async def _safe_flush(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Template render log flush failed: {str(e)}")
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._safe_flush()
+
+
+# Process-wide render log buffer
+render_log_buffer = RenderLogBuffer()
@@ -1,15 +1,16 @@
 """
 Base Template Service
 """
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Callable, Tuple
 from datetime import timedelta
 import hashlib
 
 from fluvius.data import DataAccessManager, serialize_mapping
 from fluvius.data.exceptions import ItemNotFoundError
 
+from .cache import resolution_cache, MISSING
 from .engine import template_registry
-from . import logger
+from . import config, logger
 
 
 class BaseTemplateService:
@@ -20,7 +21,7 @@ class BaseTemplateService:
     def __init__(self, stm: DataAccessManager, table_name: str = "template"):
         self.stm = stm
         self.table_name = table_name
-        self.cache_ttl = timedelta(hours=1)
+        self.cache_ttl = timedelta(seconds=config.TEMPLATE_RESOLVE_CACHE_TTL)
 
     async def resolve_template(
         self,
@@ -42,7 +43,38 @@ class BaseTemplateService:
         4. Fallback app (None)
         5. Fallback tenant (None)
         6. Fallback locale (base locale, then 'en', then None)
+
+        Results, including "not found", are served from the process-wide
+        resolution cache for `cache_ttl` (see rfx_template.cache).
         """
+        if not resolution_cache.enabled:
+            return await self._resolve_template(
+                key, tenant_id=tenant_id, app_id=app_id, locale=locale, channel=channel, version=version
+            )
+
+        await resolution_cache.check_changes(self.stm, self.table_name)
+
+        cache_key = resolution_cache.key(key, tenant_id, app_id, locale, channel, version)
+        cached = resolution_cache.get(cache_key)
+        if cached is not MISSING:
+            return dict(cached) if cached is not None else None
+
+        template = await self._resolve_template(
+            key, tenant_id=tenant_id, app_id=app_id, locale=locale, channel=channel, version=version
+        )
+        resolution_cache.put(cache_key, template, ttl=self.cache_ttl.total_seconds())
+        return dict(template) if template is not None else None
+
+    async def _resolve_template(
+        self,
+        key: str,
+        *,
+        tenant_id: Optional[str] = None,
+        app_id: Optional[str] = None,
+        locale: Optional[str] = None,
+        channel: Optional[str] = None,
+        version: Optional[int] = None,
+    ) -> Optional[Dict[str, Any]]:
         locales = self._get_locale_fallbacks(locale)
 
 
@@ -76,70 +108,67 @@ class BaseTemplateService:
                 seen.add(t)
                 unique_scopes.append(s)
 
-        for loc in locales:
-            for scope in unique_scopes:
-                template = await self._find_template_for_scope(key, scope, loc, version)
-                if template:
-                    return template
+        # One round trip: every active candidate for the key, ranked below by
+        # (locale fallback, scope fallback) with the newest version first
+        query: Dict[str, Any] = {"key": key, "is_active": True}
+        if version is not None:
+            query["version"] = version
+
+        try:
+            candidates = await self.stm.find_all(self.table_name, where=query)
+        except ItemNotFoundError:
+            candidates = []
+
+        best, best_rank = None, None
+        for candidate in candidates or ():
+            rank = self._rank_candidate(candidate, locales, unique_scopes)
+            if rank is not None and (best_rank is None or rank < best_rank):
+                best, best_rank = candidate, rank
+
+        if best is not None:
+            loc_index, scope_index, _ = best_rank
+            logger.info(
+                f"Resolved template {key} with locale: {locales[loc_index]}, scope: {unique_scopes[scope_index]}"
+            )
+            return serialize_mapping(best)
 
         logger.warning(
             f"Template not found: {key} (tenant={tenant_id}, app={app_id}, locale={locale}, channel={channel})"
         )
         return None
 
-    async def _find_template_for_scope(
-        self,
-        key: str,
-        scope: Dict[str, Any],
-        loc: Optional[str],
-        version: Optional[int],
-    ) -> Optional[Dict[str, Any]]:
+    @staticmethod
+    def _rank_candidate(
+        candidate: Any,
+        locales: List[Optional[str]],
+        scopes: List[Dict[str, Any]],
+    ) -> Optional[Tuple[int, int, int]]:
         """
-        Fetch template candidates using only non-None scope fields in the DB query,
-        then verify in Python that fields which are None in the scope are also None
-        on the returned record.
+        Rank of a candidate in the fallback chain (lower is more specific), or
+        None when it matches no locale/scope combination.
 
-        The query builder does not translate Python None -> SQL IS NULL (it generates
-        `col = NULL` which never matches). By omitting None-valued fields from the DB
-        query and checking them in Python afterwards, we correctly handle NULL columns.
+        A scope field set to None requires a NULL column; a locale of None is
+        the "any locale" last resort (locale is NOT NULL, so it never means NULL).
         """
-        # Build DB query with non-None fields only; track which fields must be NULL.
-        query: Dict[str, Any] = {"key": key, "is_active": True}
-        none_fields: List[str] = []
-
-        for field_name, value in scope.items():
-            if value is not None:
-                query[field_name] = value
-            else:
-                none_fields.append(field_name)
-
-        if loc is not None:
-            query["locale"] = loc
-        # When loc is None: omit locale from both the DB query and none_fields.
-        # This is the "any locale" last-resort fallback — accept any matching record
-        # regardless of locale. (locale is NOT NULL so checking IS NULL would never match.)
-
-        if version is not None:
-            query["version"] = version
-
-        try:
-            candidates = await self.stm.find_all(self.table_name, where=query)
-        except ItemNotFoundError:
+        scope_index = next(
+            (
+                index for index, scope in enumerate(scopes)
+                if all(_same(getattr(candidate, field, None), value) for field, value in scope.items())
+            ),
+            None,
+        )
+        if scope_index is None:
             return None
 
-        if not candidates:
+        candidate_locale = getattr(candidate, "locale", None)
+        loc_index = next(
+            (index for index, loc in enumerate(locales) if loc is None or loc == candidate_locale),
+            None,
+        )
+        if loc_index is None:
             return None
 
-        # Post-filter in Python: only accept a candidate where every field that
-        # should be NULL is actually NULL on the record.
-        for candidate in candidates:
-            if all(getattr(candidate, f, None) is None for f in none_fields):
-                logger.info(
-                    f"Resolved template {key} with scope: {query}, null_fields: {none_fields}"
-                )
-                return serialize_mapping(candidate)
-
-        return None
+        return (loc_index, scope_index, -(getattr(candidate, "version", None) or 0))
 
     def _get_locale_fallbacks(self, locale: Optional[str]) -> List[Optional[str]]:
         """Generate list of locales to try."""
@@ -187,6 +216,82 @@ class BaseTemplateService:
             logger.error(f"Template: {template.get('key')}, Engine: {engine_name}")
             raise ValueError(f"Template rendering failed: {str(e)}")
 
+    def compile_template(self, template: Dict[str, Any]) -> Dict[str, Callable[[Dict[str, Any]], str]]:
+        """
+        Compile the body and the string meta_fields (e.g. subject) of a template once.
+
+        Returns:
+            Mapping of output field to a renderer taking the data context.
+            Renderers raise ValueError when rendering fails.
+        """
+        engine_name = template.get('engine', 'jinja2')
+        engine = template_registry.get(engine_name)
+        if not engine:
+            raise ValueError(f"Template engine '{engine_name}' not found")
+
+        sources = {'body': template.get('body') or ""}
+        for meta_key, meta_template in (template.get('meta_fields') or {}).items():
+            if isinstance(meta_template, str):
+                sources[meta_key] = meta_template
+
+        renderers = {}
+        for field, source in sources.items():
+            try:
+                compiled = engine.compile(source, cache_tag=template.get('_id')) if source else None
+            except Exception as e:
+                logger.error(f"Template compilation failed: {e}")
+                logger.error(f"Template: {template.get('key')}, Engine: {engine_name}, Field: {field}")
+                raise ValueError(f"Template rendering failed: {str(e)}")
+
+            renderers[field] = self._guarded_renderer(template, field, compiled)
+
+        return renderers
+
+    def template_changed(self, template: Dict[str, Any]) -> bool:
+        """
+        Handle a created or updated template in this process: drop cached
+        resolutions of its key and re-warm its compiled forms.
+        Other processes pick the change up through the resolution cache's change check.
+        """
+        if template.get('key') is not None:
+            resolution_cache.invalidate(template['key'])
+        return self.warm_template(template)
+
+    def warm_template(self, template: Dict[str, Any]) -> bool:
+        """
+        Drop the cached compiled forms of a (created or updated) template and
+        compile its current body and string meta_fields ahead of the first render.
+        Returns False when a part fails to compile.
+        """
+        template_id = template.get('_id')
+        if template_id is not None:
+            template_registry.invalidate(template_id)
+
+        engine = template_registry.get(template.get('engine', 'jinja2'))
+        if not engine:
+            return False
+
+        sources = [template.get('body')] + list((template.get('meta_fields') or {}).values())
+        return all(
+            engine.validate_syntax(source, cache_tag=template_id)
+            for source in sources
+            if isinstance(source, str) and source
+        )
+
+    @staticmethod
+    def _guarded_renderer(template: Dict[str, Any], field: str, compiled):
+        def render(data: Dict[str, Any]) -> str:
+            if compiled is None:
+                return ""
+            try:
+                return compiled(data)
+            except Exception as e:
+                logger.error(f"Template rendering failed: {e}")
+                logger.error(f"Template: {template.get('key')}, Field: {field}")
+                raise ValueError(f"Template rendering failed: {str(e)}")
+
+        return render
+
     async def create_template_base(
         self,
         key: str,
@@ -219,3 +324,9 @@ class BaseTemplateService:
         data['version'] = version
 
         return await self.stm.insert(self.table_name, data)
+
+
+def _same(column_value, scope_value) -> bool:
+    if scope_value is None:
+        return column_value is None
+    return column_value is not None and str(column_value) == str(scope_value)
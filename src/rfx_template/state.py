@@ -1,5 +1,5 @@
 from fluvius.domain.state import DataAccessManager
-from rfx_schema.rfx_template import RFXTemplateConnector
+from rfx_schema.rfx_template import RFXTemplateConnector, SCHEMA
 
 class TemplateStateManager(DataAccessManager):
     __connector__ = RFXTemplateConnector
@@ -12,3 +12,17 @@ class TemplateStateManager(DataAccessManager):
 
     async def add_entry(self, model, **data):
         return await self._add_entry(model, **data)
+
+    async def template_change_marker(self, table_name: str = "template"):
+        """
+        A value that changes whenever a template row is inserted, updated or
+        deleted: the latest ``_created``/``_updated`` and the row count.
+        """
+        rows = await self.native_query(
+            f"""
+            SELECT GREATEST(MAX(_created), MAX(_updated)) AS changed_at,
+                   COUNT(*) AS total
+              FROM "{SCHEMA}"."{table_name}"
+            """
+        )
+        return (rows[0].changed_at, rows[0].total) if rows else None
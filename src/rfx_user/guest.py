@@ -1,3 +1,4 @@
+import hashlib
 import secrets
 from datetime import timedelta
 from time import time
@@ -71,6 +72,10 @@ class IDMGuestAuth:
                 "recipients": [email],
                 "template_key": "guest-verification-email",
                 "content_type": "HTML",
+                # Verification codes run in the high-priority lane
+                "priority": "HIGH",
+                # Retries of this request must not send the same code twice
+                "idempotency_key": "guest-verification:" + hashlib.sha256(f"{realm}:{email}:{code}".encode()).hexdigest(),
                 "template_data": {
                     "user_name": recipient_name,
                     "code": code,
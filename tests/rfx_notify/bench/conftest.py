@@ -0,0 +1,48 @@
+"""
+Benchmark settings, read from the environment:
+
+    RFX_NOTIFY_BENCH_RECIPIENTS=100,1000    recipient counts
+    RFX_NOTIFY_BENCH_CONCURRENCY=1,10,50    provider send concurrency
+    RFX_NOTIFY_BENCH_LATENCY_MS=5           fake gateway latency per message
+    RFX_NOTIFY_BENCH_FAILURE_RATE=0.0       fake gateway failure rate (0..1)
+"""
+import os
+
+import pytest
+
+from fakes import FakeSMTPServer
+
+
+def _int_list(name, default):
+    return [int(value) for value in os.environ.get(name, default).split(",") if value.strip()]
+
+
+RECIPIENTS = _int_list("RFX_NOTIFY_BENCH_RECIPIENTS", "100,1000")
+CONCURRENCY = _int_list("RFX_NOTIFY_BENCH_CONCURRENCY", "1,10,50")
+LATENCY = float(os.environ.get("RFX_NOTIFY_BENCH_LATENCY_MS", "5")) / 1000.0
+FAILURE_RATE = float(os.environ.get("RFX_NOTIFY_BENCH_FAILURE_RATE", "0"))
+
+
+def pytest_generate_tests(metafunc):
+    if "recipients" in metafunc.fixturenames:
+        metafunc.parametrize("recipients", RECIPIENTS)
+    if "concurrency" in metafunc.fixturenames:
+        metafunc.parametrize("concurrency", CONCURRENCY)
+
+
+@pytest.fixture
+def gateway_latency():
+    return LATENCY
+
+
+@pytest.fixture
+def gateway_failure_rate():
+    return FAILURE_RATE
+
+
+@pytest.fixture
+def fake_smtp():
+    pytest.importorskip("aiosmtpd")
+    server = FakeSMTPServer(latency=LATENCY, failure_rate=FAILURE_RATE).start()
+    yield server
+    server.stop()
@@ -0,0 +1,188 @@
+"""
+Local stand-ins for the notification gateways and the measuring helpers used
+by the throughput benchmarks.
+"""
+import asyncio
+import random
+import socket
+import statistics
+import time
+from typing import Dict, List, Optional
+
+from aiohttp import web
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from rfx_notify import metrics
+
+
+def free_port(host: str = "127.0.0.1") -> int:
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+class _SMTPSinkHandler:
+    def __init__(self, latency: float, failure_rate: float):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.received = 0
+        self.rejected = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if self.failure_rate and random.random() < self.failure_rate:
+            self.rejected += 1
+            return "451 4.3.0 Simulated failure"
+
+        self.received += 1
+        return "250 2.0.0 OK"
+
+
+class FakeSMTPServer:
+    """
+    aiosmtpd sink on a local port. Messages are accepted after ``latency``
+    seconds, or rejected with a transient error at ``failure_rate``.
+    The server runs in its own thread and event loop.
+    """
+
+    def __init__(self, *, latency: float = 0.0, failure_rate: float = 0.0, host: str = "127.0.0.1"):
+        self.host = host
+        self.port = free_port(host)
+        self.handler = _SMTPSinkHandler(latency, failure_rate)
+        self._controller = None
+
+    def start(self):
+        from aiosmtpd.controller import Controller
+
+        self._controller = Controller(self.handler, hostname=self.host, port=self.port)
+        self._controller.start()
+        return self
+
+    def stop(self):
+        if self._controller is not None:
+            self._controller.stop()
+            self._controller = None
+
+
+class FakeKannel:
+    """
+    Kannel ``sendsms`` endpoint on a local port, served from the running event loop.
+    """
+
+    def __init__(self, *, latency: float = 0.0, failure_rate: float = 0.0, host: str = "127.0.0.1"):
+        self.host = host
+        self.port = free_port(host)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.received = 0
+        self.rejected = 0
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/cgi-bin/sendsms", self._sendsms)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _sendsms(self, request: web.Request) -> web.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if self.failure_rate and random.random() < self.failure_rate:
+            self.rejected += 1
+            return web.Response(status=503, text="Temporary failure")
+
+        self.received += 1
+        return web.Response(text="0: Accepted for delivery")
+
+
+class StatementCounter:
+    """
+    Count SQL statements executed by any SQLAlchemy engine while active.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.by_verb: Dict[str, int] = {}
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.total += 1
+        verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "?"
+        self.by_verb[verb] = self.by_verb.get(verb, 0) + 1
+
+    def __enter__(self):
+        event.listen(Engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(Engine, "before_cursor_execute", self._on_execute)
+
+
+class DeliveryLatencyRecorder:
+    """
+    Collect per-delivery latencies from the pipeline metrics hook.
+    """
+
+    def __init__(self, stage: str = "deliver"):
+        self.stage = stage
+        self.samples: List[float] = []
+
+    def _hook(self, kind, name, value, labels):
+        if name == metrics.STAGE_DURATION.name and labels.get("stage") == self.stage:
+            self.samples.append(value)
+
+    def __enter__(self):
+        metrics.registry.add_hook(self._hook)
+        return self
+
+    def __exit__(self, *exc):
+        metrics.registry.remove_hook(self._hook)
+
+
+class BenchResult:
+    def __init__(self, label: str, messages: int, elapsed: float, latencies: List[float], statements: StatementCounter):
+        self.label = label
+        self.messages = messages
+        self.elapsed = elapsed
+        self.latencies = sorted(latencies)
+        self.statements = statements
+
+    @property
+    def rate(self) -> float:
+        return self.messages / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, pct: float) -> float:
+        if not self.latencies:
+            return 0.0
+        if len(self.latencies) == 1:
+            return self.latencies[0]
+        return statistics.quantiles(self.latencies, n=100, method="inclusive")[int(pct) - 1]
+
+    def report(self) -> str:
+        verbs = ", ".join(f"{verb}={count}" for verb, count in sorted(self.statements.by_verb.items()))
+        return (
+            f"[bench] {self.label}: {self.messages} msgs in {self.elapsed:.2f}s "
+            f"= {self.rate:.1f} msg/s | p50 {self.percentile(50) * 1000:.1f}ms "
+            f"p99 {self.percentile(99) * 1000:.1f}ms | "
+            f"{self.statements.total} statements ({verbs})"
+        )
+
+
+async def measure(label: str, messages: int, run) -> BenchResult:
+    """Run ``await run()`` under the statement counter and latency recorder."""
+    with StatementCounter() as statements, DeliveryLatencyRecorder() as latencies:
+        started = time.perf_counter()
+        await run()
+        elapsed = time.perf_counter() - started
+
+    return BenchResult(label, messages, elapsed, latencies.samples, statements)
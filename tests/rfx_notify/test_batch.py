@@ -0,0 +1,78 @@
+from contextlib import asynccontextmanager
+
+import pytest
+
+from rfx_notify.batch import DeliveryBatchWriter
+
+
+class FakeStateManager:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.updates = []
+        self.logs = []
+        self.expired = None
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+    async def apply_delivery_results(self, updates):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("database unavailable")
+        self.updates.extend(updates)
+
+    async def add_notification_logs(self, *logs):
+        self.logs.extend(logs)
+
+    async def expire_leases(self, ids):
+        self.expired = ids
+
+
+@pytest.mark.asyncio
+async def test_flush_on_size():
+    statemgr = FakeStateManager()
+    async with DeliveryBatchWriter(statemgr, flush_size=2, flush_interval_ms=60000) as writer:
+        for index in range(5):
+            await writer.add({"_id": index}, {"notification_id": index})
+        assert writer.flush_count == 2
+
+    assert [update["_id"] for update in statemgr.updates] == [0, 1, 2, 3, 4]
+    assert len(statemgr.logs) == 5
+    assert writer.flush_count == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_batch():
+    statemgr = FakeStateManager(failures=1)
+    writer = DeliveryBatchWriter(statemgr, flush_size=10)
+    await writer.add({"_id": 1}, {})
+
+    with pytest.raises(RuntimeError):
+        await writer.flush()
+    await writer.flush()
+
+    assert [update["_id"] for update in statemgr.updates] == [1]
+
+
+@pytest.mark.asyncio
+async def test_final_flush_is_retried():
+    statemgr = FakeStateManager()
+    async with DeliveryBatchWriter(statemgr, flush_size=10, flush_interval_ms=1) as writer:
+        await writer.add({"_id": 1}, {})
+        statemgr.failures = 1
+
+    assert [update["_id"] for update in statemgr.updates] == [1]
+    assert statemgr.expired is None
+
+
+@pytest.mark.asyncio
+async def test_final_flush_failure_expires_leases():
+    statemgr = FakeStateManager()
+    async with DeliveryBatchWriter(statemgr, flush_size=10, flush_interval_ms=1) as writer:
+        await writer.add({"_id": 1}, {})
+        await writer.add({"_id": 2}, {})
+        statemgr.failures = 100
+
+    assert statemgr.updates == []
+    assert statemgr.expired == [1, 2]
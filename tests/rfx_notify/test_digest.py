@@ -0,0 +1,95 @@
+from types import SimpleNamespace
+
+from fluvius.data import UUID_GENR
+
+from rfx_notify import digest
+from rfx_notify.digest import coalesce_entries, coalesced_updates, is_coalescible, prepare_digest
+
+
+def make_entry(recipient="a@example.com", digest_key="digest", **kwargs):
+    data = dict(
+        _id=UUID_GENR(),
+        recipient_address=recipient,
+        channel="EMAIL",
+        provider_type="SMTP",
+        content_type="TEXT",
+        digest_key=digest_key,
+        subject="Update",
+        body="body",
+        retry_count=0,
+        max_retries=3,
+    )
+    data.update(kwargs)
+    return SimpleNamespace(**data)
+
+
+def test_digest_is_opt_in(monkeypatch):
+    notification = {"tags": ["digest"]}
+
+    monkeypatch.setattr(digest.config, "NOTIFY_DIGEST_ENABLED", False)
+    assert not is_coalescible(notification)
+
+    monkeypatch.setattr(digest.config, "NOTIFY_DIGEST_ENABLED", True)
+    assert is_coalescible(notification)
+    assert not is_coalescible({"tags": ["other"]})
+
+
+def test_prepare_digest_aligns_window():
+    prepared = prepare_digest({"template_key": "weekly", "meta": {"digest_window": 600}})
+
+    assert prepared["digest_key"] == "weekly"
+    assert prepared["scheduled_at"].timestamp() % 600 == 0
+
+
+def test_coalesce_groups_by_recipient_and_key():
+    first = make_entry(body="one")
+    second = make_entry(body="two")
+    other_recipient = make_entry(recipient="b@example.com")
+    plain = make_entry(digest_key=None)
+
+    deliverable, coalesced = coalesce_entries([first, second, other_recipient, plain])
+
+    assert len(deliverable) == 3
+    merged = next(entry for entry in deliverable if entry._id == first._id)
+    assert merged.body == "one\n\n----\n\ntwo"
+    assert merged.subject == "Update"
+    assert coalesced == {first._id: [second]}
+    # The claimed rows themselves are left untouched
+    assert first.body == "one"
+
+
+def test_merged_subject_counts_differing_subjects():
+    entries = [make_entry(subject="A"), make_entry(subject="B"), make_entry(subject="C")]
+
+    deliverable, _ = coalesce_entries(entries)
+
+    assert deliverable[0].subject == digest.config.NOTIFY_DIGEST_SUBJECT.format(count=3)
+
+
+def test_coalesced_rows_share_the_outcome():
+    first, second = make_entry(), make_entry()
+    _, coalesced = coalesce_entries([first, second])
+
+    updates = coalesced_updates(
+        [{"notification_id": first._id, "status": "SENT", "provider_type": "SMTP", "provider_message_id": "m1"}],
+        coalesced,
+    )
+
+    assert len(updates) == 1
+    update = updates[0]
+    assert update["_id"] == second._id
+    assert update["status"] == "SENT"
+    assert update["provider_message_id"] == "m1"
+    assert update["provider_response"] == {"coalesced_into": str(first._id)}
+    assert "sent_at" in update
+
+
+def test_failed_merge_schedules_retry_for_coalesced_rows():
+    first, second = make_entry(), make_entry()
+    _, coalesced = coalesce_entries([first, second])
+
+    updates = coalesced_updates([{"notification_id": first._id, "status": "FAILED"}], coalesced)
+
+    assert updates[0]["status"] == "FAILED"
+    assert "failed_at" in updates[0]
+    assert "next_retry_at" in updates[0]
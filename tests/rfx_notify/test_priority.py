@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+
+from rfx_notify.priority import HIGH, LOW, NORMAL, PriorityGate, lane_of, lane_sql_rank, outbox_queue_name
+from rfx_notify.types import NotificationPriorityEnum
+
+
+def make_gate(capacity=1, strict=True, **kwargs):
+    kwargs.setdefault("lane_limits", {HIGH: capacity, NORMAL: capacity, LOW: capacity})
+    kwargs.setdefault("weights", {HIGH: 4, NORMAL: 2, LOW: 1})
+    return PriorityGate(capacity, strict=strict, **kwargs)
+
+
+async def run_queued(gate, priorities):
+    """
+    Hold the only slot, queue one send per priority, then release and return
+    the order in which the queued sends got their slot.
+    """
+    order = []
+    release = asyncio.Event()
+
+    async def blocker():
+        async with gate.slot(NORMAL):
+            await release.wait()
+
+    async def send(index, priority):
+        async with gate.slot(priority):
+            order.append(index)
+            await asyncio.sleep(0)
+
+    holder = asyncio.create_task(blocker())
+    await asyncio.sleep(0)
+    tasks = [asyncio.create_task(send(index, priority)) for index, priority in enumerate(priorities)]
+    await asyncio.sleep(0)
+
+    release.set()
+    await asyncio.gather(holder, *tasks)
+    return [lane_of(priorities[index]) for index in order]
+
+
+def test_lane_of():
+    assert lane_of(NotificationPriorityEnum.URGENT) == HIGH
+    assert lane_of("HIGH") == HIGH
+    assert lane_of("NORMAL") == NORMAL
+    assert lane_of(NotificationPriorityEnum.LOW) == LOW
+    assert lane_of(None) == NORMAL
+
+
+def test_outbox_queue_name():
+    assert outbox_queue_name(NORMAL, "notify") == "notify"
+    assert outbox_queue_name(HIGH, "notify") == "notify:high"
+    assert outbox_queue_name(LOW, "notify") == "notify:low"
+
+
+def test_lane_sql_rank_orders_lanes():
+    sql = lane_sql_rank()
+    assert "WHEN 'URGENT' THEN 0" in sql
+    assert "WHEN 'LOW' THEN 2" in sql
+
+
+@pytest.mark.asyncio
+async def test_strict_serves_high_lane_first():
+    gate = make_gate(strict=True)
+
+    order = await run_queued(gate, [LOW, LOW, NORMAL, "URGENT", HIGH])
+
+    assert order == [HIGH, HIGH, NORMAL, LOW, LOW]
+    assert gate.state()["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_weighted_does_not_starve_low_lane():
+    gate = make_gate(strict=False)
+
+    order = await run_queued(gate, [HIGH] * 12 + [LOW] * 3)
+
+    # HIGH:LOW weights are 4:1, so LOW gets one of every five slots
+    assert order[:5].count(LOW) == 1
+    assert order[:10].count(LOW) == 2
+    assert order.count(LOW) == 3
+
+
+@pytest.mark.asyncio
+async def test_weighted_follows_weights():
+    gate = make_gate(strict=False)
+
+    order = await run_queued(gate, [HIGH] * 8 + [NORMAL] * 8 + [LOW] * 8)
+
+    first = order[:7]
+    assert (first.count(HIGH), first.count(NORMAL), first.count(LOW)) == (4, 2, 1)
+
+
+@pytest.mark.asyncio
+async def test_lane_limit_leaves_room_for_other_lanes():
+    gate = make_gate(capacity=3, lane_limits={HIGH: 3, NORMAL: 3, LOW: 1})
+    release = asyncio.Event()
+
+    async def hold(priority):
+        async with gate.slot(priority):
+            await release.wait()
+
+    tasks = [asyncio.create_task(hold(LOW)) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    lanes = gate.state()["lanes"]
+    assert lanes[LOW]["active"] == 1
+    assert lanes[LOW]["waiting"] == 1
+
+    tasks.append(asyncio.create_task(hold(HIGH)))
+    await asyncio.sleep(0)
+    assert gate.state()["lanes"][HIGH]["active"] == 1
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert gate.state()["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_gives_up_its_turn():
+    gate = make_gate()
+    release = asyncio.Event()
+    served = []
+
+    async def blocker():
+        async with gate.slot(NORMAL):
+            await release.wait()
+
+    async def send(priority):
+        async with gate.slot(priority):
+            served.append(priority)
+
+    holder = asyncio.create_task(blocker())
+    await asyncio.sleep(0)
+    cancelled = asyncio.create_task(send(HIGH))
+    waiting = asyncio.create_task(send(LOW))
+    await asyncio.sleep(0)
+
+    cancelled.cancel()
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(holder, waiting)
+
+    assert served == [LOW]
+    assert gate.state()["active"] == 0
+    assert gate.state()["lanes"][HIGH]["waiting"] == 0
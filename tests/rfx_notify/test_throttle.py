@@ -0,0 +1,165 @@
+import asyncio
+import time
+
+import pytest
+
+from rfx_notify import throttle
+from rfx_notify.throttle import CircuitBreaker, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(throttle.time, "monotonic", clock)
+    return clock
+
+
+def make_breaker(**kwargs):
+    options = dict(failure_ratio=0.5, min_requests=4, window_seconds=60, open_seconds=30, half_open_max_calls=1)
+    options.update(kwargs)
+    return CircuitBreaker(**options)
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_burst_then_rate():
+    bucket = TokenBucket(rate=50, burst=5)
+
+    started = time.monotonic()
+    for _ in range(5):
+        await bucket.acquire()
+    assert time.monotonic() - started < 0.05
+
+    started = time.monotonic()
+    for _ in range(5):
+        await bucket.acquire()
+    # Five more tokens at 50/s take about 100ms
+    assert time.monotonic() - started >= 0.08
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_disabled():
+    bucket = TokenBucket(rate=0)
+
+    for _ in range(1000):
+        await bucket.acquire()
+    assert bucket.state() == {"enabled": False}
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_serves_waiters_in_order():
+    bucket = TokenBucket(rate=100, burst=1)
+    served = []
+
+    async def take(index):
+        await bucket.acquire()
+        served.append(index)
+
+    await asyncio.gather(*(take(index) for index in range(5)))
+    assert served == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_takes_several_tokens():
+    bucket = TokenBucket(rate=50, burst=5)
+
+    started = time.monotonic()
+    await bucket.acquire(5)
+    assert time.monotonic() - started < 0.05
+
+    started = time.monotonic()
+    # Larger than the burst: waits for the whole deficit, 8 tokens at 50/s
+    await bucket.acquire(8)
+    assert time.monotonic() - started >= 0.14
+    assert bucket.state()["available_tokens"] < 1
+
+
+def test_breaker_opens_on_failure_ratio(clock):
+    breaker = make_breaker()
+
+    for succeeded in (True, False, True):
+        assert breaker.allow()
+        breaker.record(succeeded)
+    assert breaker.state_name == CircuitBreaker.CLOSED
+
+    breaker.record(False)
+    assert breaker.state_name == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.retry_after == 30
+
+
+def test_breaker_needs_min_requests(clock):
+    breaker = make_breaker(min_requests=10)
+
+    for _ in range(9):
+        breaker.record(False)
+    assert breaker.state_name == CircuitBreaker.CLOSED
+
+
+def test_breaker_window_forgets_old_outcomes(clock):
+    breaker = make_breaker()
+
+    for _ in range(3):
+        breaker.record(False)
+    clock.now += 61
+    breaker.record(False)
+
+    assert breaker.state_name == CircuitBreaker.CLOSED
+    assert breaker.state()["requests"] == 1
+
+
+def test_breaker_half_open_probe_closes(clock):
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record(False)
+
+    clock.now += 30
+    assert breaker.state_name == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record(True)
+    assert breaker.state_name == CircuitBreaker.CLOSED
+    assert breaker.state()["requests"] == 0
+
+
+def test_breaker_half_open_probe_reopens(clock):
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record(False)
+
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record(False)
+
+    assert breaker.state_name == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_breaker_release_frees_probe(clock):
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record(False)
+
+    clock.now += 30
+    assert breaker.allow()
+    breaker.release()
+
+    assert breaker.state_name == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+
+
+def test_breaker_disabled(clock):
+    breaker = make_breaker(enabled=False)
+
+    for _ in range(10):
+        breaker.record(False)
+    assert breaker.allow()
+    assert breaker.state() == {"enabled": False}
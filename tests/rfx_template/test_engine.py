@@ -0,0 +1,159 @@
+from rfx_template.engine import CompiledTemplateCache, JinjaEngine, TemplateEngineRegistry, TextEngine, TextTemplate
+
+
+class CountingCompiler:
+    def __init__(self):
+        self.compiled = []
+
+    def __call__(self, template_body):
+        self.compiled.append(template_body)
+        return f"compiled:{template_body}"
+
+
+def test_compile_cache_compiles_once():
+    cache = CompiledTemplateCache(max_size=4)
+    compile = CountingCompiler()
+
+    first = cache.get_or_compile("Hello {{ name }}", compile)
+    second = cache.get_or_compile("Hello {{ name }}", compile)
+
+    assert first == second == "compiled:Hello {{ name }}"
+    assert compile.compiled == ["Hello {{ name }}"]
+    assert cache.stats() == {"size": 1, "max_size": 4, "hits": 1, "misses": 1, "evictions": 0}
+
+
+def test_compile_cache_evicts_least_recently_used():
+    cache = CompiledTemplateCache(max_size=2)
+    compile = CountingCompiler()
+
+    cache.get_or_compile("a", compile)
+    cache.get_or_compile("b", compile)
+    cache.get_or_compile("a", compile)
+    cache.get_or_compile("c", compile)
+
+    # "b" was the least recently used entry
+    cache.get_or_compile("a", compile)
+    cache.get_or_compile("b", compile)
+    assert compile.compiled == ["a", "b", "c", "b"]
+    assert cache.stats()["size"] == 2
+    assert cache.stats()["evictions"] == 2
+
+
+def test_compile_cache_disabled():
+    cache = CompiledTemplateCache(max_size=0)
+    compile = CountingCompiler()
+
+    cache.get_or_compile("a", compile)
+    cache.get_or_compile("a", compile)
+
+    assert compile.compiled == ["a", "a"]
+    assert cache.stats()["size"] == 0
+    assert cache.stats()["misses"] == 2
+
+
+def test_compile_cache_invalidate_by_tag():
+    cache = CompiledTemplateCache(max_size=8)
+    compile = CountingCompiler()
+
+    cache.get_or_compile("v1", compile, tag="welcome")
+    cache.get_or_compile("v2", compile, tag="welcome")
+    cache.get_or_compile("other", compile, tag="reset")
+
+    assert cache.invalidate("welcome") == 2
+    assert cache.invalidate("welcome") == 0
+    assert cache.stats()["size"] == 1
+
+    cache.get_or_compile("v1", compile)
+    assert compile.compiled == ["v1", "v2", "other", "v1"]
+
+
+def test_compile_cache_shared_body_keeps_other_tag():
+    cache = CompiledTemplateCache(max_size=8)
+    compile = CountingCompiler()
+
+    cache.get_or_compile("same body", compile, tag="first")
+    cache.get_or_compile("same body", compile, tag="second")
+
+    assert cache.invalidate("first") == 1
+    # The entry is gone for both tags, and "second" no longer refers to it
+    assert cache.invalidate("second") == 0
+    assert cache.stats()["size"] == 0
+
+
+def test_compile_cache_eviction_drops_tags():
+    cache = CompiledTemplateCache(max_size=1)
+    compile = CountingCompiler()
+
+    cache.get_or_compile("a", compile, tag="t")
+    cache.get_or_compile("b", compile)
+
+    assert cache.invalidate("t") == 0
+    assert cache.stats()["size"] == 1
+
+
+def test_jinja_engine_renders_from_cache():
+    engine = JinjaEngine(cache_size=4)
+
+    assert engine.render("Hi {{ name }}", {"name": "Ann"}) == "Hi Ann"
+    assert engine.render("Hi {{ name }}", {"name": "Bob"}) == "Hi Bob"
+    assert engine.compile("Hi {{ name }}", cache_tag="greeting")({"name": "Cy"}) == "Hi Cy"
+    assert engine.cache_stats()["misses"] == 1
+    assert engine.cache_stats()["hits"] == 2
+
+    assert engine.invalidate("greeting") == 1
+    assert engine.cache_stats()["size"] == 0
+
+
+def test_registry_invalidates_every_engine():
+    registry = TemplateEngineRegistry()
+    registry.get("jinja2").compile("Hi {{ name }}", cache_tag="greeting")
+    registry.get("text").compile("Hi ${name}", cache_tag="greeting")
+
+    assert registry.invalidate("greeting") == 2
+    assert set(registry.cache_stats()) == {"jinja2", "text"}
+
+
+def test_text_template_substitutes_placeholders():
+    template = TextTemplate("Hello ${name}, your code is ${code}.")
+
+    assert template({"name": "Ann", "code": 1234}) == "Hello Ann, your code is 1234."
+    assert template({"name": "Bob", "code": "x"}) == "Hello Bob, your code is x."
+
+
+def test_text_template_keeps_missing_placeholders():
+    template = TextTemplate("${greeting} ${name}!")
+
+    assert template({"name": "Ann"}) == "${greeting} Ann!"
+    assert template({}) == "${greeting} ${name}!"
+
+
+def test_text_template_edge_cases():
+    assert TextTemplate("")({"name": "Ann"}) == ""
+    assert TextTemplate("no placeholders")({"name": "Ann"}) == "no placeholders"
+    assert TextTemplate("${a}${b}")({"a": 1, "b": 2}) == "12"
+    assert TextTemplate("${}")({"": "empty"}) == "empty"
+    # Unclosed placeholders and bare dollars are literal text
+    assert TextTemplate("$name ${name")({"name": "Ann"}) == "$name ${name"
+
+
+def test_text_template_does_not_substitute_values_again():
+    template = TextTemplate("${a} ${b}")
+
+    assert template({"a": "${b}", "b": "two"}) == "${b} two"
+
+
+def test_text_template_ignores_extra_data():
+    template = TextTemplate("Hi ${name}")
+    data = {f"key{index}": index for index in range(1000)}
+    data["name"] = "Ann"
+
+    assert template(data) == "Hi Ann"
+
+
+def test_text_engine_caches_templates():
+    engine = TextEngine(cache_size=4)
+
+    assert engine.render("Hi ${name}", {"name": "Ann"}) == "Hi Ann"
+    assert engine.render("Hi ${name}", {"name": "Bob"}) == "Hi Bob"
+    assert engine.cache_stats()["misses"] == 1
+    assert engine.cache_stats()["hits"] == 1